@@ -0,0 +1,202 @@
+"""
+Admissions analytics computed from the live data with pandas.
+
+The Power BI report (E2E.pbix) only shows new numbers after a dataset
+refresh; these sections are computed in-process for the admin dashboard
+and the /analytics endpoints:
+
+    funnel            applications per status, acceptance rate and yield (overall, per year, per program)
+    time_to_submit    days_to_submit percentiles per program against programs.median_days
+    first_generation  the funnel for first-generation vs other applicants
+    countries         the funnel per country
+    scores            GPA and SAT distributions per status
+
+Repository.analytics_frame() supplies one narrow row per application and
+every metric is a group-by over it. AnalyticsCache keeps the results per
+Repository.data_version(), so they are only recomputed after a submission
+or a status change.
+"""
+import threading
+
+import pandas as pd
+
+from profiling import phase
+
+# Columns of Repository.analytics_frame(), one row per application
+FRAME_COLUMNS = ['status', 'program_id', 'year', 'days_to_submit', 'is_first_generation', 'country', 'gpa',
+                 'sat_score']
+# An offer was made: still open (Accepted), taken (Enrolled) or declined (Lost)
+OFFER_STATUSES = ('Accepted', 'Enrolled', 'Lost')
+SECTIONS = ('funnel', 'time_to_submit', 'first_generation', 'countries', 'scores')
+PERCENTILES = (0.25, 0.5, 0.75, 0.9)
+# Histogram bin edges for the score distributions
+SCORE_BINS = {
+    'gpa': [0.0, 2.5, 2.75, 3.0, 3.25, 3.5, 3.75, 4.0],
+    'sat_score': [400, 900, 1000, 1100, 1200, 1300, 1400, 1500, 1600],
+}
+
+
+def _number(value, digits=4):
+    """JSON-friendly float (None for NaN)"""
+    if value is None or pd.isna(value):
+        return None
+    return round(float(value), digits)
+
+
+def _funnel_rows(frame, by=None):
+    """{group: funnel dict} of applications per status, acceptance rate and yield ('all' when by is None)"""
+    keys = frame[by] if by else pd.Series('all', index=frame.index)
+    counts = frame.groupby([keys.rename('group'), frame['status']], observed=True).size().unstack(fill_value=0)
+    applications = counts.sum(axis=1)
+    offers = counts.reindex(columns=list(OFFER_STATUSES), fill_value=0).sum(axis=1)
+    enrolled = counts['Enrolled'] if 'Enrolled' in counts.columns else pd.Series(0, index=counts.index)
+    # Acceptance: offers per application; yield: Enrolled per offer (Enrolled + Accepted + Lost)
+    acceptance = offers / applications
+    yield_rate = enrolled / offers.where(offers > 0)
+
+    rows = {}
+    for group, by_status in counts.to_dict(orient='index').items():
+        rows[group] = {
+            'applications': int(applications[group]),
+            'by_status': {status: int(n) for status, n in by_status.items() if n},
+            'offers': int(offers[group]),
+            'enrolled': int(enrolled[group]),
+            'acceptance_rate': _number(acceptance[group]),
+            'yield_rate': _number(yield_rate[group]),
+        }
+    return rows
+
+
+def funnel(frame, programs):
+    """Funnel overall, per submission year and per program"""
+    names = {program['program_id']: program['name'] for program in programs}
+    overall = _funnel_rows(frame).get('all') or {'applications': 0, 'by_status': {}, 'offers': 0, 'enrolled': 0,
+                                                 'acceptance_rate': None, 'yield_rate': None}
+    years = _funnel_rows(frame.dropna(subset=['year']), 'year')
+    by_year = [{'year': int(year), **row} for year, row in sorted(years.items())]
+    by_program = [{'program_id': program_id, 'program_name': names.get(program_id), **row}
+                  for program_id, row in sorted(_funnel_rows(frame, 'program_id').items())]
+    return {'overall': overall, 'by_year': by_year, 'by_program': by_program}
+
+
+def time_to_submit(frame, programs):
+    """days_to_submit percentiles per program next to the program's expected median_days"""
+    days = frame.dropna(subset=['days_to_submit'])
+    median_days = pd.Series({program['program_id']: program.get('median_days') for program in programs},
+                            dtype=float)
+    names = {program['program_id']: program['name'] for program in programs}
+    grouped = days.groupby('program_id', observed=True)['days_to_submit']
+    quantiles = grouped.quantile(list(PERCENTILES)).unstack()
+    means = grouped.mean()
+    counts = grouped.size()
+    # Share of applicants that took longer than the program's typical time
+    slower = (days['days_to_submit'] > days['program_id'].map(median_days)).groupby(days['program_id']).mean()
+
+    rows = []
+    for program_id in quantiles.index:
+        expected = median_days.get(program_id)
+        p50 = quantiles.loc[program_id, 0.5]
+        rows.append({
+            'program_id': program_id,
+            'program_name': names.get(program_id),
+            'applications': int(counts[program_id]),
+            'median_days': _number(expected, 1),
+            'mean': _number(means[program_id], 1),
+            **{f"p{int(pct * 100)}": _number(quantiles.loc[program_id, pct], 1) for pct in PERCENTILES},
+            'p50_minus_median_days': _number(p50 - expected, 1) if expected is not None else None,
+            'share_over_median_days': _number(slower.get(program_id)),
+        })
+    overall = days['days_to_submit'].quantile(list(PERCENTILES))
+    return {'overall': {f"p{int(pct * 100)}": _number(overall[pct], 1) for pct in PERCENTILES},
+            'by_program': rows}
+
+
+def first_generation(frame):
+    # 0/1 from SQL, True/False from the CSV files
+    flags = frame['is_first_generation'].astype('boolean')
+    rows = _funnel_rows(frame.assign(first_generation=flags), 'first_generation')
+    return {'first_generation': rows.get(True), 'other': rows.get(False)}
+
+
+def countries(frame):
+    rows = _funnel_rows(frame.dropna(subset=['country']), 'country')
+    return sorted(({'country': country, **row} for country, row in rows.items()),
+                  key=lambda row: row['applications'], reverse=True)
+
+
+def scores(frame):
+    """Summary statistics and a histogram of GPA and SAT per status"""
+    result = {}
+    for column, bins in SCORE_BINS.items():
+        values = frame[['status', column]].dropna()
+        grouped = values.groupby('status', observed=True)[column]
+        summary = grouped.describe(percentiles=list(PERCENTILES))
+        histogram = values.groupby(['status', pd.cut(values[column], bins, include_lowest=True)],
+                                   observed=False).size().unstack(fill_value=0)
+        by_status = {}
+        for status, stats in summary.to_dict(orient='index').items():
+            by_status[status] = {
+                'count': int(stats['count']),
+                'mean': _number(stats['mean'], 3),
+                'std': _number(stats['std'], 3),
+                'min': _number(stats['min'], 3),
+                **{f"p{int(pct * 100)}": _number(stats[f"{pct * 100:g}%"], 3) for pct in PERCENTILES},
+                'max': _number(stats['max'], 3),
+                'histogram': [int(n) for n in histogram.loc[status]],
+            }
+        result[column] = {'bins': bins, 'by_status': by_status}
+    return result
+
+
+def compute(frame, programs, year=None):
+    """Every section for the applications of `year` (all years when None)"""
+    with phase('pandas'):
+        if year is not None:
+            frame = frame[frame['year'] == year]
+        return {
+            'applications': len(frame),
+            'funnel': funnel(frame, programs),
+            'time_to_submit': time_to_submit(frame, programs),
+            'first_generation': first_generation(frame),
+            'countries': countries(frame),
+            'scores': scores(frame),
+        }
+
+
+class AnalyticsCache:
+    """Analytics results memoized per data version.
+
+    Every read asks data_version() (one cheap query); the frame is loaded
+    again and the sections recomputed only when it has moved. Results are
+    kept per year filter until the next change.
+    """
+
+    def __init__(self, load_frame, data_version, programs):
+        # load_frame() -> DataFrame with FRAME_COLUMNS; programs() -> program dicts (with median_days)
+        self._load_frame = load_frame
+        self._data_version = data_version
+        self._programs = programs
+        self._lock = threading.Lock()
+        self._version = None
+        self._frame = None
+        self._results = {}
+
+    def get(self, year=None):
+        """(version, results) for `year`; raises when the backend is unavailable"""
+        version = self._data_version()
+        # Held while computing, so concurrent requests after a change wait for one computation
+        with self._lock:
+            if version != self._version or self._frame is None:
+                self._frame = self._load_frame()
+                self._version = version
+                self._results = {}
+            results = self._results.get(year)
+            if results is None:
+                results = self._results[year] = compute(self._frame, self._programs(), year)
+            return version, results
+
+    def invalidate(self):
+        with self._lock:
+            self._version = None
+            self._frame = None
+            self._results = {}
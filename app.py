@@ -1,10 +1,19 @@
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify
-import pyodbc
-from datetime import datetime
-import uuid
-import random
+from flask import Flask, Response, render_template, request, redirect, url_for, session, jsonify, stream_with_context
+from datetime import date, datetime
 from dotenv import load_dotenv
+import hmac
 import os
+from analytics import SECTIONS as ANALYTICS_SECTIONS, AnalyticsCache
+from duplicates import SopDuplicates
+from export import EXPORT_FORMATS, export_chunks, parse_since
+from http_cache import conditional_html, conditional_json
+from kpi import KpiCounters
+from listing import CURRENT_ADMISSION_YEAR, KEYSET_SORTS, page_result, parse_list_args, search_args
+import profiling
+from ranking import RankingCache, parse_seats, parse_weights
+from reference_cache import ReferenceCache
+from repository import create_repository
+from submission_queue import SubmissionQueue, SubmissionWorkers
 load_dotenv()
 
 app = Flask(__name__)
@@ -25,181 +34,155 @@ CONNECTION_STRING = f"DRIVER={DB_CONFIG['driver']};SERVER={DB_CONFIG['server']};
 
 # CONNECTION_STRING = f"DRIVER={DB_CONFIG['driver']};SERVER={DB_CONFIG['server']};DATABASE={DB_CONFIG['database']};UID={DB_CONFIG['username']};PWD={DB_CONFIG['password']}"
 
-def get_db_connection():
-    """Create and return a database connection"""
-    try:
-        conn = pyodbc.connect(CONNECTION_STRING)
-        return conn
-    except Exception as e:
-        print(f"Database connection error: {e}")
-        return None
+# Per-route timings for /metrics; PROFILE_SAMPLE_RATE > 0 also profiles a share of requests (see profiling.py)
+request_metrics = profiling.MetricsRegistry()
+profiling.init_app(app, request_metrics, profiling.SampledProfiler(
+    sample_rate=float(os.getenv('PROFILE_SAMPLE_RATE', 0)),
+    slow_ms=float(os.getenv('PROFILE_SLOW_MS', 500)),
+    out_dir=os.getenv('PROFILE_DIR', 'profiles'),
+    engine=os.getenv('PROFILER', 'cprofile')
+))
 
-def get_user_from_db(email, password):
-    """Authenticate user from database"""
-    try:
-        conn = get_db_connection()
-        if not conn:
-            return None
-        
-        cursor = conn.cursor()
-        query = """
-            SELECT user_id, email, role_id 
-            FROM users 
-            WHERE email = ? AND password_hash = ?
-        """
-        cursor.execute(query, (email, password))
-        row = cursor.fetchone()
-        conn.close()
-        
-        if row:
-            return {
-                'user_id': row.user_id,
-                'email': row.email,
-                'role_id': row.role_id
-            }
-        return None
-    except Exception as e:
-        print(f"Error reading users: {e}")
-        return None
+# DATA_BACKEND picks the storage: mssql (default), sqlite or csv (see repository.py)
+repo, db_pool = create_repository(app, connection_string=CONNECTION_STRING)
 
-def register_new_user(email, password):
-    """Register a new user in the database"""
-    try:
-        conn = get_db_connection()
-        if not conn:
-            return False, "Database connection failed"
-        
-        cursor = conn.cursor()
-        
-        # Check if email already exists
-        cursor.execute("SELECT email FROM users WHERE email = ?", (email,))
-        if cursor.fetchone():
-            conn.close()
-            return False, "Email already exists"
-        
-        # Generate new user ID
-        cursor.execute("SELECT COUNT(*) FROM users")
-        count = cursor.fetchone()[0]
-        new_id = f"U{count + 1001}"
-        
-        # Insert new user
-        query = """
-            INSERT INTO users (user_id, email, password_hash, role_id, created_at)
-            VALUES (?, ?, ?, 2, ?)
-        """
-        cursor.execute(query, (new_id, email, password, datetime.now().date()))
-        conn.commit()
-        conn.close()
-        
-        return True, new_id
-    except Exception as e:
-        print(f"Registration error: {e}")
-        return False, str(e)
+dashboard_counts = KpiCounters(repo.dashboard_counts, ttl=int(os.getenv('KPI_CACHE_TTL', 300)))
 
-def get_master_list():
-    """Get comprehensive application list with all related data"""
-    try:
-        conn = get_db_connection()
-        if not conn:
-            return []
-        
-        cursor = conn.cursor()
-        query = """
-            SELECT 
-                app.application_id,
-                app.applicant_id,
-                app.status,
-                app.submission_date,
-                app.days_to_submit,
-                app.fees_paid,
-                app.sop_text,
-                app.admin_comments,
-                a.user_id,
-                a.first_name,
-                a.last_name,
-                a.dob,
-                a.gender,
-                a.country,
-                a.city,
-                a.is_first_generation,
-                p.program_id,
-                p.name AS program_name,
-                p.dept,
-                u.email
-            FROM applications app
-            INNER JOIN applicants a ON app.applicant_id = a.applicant_id
-            LEFT JOIN programs p ON app.program_id = p.program_id
-            LEFT JOIN users u ON a.user_id = u.user_id
-            ORDER BY app.submission_date DESC
-        """
-        cursor.execute(query)
-        
-        columns = [column[0] for column in cursor.description]
-        results = []
-        
-        for row in cursor.fetchall():
-            row_dict = dict(zip(columns, row))
-            # Convert date to string for JSON serialization
-            if row_dict.get('submission_date'):
-                row_dict['submission_date'] = row_dict['submission_date'].strftime('%Y-%m-%d')
-            if row_dict.get('dob'):
-                row_dict['dob'] = row_dict['dob'].strftime('%Y-%m-%d')
-            # Handle None values
-            for key in row_dict:
-                if row_dict[key] is None:
-                    row_dict[key] = 'Unknown' if isinstance(key, str) else 0
-            results.append(row_dict)
-        
-        conn.close()
-        return results
-    except Exception as e:
-        print(f"Data Error: {e}")
-        return []
+# Lookup tables only change out of band (SSMS, a new programs.csv); POST /cache/invalidate drops them early
+reference = ReferenceCache({'programs': repo.programs, 'roles': repo.roles, 'age_ranges': repo.age_ranges},
+                           ttl=int(os.getenv('REFERENCE_CACHE_TTL', 3600)))
+# Browsers and a reverse proxy may reuse /apply this long without revalidating
+APPLY_PAGE_MAX_AGE = int(os.getenv('APPLY_PAGE_MAX_AGE', 300))
+
+# Funnel, yield and time-to-submit numbers; recomputed only after repo.data_version() moves
+analytics_cache = AnalyticsCache(repo.analytics_frame, repo.data_version, lambda: reference.get('programs'))
+# Near-duplicate SOP clusters, built on first use and then following the change feed
+sop_duplicates = SopDuplicates(repo.sop_texts, repo.data_version, repo.changes_since)
+# Composite scores of every application, kept current from the change feed; ranks each program's waitlist
+# RANKING_WEIGHTS="gpa=0.5,sat_score=0.3,achievements=0.2", PROGRAM_SEATS="P101=40,P109=120" (see ranking.py)
+ranking_cache = RankingCache(repo.ranking_frame, repo.data_version, repo.changes_since,
+                             lambda: reference.get('programs'), weights=parse_weights(os.getenv('RANKING_WEIGHTS')),
+                             seats=parse_seats(os.getenv('PROGRAM_SEATS')))
 
-def update_status_in_db(app_id, new_status):
-    """Update application status in database"""
+def programs_with_enrollment():
+    """Cached programs plus active_students, the Enrolled count kept current by dashboard_counts"""
+    enrolled = dashboard_counts.by_program_for('Enrolled')
+    return [{**program, 'active_students': enrolled.get(program['program_id'], 0)}
+            for program in reference.get('programs')]
+
+def age_range_for(dob):
+    """range_id of the cached age range containing the applicant's age (1 when unknown)"""
     try:
-        conn = get_db_connection()
-        if not conn:
-            return False
-        
-        cursor = conn.cursor()
-        query = "UPDATE applications SET status = ? WHERE application_id = ?"
-        cursor.execute(query, (new_status, app_id))
-        conn.commit()
-        rows_affected = cursor.rowcount
-        conn.close()
-        
-        return rows_affected > 0
-    except Exception as e:
-        print(f"Error updating: {e}")
+        born = date.fromisoformat(dob)
+    except (TypeError, ValueError):
+        return 1
+    today = date.today()
+    age = today.year - born.year - ((today.month, today.day) < (born.month, born.day))
+    for age_range in reference.get('age_ranges'):
+        if int(age_range['min']) <= age <= int(age_range['max']):
+            return int(age_range['range_id'])
+    return 1
+
+def update_status(app_id, new_status):
+    """Update one application and adjust the dashboard counters"""
+    previous = repo.update_status(app_id, new_status)
+    if previous is None:
         return False
+    old_status, program_id, year = previous
+    dashboard_counts.record_status_change(program_id, year, old_status, new_status)
+    return True
+
+def update_statuses(decisions):
+    """Apply {app_id: new_status}; returns the updated IDs or None on failure"""
+    changed = repo.update_statuses(decisions)
+    if changed is None:
+        return None
+    for app_id, (old_status, program_id, year) in changed.items():
+        dashboard_counts.record_status_change(program_id, year, old_status, decisions[app_id])
+    return set(changed)
+
+def write_submissions(submissions):
+    """Worker side of the submission queue: one batched write, then the dashboard counters"""
+    with app.app_context():
+        written = set(repo.submit_many(submissions))
+    for submission in submissions:
+        if submission['application_id'] in written:
+            dashboard_counts.record_submission(submission['form']['program_id'], int(submission['submitted_at'][:4]))
+    return written
+
+# Submissions are acknowledged once they are in this queue; workers write them to the repository in batches
+submission_queue = SubmissionQueue(os.getenv('SUBMIT_QUEUE_PATH', 'submissions.db'))
+# SUBMIT_WORKERS=0 leaves the queue to `python submission_queue.py work`
+submission_workers = SubmissionWorkers(
+    submission_queue, write_submissions,
+    workers=int(os.getenv('SUBMIT_WORKERS', 2)),
+    batch_size=int(os.getenv('SUBMIT_BATCH_SIZE', 100))
+)
+# SUBMIT_ASYNC=0 writes each submission inside the request instead
+SUBMIT_ASYNC = os.getenv('SUBMIT_ASYNC', '1') != '0'
 
-def get_programs_list():
-    """Get all programs from database"""
+def ranked_waitlist(filters, seats=None):
+    """Page of the ranked waitlist for the list filters, with the proposed offers per program"""
+    overrides = {filters['program_id']: seats} if seats is not None else None
+    offset = (filters['page'] - 1) * filters['page_size']
+    version, plans, total, items = ranking_cache.ranking(filters['year'], filters['program_id'], overrides,
+                                                         offset, filters['page_size'])
+    return {**page_result(items, total, filters), 'version': version, 'programs': plans}
+
+def build_sop_duplicates(build):
+    """Background build of the SOP duplicate index (it reads through the repository like a request)"""
+    with app.app_context():
+        try:
+            build()
+        except Exception as e:
+            print(f"Error building SOP duplicate index: {e}")
+
+@app.before_request
+def start_background_threads():
+    # Started by the first request so that importing app (export.py, the reloader) starts no threads
+    submission_workers.start()
+    sop_duplicates.start(build_sop_duplicates)
+
+def parse_submission(data):
+    """Validated form dict for Repository.submit; raises ValueError with a message for the applicant"""
+    first_name = data.get('first_name', '').strip()
+    last_name = data.get('last_name', '').strip()
+    if not first_name or not last_name:
+        raise ValueError("First and last name are required")
+    program_id = data.get('program_id', '')
+    if program_id not in {program['program_id'] for program in reference.get('programs')}:
+        raise ValueError("Please choose a program")
+    dob = data.get('dob') or '2000-01-01'
     try:
-        conn = get_db_connection()
-        if not conn:
-            return []
-        
-        cursor = conn.cursor()
-        cursor.execute("SELECT program_id, name, dept, median_days FROM programs ORDER BY name")
-        
-        programs = []
-        for row in cursor.fetchall():
-            programs.append({
-                'program_id': row.program_id,
-                'name': row.name,
-                'dept': row.dept,
-                'median_days': row.median_days,
-                'active_students': random.randint(50, 300)  # Mock data
-            })
-        
-        conn.close()
-        return programs
-    except Exception as e:
-        print(f"Error fetching programs: {e}")
-        return []
+        date.fromisoformat(dob)
+        gpa = float(data.get('gpa') or 0.0)
+        sat = int(data.get('sat_score') or 0)
+    except ValueError:
+        raise ValueError("Date of birth, GPA and SAT score must be valid values")
+    if not 0 <= gpa <= 4 or not 0 <= sat <= 1600:
+        raise ValueError("GPA must be between 0 and 4 and the SAT score between 0 and 1600")
+    form = {
+        'first_name': first_name,
+        'last_name': last_name,
+        'dob': dob,
+        'city': data.get('city', 'Unknown'),
+        'country': data.get('country', 'Unknown'),
+        'gender': data.get('gender', 'Other'),
+        'gpa': gpa,
+        'sat': sat,
+        'is_first_gen': 'is_first_gen' in data,
+        'scholarship': 'scholarship' in data,
+        'achievement': data.get('achievement', '').strip(),
+        'program_id': program_id,
+        'sop_text': data.get('sop_text', '')
+    }
+    form['age_range_id'] = age_range_for(dob)
+    return form
+
+# Largest batch accepted by /update_applications
+MAX_BULK_DECISIONS = 1000
+# Largest page of events returned by /changes
+MAX_CHANGES_PAGE = 1000
 
 # --- ROUTES ---
 
@@ -223,7 +206,7 @@ def login_action():
         return redirect(url_for('admin_dashboard'))
     
     # User login
-    user = get_user_from_db(email, password)
+    user = repo.get_user(email, password)
     if user:
         session['user_id'] = user['user_id']
         session['role'] = user['role_id']
@@ -235,7 +218,7 @@ def login_action():
 def register_action():
     email = request.form.get('reg_email')
     password = request.form.get('reg_password')
-    success, message = register_new_user(email, password)
+    success, message = repo.register(email, password)
     if success:
         return render_template('login.html', success="Registration successful! Please login.")
     else:
@@ -251,210 +234,399 @@ def admin_dashboard():
     if session.get('role') != 1: 
         return redirect(url_for('login'))
     
-    applicants_list = get_master_list()
+    latest = repo.list_applications(page_size=50)
     pbi_url = os.getenv('PBI_EMBED_URL')
-    return render_template('dashboard.html', applicants=applicants_list[:50], pbi_url=pbi_url)
+    return render_template('dashboard.html', applicants=latest['items'], stats=dashboard_counts.summary(),
+                           pbi_url=pbi_url, analytics_year=CURRENT_ADMISSION_YEAR)
+
+@app.route('/dashboard_stats')
+def dashboard_stats():
+    if session.get('role') != 1:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+    return jsonify(dashboard_counts.summary())
 
 @app.route('/students')
 def students():
     if session.get('role') != 1:
         return redirect(url_for('login'))
     
-    all_applicants = get_master_list()
+    # Filtering, sorting and paging happen in the backend (current cycle by default)
+    filters = parse_list_args(request.args, default_year=CURRENT_ADMISSION_YEAR)
+    query = request.args.get('q', '').strip()
+    # view=ranking: the waitlist best score first, with each program's proposed offers
+    ranking = request.args.get('view') == 'ranking' and not query
+    if ranking:
+        try:
+            result = ranked_waitlist(filters)
+        except Exception as e:
+            print(f"Error ranking applications: {e}")
+            result = {**page_result([], 0, filters), 'programs': []}
+    elif query:
+        result = repo.search(query, **search_args(filters))
+    else:
+        result = repo.list_applications(**filters)
+    
+    # Date-sorted master list pages move by cursor in both directions (see the pager)
+    keyset = not ranking and not query and filters['sort'] in KEYSET_SORTS
+    return render_template('students.html', applicants=result['items'], result=result, ranking=ranking,
+                           keyset=keyset, filters=filters, query=query, programs=reference.get('programs'))
+
+@app.route('/applications')
+def list_applications():
+    if session.get('role') != 1:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+    
+    filters = parse_list_args(request.args)
+    return jsonify(repo.list_applications(**filters))
+
+@app.route('/search')
+def search_applications():
+    if session.get('role') != 1:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+    
+    # ?q= words match as prefixes in name, email, city/country, SOP and achievements; best match first
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"success": False, "message": "q is required"}), 400
+    return jsonify(repo.search(query, **search_args(parse_list_args(request.args))))
+
+@app.route('/ranking')
+def ranked_applications():
+    if session.get('role') != 1:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+    
+    # Waitlisted applications of the cycle by composite score; ?program_id=&seats= plans one program's offers
+    filters = parse_list_args(request.args, default_year=CURRENT_ADMISSION_YEAR)
+    seats = request.args.get('seats')
+    if seats is not None:
+        if not filters['program_id']:
+            return jsonify({"success": False, "message": "seats needs a program_id"}), 400
+        try:
+            seats = max(0, int(seats))
+        except ValueError:
+            return jsonify({"success": False, "message": "seats must be an integer"}), 400
+    try:
+        result = ranked_waitlist(filters, seats)
+    except Exception as e:
+        print(f"Error ranking applications: {e}")
+        return jsonify({"success": False, "message": "Ranking unavailable"}), 503
+    return jsonify({"success": True, "year": filters['year'], "weights": ranking_cache.weights, **result})
+
+@app.route('/applications/<app_id>')
+def application_details(app_id):
+    if session.get('role') != 1:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
     
-    # Filter only 2026 applications
-    current_year_applicants = [
-        app for app in all_applicants 
-        if app.get('submission_date') and str(app['submission_date']).startswith('2026')
-    ]
+    details = repo.get_application(app_id)
+    if not details:
+        return jsonify({"success": False, "message": "Application not found"}), 404
+    return conditional_json(details)
+
+@app.route('/applications/<app_id>/duplicates')
+def application_duplicates(app_id):
+    if session.get('role') != 1:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
     
-    # Sort by submission date descending
-    current_year_applicants.sort(
-        key=lambda x: x.get('submission_date', ''), 
-        reverse=True
-    )
+    # Applications whose SOP is a near-copy of this one
+    if sop_duplicates.building():
+        return jsonify({"success": False, "building": True, "message": "Duplicate index is still being built"}), 503
+    try:
+        flags = sop_duplicates.flags(app_id)
+    except Exception as e:
+        print(f"Error checking SOP duplicates: {e}")
+        return jsonify({"success": False, "message": "Duplicate check unavailable"}), 503
+    return jsonify({"success": True, **flags})
+
+@app.route('/duplicates')
+def duplicate_clusters():
+    if session.get('role') != 1:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
     
-    return render_template('students.html', applicants=current_year_applicants)
+    # Clusters of near-identical SOPs, largest first; ?min_size= hides small ones
+    filters = parse_list_args(request.args)
+    if sop_duplicates.building():
+        return jsonify({"success": False, "building": True, "message": "Duplicate index is still being built"}), 503
+    try:
+        min_size = max(2, int(request.args.get('min_size', 2)))
+        clusters = sop_duplicates.clusters(min_size)
+    except ValueError:
+        return jsonify({"success": False, "message": "min_size must be an integer"}), 400
+    except Exception as e:
+        print(f"Error listing SOP duplicates: {e}")
+        return jsonify({"success": False, "message": "Duplicate check unavailable"}), 503
+    offset = (filters['page'] - 1) * filters['page_size']
+    return jsonify(page_result(clusters[offset:offset + filters['page_size']], len(clusters), filters))
+
+@app.route('/applications/<app_id>/sop')
+def application_sop(app_id):
+    if session.get('role') != 1:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+    
+    sop = repo.get_sop(app_id)
+    if not sop:
+        return jsonify({"success": False, "message": "Application not found"}), 404
+    # The SOP never changes after submission, so the submission date doubles as Last-Modified
+    submitted = sop.pop('submission_date')
+    return conditional_json(sop, last_modified=submitted, max_age=300)
 
 @app.route('/update_application', methods=['POST'])
 def update_application():
     if session.get('role') != 1:
         return jsonify({"success": False, "message": "Unauthorized"}), 401
     
-    data = request.json
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        data = {}
     status_map = {"accept": "Accepted", "reject": "Rejected"}
     new_status = status_map.get(data.get('action'))
-    
-    if update_status_in_db(data.get('app_id'), new_status):
+    app_id = data.get('app_id')
+    if not app_id or not isinstance(app_id, (str, int)) or isinstance(app_id, bool) or not new_status:
+        return jsonify({"success": False, "message": "Invalid decision"}), 400
+
+    if update_status(app_id, new_status):
         return jsonify({"success": True, "new_status": new_status})
     return jsonify({"success": False})
 
+@app.route('/update_applications', methods=['POST'])
+def update_applications():
+    if session.get('role') != 1:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+    
+    # Accepts [{"app_id": ..., "action": "accept"|"reject"}, ...] or {"items": [...]}
+    data = request.get_json(silent=True)
+    items = data.get('items') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return jsonify({"success": False, "message": "No decisions provided"}), 400
+    if len(items) > MAX_BULK_DECISIONS:
+        return jsonify({"success": False, "message": f"At most {MAX_BULK_DECISIONS} decisions per request"}), 400
+    
+    status_map = {"accept": "Accepted", "reject": "Rejected"}
+    parsed = []
+    for item in items:
+        if not isinstance(item, dict):
+            item = {}
+        app_id = item.get('app_id')
+        # IDs are strings or numbers; anything else (lists, objects, booleans) is an invalid decision
+        valid_id = isinstance(app_id, (str, int)) and not isinstance(app_id, bool)
+        parsed.append((app_id, status_map.get(item.get('action')) if valid_id else None))
+    # If an ID appears more than once, the last decision wins
+    decisions = {app_id: new_status for app_id, new_status in parsed if app_id and new_status}
+    
+    updated = update_statuses(decisions) if decisions else set()
+    
+    results = []
+    for app_id, new_status in parsed:
+        if not app_id or not new_status:
+            results.append({"app_id": app_id, "success": False, "message": "Invalid decision"})
+        elif updated is None:
+            results.append({"app_id": app_id, "success": False, "message": "Update failed"})
+        elif app_id in updated:
+            results.append({"app_id": app_id, "success": True, "new_status": decisions[app_id]})
+        else:
+            results.append({"app_id": app_id, "success": False, "message": "Application not found"})
+    
+    return jsonify({
+        "success": updated is not None,
+        "updated": len(updated or ()),
+        "results": results
+    })
+
 @app.route('/submit_application', methods=['POST'])
 def submit_application():
     try:
-        conn = get_db_connection()
-        if not conn:
-            return "<h1>Database Error</h1><p>Could not connect to database</p><a href='/apply'>Try Again</a>"
-        
-        cursor = conn.cursor()
-        
-        # 1. Gather Form Data
-        first_name = request.form['first_name']
-        last_name = request.form['last_name']
-        dob = request.form.get('dob', '2000-01-01')
-        city = request.form.get('city', 'Unknown')
-        country = request.form.get('country', 'Unknown')
-        gender = request.form.get('gender', 'Other')
-        
-        gpa = float(request.form.get('gpa', 0.0))
-        sat = int(request.form.get('sat_score', 0))
-        is_first_gen = 1 if 'is_first_gen' in request.form else 0
-        scholarship = 1 if 'scholarship' in request.form else 0
-        achievement_text = request.form.get('achievement', '').strip()
-        
-        program_id = request.form['program_id']
-        sop = request.form.get('sop_text', '')
-        
-        # 2. Generate IDs
-        # New Applicant ID
-        cursor.execute("SELECT COUNT(*) FROM applicants")
-        last_aid_num = cursor.fetchone()[0] + 5000
-        new_aid = f"A{last_aid_num + 1}"
-        
-        # New Application ID
-        cursor.execute("SELECT COUNT(*) FROM applications")
-        last_app_num = cursor.fetchone()[0] + 9000
-        new_app_id = f"APP{last_app_num + 1}"
-        
-        # 3. Insert into APPLICANTS table
-        applicant_query = """
-            INSERT INTO applicants (applicant_id, user_id, first_name, last_name, dob, 
-                                   age_range_id, gender, country, city, is_first_generation)
-            VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?, ?)
-        """
-        cursor.execute(applicant_query, (
-            new_aid, session.get('user_id', 'Unknown'), first_name, last_name, 
-            dob, gender, country, city, is_first_gen
-        ))
-        
-        # 4. Insert into APPLICATIONS table
-        application_query = """
-            INSERT INTO applications (application_id, applicant_id, program_id, status,
-                                     submission_date, days_to_submit, fees_paid, sop_text, admin_comments)
-            VALUES (?, ?, ?, 'Waitlisted', ?, 0, 0, ?, '')
-        """
-        cursor.execute(application_query, (
-            new_app_id, new_aid, program_id, datetime.now().date(), sop
-        ))
-        
-        # 5. Insert into ACADEMIC_PROFILE table
-        cursor.execute("SELECT COUNT(*) FROM academic_profile")
-        profile_count = cursor.fetchone()[0] + 1000
-        new_profile_id = f"P{profile_count + 1}"
-        
-        academic_query = """
-            INSERT INTO academic_profile (profile_id, applicant_id, high_school_gpa, 
-                                         sat_score, scholarship_requested)
-            VALUES (?, ?, ?, ?, ?)
-        """
-        cursor.execute(academic_query, (new_profile_id, new_aid, gpa, sat, scholarship))
-        
-        # 6. Insert into STUDENT_ACHIEVEMENTS table (if achievement provided)
-        if achievement_text:
-            achievement_id = str(uuid.uuid4())
-            achievement_query = """
-                INSERT INTO student_achievements (id, applicant_id, achievement_name, date_awarded)
-                VALUES (?, ?, ?, ?)
-            """
-            cursor.execute(achievement_query, (achievement_id, new_aid, achievement_text, datetime.now().date()))
-        
-        # Commit all changes
-        conn.commit()
-        conn.close()
-        
-        return f"""
-        <div style="font-family: sans-serif; text-align: center; padding: 50px;">
-            <h1 style="color: green;">Application Submitted Successfully!</h1>
-            <p>Your Application ID is <strong>{new_app_id}</strong></p>
-            <p>Applicant ID: <strong>{new_aid}</strong></p>
-            <p>We have recorded your GPA ({gpa}) and SAT Score ({sat}).</p>
-            <br>
-            <a href='/my_application' style="padding: 10px 20px; background: #3b82f6; color: white; text-decoration: none; border-radius: 5px;">View My Applications</a>
-            <br><br>
-            <a href='/apply' style="padding: 10px 20px; background: #10b981; color: white; text-decoration: none; border-radius: 5px;">Submit Another Application</a>
-        </div>
-        """
+        # 1. Validate the form
+        try:
+            form = parse_submission(request.form)
+        except ValueError as e:
+            return f"<h1>Error</h1><p>{e}</p><a href='/apply'>Try Again</a>", 400
+        user_id = session.get('user_id', 'Unknown')
+        
+        if not SUBMIT_ASYNC:
+            new_app_id, new_aid = repo.submit(user_id, form)
+            dashboard_counts.record_submission(form['program_id'], datetime.now().year)
+            ticket = None
+        else:
+            # 2. Reserve the IDs and queue the submission; a worker stores it shortly
+            submission = repo.reserve_submission(user_id, form)
+            ticket = submission_queue.enqueue(submission)
+            submission_workers.notify()
+            new_app_id, new_aid = submission['application_id'], submission['applicant_id']
+        
+        return render_template('submitted.html', ticket=ticket, application_id=new_app_id, applicant_id=new_aid,
+                               form=form), 202 if ticket else 200
     
     except Exception as e:
-        if conn:
-            conn.rollback()
-            conn.close()
         return f"<h1>Error</h1><p>{str(e)}</p><a href='/apply'>Try Again</a>"
 
+@app.route('/submissions/<ticket>')
+def submission_status(ticket):
+    status = submission_queue.status(ticket)
+    # Only the applicant who submitted it (or an admin) can poll a ticket
+    if status is None or (session.get('role') != 1 and status['user_id'] != session.get('user_id', 'Unknown')):
+        return jsonify({"success": False, "message": "Unknown ticket"}), 404
+    status.pop('user_id')
+    return jsonify({"success": True, **status})
+
+@app.route('/submissions/metrics')
+def submission_metrics():
+    if session.get('role') != 1:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+    try:
+        window = max(1, int(request.args.get('window', 60)))
+    except ValueError:
+        return jsonify({"success": False, "message": "window must be an integer"}), 400
+    return jsonify({"success": True, "queue": submission_queue.stats(window), "workers": submission_workers.metrics()})
+
 @app.route('/apply')
 def apply():
-    programs = get_programs_list()
-    return render_template('apply.html', programs=programs)
+    # The page only depends on the programs list, so it is the same for every visitor
+    programs = reference.get('programs')
+    return conditional_html(render_template('apply.html', programs=programs), max_age=APPLY_PAGE_MAX_AGE,
+                            private=False)
 
 @app.route('/my_application')
 def my_application():
     if session.get('role') != 2:
         return redirect(url_for('login'))
     
-    user_id = session.get('user_id')
-    
-    try:
-        conn = get_db_connection()
-        if not conn:
-            return render_template('my_application.html', applications=[])
-        
-        cursor = conn.cursor()
-        query = """
-            SELECT 
-                app.application_id,
-                app.status,
-                app.submission_date,
-                app.fees_paid,
-                app.sop_text,
-                a.first_name,
-                a.last_name,
-                p.name AS program_name,
-                p.dept
-            FROM applications app
-            INNER JOIN applicants a ON app.applicant_id = a.applicant_id
-            LEFT JOIN programs p ON app.program_id = p.program_id
-            WHERE a.user_id = ?
-            ORDER BY app.submission_date DESC
-        """
-        cursor.execute(query, (user_id,))
-        
-        applications = []
-        for row in cursor.fetchall():
-            applications.append({
-                'application_id': row.application_id,
-                'status': row.status,
-                'submission_date': row.submission_date.strftime('%Y-%m-%d') if row.submission_date else 'N/A',
-                'fees_paid': row.fees_paid,
-                'sop_text': row.sop_text,
-                'first_name': row.first_name,
-                'last_name': row.last_name,
-                'program_name': row.program_name if row.program_name else 'N/A'
-            })
-        
-        conn.close()
-        return render_template('my_application.html', applications=applications)
-        
-    except Exception as e:
-        print(f"Error loading applications: {e}")
-        return render_template('my_application.html', applications=[])
+    applications = repo.my_applications(session.get('user_id'))
+    return render_template('my_application.html', applications=applications)
 
 @app.route('/programs')
 def programs():
     if session.get('role') != 1:
         return redirect(url_for('login'))
     
-    programs_list = get_programs_list()
+    programs_list = programs_with_enrollment()
     return render_template('programs.html', programs=programs_list)
 
+def feed_authorized(token_name='EXPORT_TOKEN'):
+    """Admins, or a BI/sync job (or metrics scraper) presenting the token in `token_name` as a bearer token"""
+    token = os.getenv(token_name)
+    authorization = request.headers.get('Authorization', '')
+    return session.get('role') == 1 or bool(token and hmac.compare_digest(authorization, f"Bearer {token}"))
+
+@app.route('/export/applications')
+def export_applications():
+    if not feed_authorized():
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+    
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"success": False, "message": f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+    try:
+        since = parse_since(request.args.get('since'))
+    except ValueError:
+        return jsonify({"success": False, "message": "since must be an ISO date or timestamp"}), 400
+    
+    # Pass this back as ?since= on the next refresh to fetch only what changed in between
+    watermark = datetime.now()
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    chunks = export_chunks(repo.export_applications(since=since), fmt)
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f"attachment; filename=applications.{extension}"
+    response.headers['X-Export-Watermark'] = watermark.isoformat(timespec='milliseconds')
+    return response
+
+@app.route('/changes')
+def changes():
+    if not feed_authorized():
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+    
+    # Submissions and status changes after version `since`; pass back `version` to continue
+    try:
+        since = max(0, int(request.args.get('since', 0)))
+        limit = min(MAX_CHANGES_PAGE, max(1, int(request.args.get('limit', MAX_CHANGES_PAGE))))
+    except ValueError:
+        return jsonify({"success": False, "message": "since and limit must be integers"}), 400
+    
+    try:
+        events = repo.changes_since(since, limit)
+        latest = repo.data_version()
+    except Exception as e:
+        print(f"Error reading changes: {e}")
+        return jsonify({"success": False, "message": "Change feed unavailable"}), 503
+    return jsonify({
+        "success": True,
+        "since": since,
+        "version": events[-1]['version'] if events else since,
+        "latest": latest,
+        "has_more": len(events) == limit,
+        "changes": events
+    })
+
+@app.route('/analytics')
+@app.route('/analytics/<section>')
+def analytics_report(section=None):
+    if not feed_authorized():
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+    if section is not None and section not in ANALYTICS_SECTIONS:
+        return jsonify({"success": False,
+                        "message": f"section must be one of {', '.join(ANALYTICS_SECTIONS)}"}), 404
+    try:
+        year = int(request.args['year']) if request.args.get('year') else None
+    except ValueError:
+        return jsonify({"success": False, "message": "year must be an integer"}), 400
+    
+    # Memoized per data version: unchanged data is served from memory (and 304 with the ETag)
+    try:
+        version, results = analytics_cache.get(year)
+    except Exception as e:
+        print(f"Error computing analytics: {e}")
+        return jsonify({"success": False, "message": "Analytics unavailable"}), 503
+    payload = {"success": True, "version": version, "year": year}
+    payload.update({section: results[section]} if section else results)
+    return conditional_json(payload)
+
+@app.route('/cache/invalidate', methods=['POST'])
+def invalidate_cache():
+    if session.get('role') != 1:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+    
+    # Call after editing programs/roles/age_ranges outside the app; {"tables": [...]} limits what is dropped
+    data = request.get_json(silent=True) or {}
+    tables = data.get('tables') or []
+    reference.invalidate(*tables)
+    if not tables:
+        dashboard_counts.invalidate()
+        analytics_cache.invalidate()
+        repo.invalidate_search()
+        sop_duplicates.invalidate()
+        ranking_cache.invalidate()
+    return jsonify({"success": True, "invalidated": tables or "all"})
+
+@app.route('/metrics')
+def metrics():
+    if not feed_authorized('METRICS_TOKEN'):
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+    
+    gauges = []
+    if db_pool is not None:
+        pool = db_pool.stats()
+        gauges.append(('db_pool_connections', "Pooled connections by state.",
+                       [({'state': 'in_use'}, pool['in_use']), ({'state': 'idle'}, pool['idle'])]))
+    try:
+        queue = submission_queue.stats()
+        gauges.append(('submission_queue_depth', "Submissions waiting to be written, by status.",
+                       [({'status': status}, queue[status]) for status in ('queued', 'processing', 'failed')]))
+    except Exception as e:
+        print(f"Error reading submission queue stats: {e}")
+    return Response(request_metrics.render(gauges), mimetype='text/plain; version=0.0.4')
+
+@app.route('/pool_stats')
+def pool_stats():
+    if session.get('role') != 1:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+    if db_pool is None:
+        return jsonify({"success": False, "message": "No connection pool for this backend"}), 404
+    return jsonify(db_pool.stats())
+
 if __name__ == '__main__':
+    if db_pool is not None:
+        try:
+            db_pool.prefill()
+        except Exception as e:
+            print(f"Database connection error: {e}")
+    with app.app_context():
+        reference.prefill()
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,156 @@
+"""
+Benchmark the hot query paths before and after the index migration.
+
+    python generate_data.py
+    python bench_indexes.py --csv-dir .                # throwaway SQLite copy of the CSVs
+    python bench_indexes.py --dsn "DRIVER=...;..."      # an imported SQL Server database
+
+Prints each query's plan and median time without the indexes, then applies
+migrations.py and prints them again.
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+import pandas as pd
+
+import migrations
+
+TABLES = ['roles', 'age_ranges', 'programs', 'users', 'applicants', 'applications',
+          'academic_profile', 'student_achievements']
+
+
+def build_sqlite(csv_dir, path):
+    """Create the schema in a fresh SQLite file and load the generated CSVs into it"""
+    conn = sqlite3.connect(path)
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database_setup_sqlite.sql')) as f:
+        conn.executescript(f.read())
+    for table in TABLES:
+        df = pd.read_csv(os.path.join(csv_dir, f'{table}.csv'), dtype=str, keep_default_na=False)
+        df.to_sql(table, conn, if_exists='append', index=False)
+    conn.commit()
+    return conn
+
+
+def sample_params(conn):
+    """Realistic parameters taken from the data itself"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT email, password_hash, user_id FROM users ORDER BY user_id DESC")
+    email, password, user_id = cursor.fetchone()
+    cursor.execute("SELECT applicant_id FROM applicants WHERE user_id = ?", (user_id,))
+    applicant_id = cursor.fetchone()[0]
+    return {'email': email, 'password': password, 'user_id': user_id, 'applicant_id': applicant_id}
+
+
+def hot_queries(dialect, p):
+    """(label, sql, params) for each access pattern the indexes target"""
+    page = "LIMIT 50" if dialect == 'sqlite' else "OFFSET 0 ROWS FETCH NEXT 50 ROWS ONLY"
+    return [
+        ("login", "SELECT user_id, email, role_id FROM users WHERE email = ? AND password_hash = ?",
+         (p['email'], p['password'])),
+        ("register dedupe", "SELECT email FROM users WHERE email = ?", (p['email'],)),
+        ("my_application", """
+            SELECT app.application_id, app.status, app.submission_date, a.first_name, p.name
+            FROM applications app
+            INNER JOIN applicants a ON app.applicant_id = a.applicant_id
+            LEFT JOIN programs p ON app.program_id = p.program_id
+            WHERE a.user_id = ?
+            ORDER BY app.submission_date DESC""", (p['user_id'],)),
+        ("master list page (year)", f"""
+            SELECT app.application_id, app.status, app.submission_date, a.first_name, a.last_name
+            FROM applications app
+            INNER JOIN applicants a ON app.applicant_id = a.applicant_id
+            WHERE app.submission_date >= ? AND app.submission_date < ?
+            ORDER BY app.submission_date DESC, app.application_id DESC
+            {page}""", ('2025-01-01', '2026-01-01')),
+        ("master list page (status)", f"""
+            SELECT app.application_id, app.status, app.submission_date
+            FROM applications app
+            WHERE app.status = ? AND app.program_id = ?
+            ORDER BY app.submission_date DESC, app.application_id DESC
+            {page}""", ('Waitlisted', 'P109')),
+        ("academic profile", """
+            SELECT high_school_gpa, sat_score, scholarship_requested
+            FROM academic_profile WHERE applicant_id = ?""", (p['applicant_id'],)),
+    ]
+
+
+def query_plan(conn, dialect, sql, params):
+    cursor = conn.cursor()
+    if dialect == 'sqlite':
+        cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+    cursor.execute("SET SHOWPLAN_TEXT ON")
+    try:
+        cursor.execute(sql, params)
+        lines = []
+        while True:
+            lines.extend(row[0].strip() for row in cursor.fetchall())
+            if not cursor.nextset():
+                break
+        return lines[1:]  # the first row repeats the statement text
+    finally:
+        cursor.execute("SET SHOWPLAN_TEXT OFF")
+
+
+def time_query(conn, sql, params, repeat):
+    cursor = conn.cursor()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def run_suite(conn, dialect, queries, repeat, title):
+    print(f"\n=== {title} ===")
+    timings = {}
+    for label, sql, params in queries:
+        timings[label] = time_query(conn, sql, params, repeat)
+        print(f"\n{label}: {timings[label]:.3f} ms (median of {repeat})")
+        for line in query_plan(conn, dialect, sql, params):
+            print(f"    {line}")
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare hot query plans/timings before and after indexing")
+    parser.add_argument('--csv-dir', default='.', help="Directory with generate_data.py output (SQLite mode)")
+    parser.add_argument('--dsn', help="Benchmark an existing SQL Server database instead")
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    tmp_dir = None
+    if args.dsn:
+        conn, dialect = migrations.connect(dsn=args.dsn)
+        if 2 in migrations.applied_versions(conn, dialect):
+            print("Indexes are already applied; the 'before' run will show the indexed plans.")
+    else:
+        tmp_dir = tempfile.TemporaryDirectory()
+        conn, dialect = build_sqlite(args.csv_dir, os.path.join(tmp_dir.name, 'bench.db')), 'sqlite'
+
+    try:
+        queries = hot_queries(dialect, sample_params(conn))
+        before = run_suite(conn, dialect, queries, args.repeat, "BEFORE (primary keys only)")
+        migrations.upgrade(conn, dialect)
+        if dialect == 'sqlite':
+            conn.execute("ANALYZE")
+        after = run_suite(conn, dialect, queries, args.repeat, "AFTER (hot path indexes)")
+
+        print(f"\n{'query':<28}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+        for label, _, _ in queries:
+            speedup = before[label] / after[label] if after[label] else float('inf')
+            print(f"{label:<28}{before[label]:>12.3f}{after[label]:>12.3f}{speedup:>9.1f}x")
+    finally:
+        conn.close()
+        if tmp_dir:
+            tmp_dir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark turning master list rows into dicts: the old per-row Python pass vs the batched path.
+
+    python bench_rows.py --sqlite admissions.db --rows 10000 100000
+    python bench_rows.py --dsn "DRIVER=...;..."      # an imported SQL Server database
+
+"legacy" is the conversion list_applications used to do: fetchall,
+dict(zip(columns, row)), strftime on both dates and a second pass over every
+key to replace None. "batched" is the current SqlRepository path: dates and
+NULL defaults in the SELECT, so rows only go through dict(zip()) in
+fetchmany chunks. Both read the same rows (newest first, like /students); the
+database needs at least as many applications as the largest --rows.
+
+"convert" times only the Python side, replaying rows that were already
+fetched; "total" also includes running the query and fetching.
+"""
+import argparse
+import statistics
+import time
+
+import migrations
+from sql_repository import APPLICATIONS_SELECT, SqlRepository, _date_str, _dicts
+
+LEGACY_SELECT = APPLICATIONS_SELECT.format(long_text="")
+ORDER_BY = " ORDER BY app.submission_date DESC, app.application_id DESC"
+
+
+def legacy_rows(cursor):
+    columns = [column[0] for column in cursor.description]
+    rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    for row_dict in rows:
+        if row_dict.get('submission_date'):
+            row_dict['submission_date'] = _date_str(row_dict['submission_date'])
+        if row_dict.get('dob'):
+            row_dict['dob'] = _date_str(row_dict['dob'])
+        for key in row_dict:
+            if row_dict[key] is None:
+                row_dict[key] = 'Unknown' if isinstance(key, str) else 0
+    return rows
+
+
+class ReplayCursor:
+    """Already fetched rows behind the cursor calls the converters make"""
+
+    def __init__(self, description, rows):
+        self.description = description
+        self.rows = rows
+        self.position = 0
+
+    def fetchall(self):
+        return self.fetchmany(len(self.rows))
+
+    def fetchmany(self, size):
+        batch = self.rows[self.position:self.position + size]
+        self.position += len(batch)
+        return batch
+
+
+def run(conn, sql, params, materialize, repeat):
+    """Median ms of (execute + materialize, materialize only) and the rows of the last run"""
+    totals = []
+    converts = []
+    rows = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        rows = materialize(cursor)
+        totals.append((time.perf_counter() - start) * 1000)
+
+        cursor.execute(sql, params)
+        fetched = ReplayCursor(cursor.description, cursor.fetchall())
+        start = time.perf_counter()
+        materialize(fetched)
+        converts.append((time.perf_counter() - start) * 1000)
+    return statistics.median(totals), statistics.median(converts), rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare legacy and batched master list row materialization")
+    parser.add_argument('--sqlite', default='admissions.db', help="SQLite database (ignored with --dsn)")
+    parser.add_argument('--dsn', help="Benchmark an existing SQL Server database instead")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    conn, dialect = migrations.connect(sqlite_path=None if args.dsn else args.sqlite, dsn=args.dsn)
+    repo = SqlRepository(lambda: conn, dialect)
+    try:
+        print(f"{'rows':>8}{'':<10}{'legacy ms':>10}{'batched ms':>12}{'speedup':>10}")
+        for n in args.rows:
+            page_clause, page_params = repo._page(0, n)
+            legacy_total, legacy_convert, legacy = run(conn, LEGACY_SELECT + ORDER_BY + page_clause, page_params,
+                                                       legacy_rows, args.repeat)
+            batched_total, batched_convert, batched = run(conn, repo.list_select + ORDER_BY + page_clause,
+                                                          page_params, _dicts, args.repeat)
+            if len(legacy) < n:
+                print(f"(only {len(legacy)} applications in the database)")
+            for label, old_ms, new_ms in (('convert', legacy_convert, batched_convert),
+                                          ('total', legacy_total, batched_total)):
+                print(f"{n:>8}  {label:<8}{old_ms:>10.1f}{new_ms:>12.1f}{old_ms / new_ms:>9.2f}x")
+            # Rows may differ only where legacy turned a missing number into 'Unknown'
+            differ = sum(1 for old, new in zip(legacy, batched) if old != new)
+            print(f"{'':>10}{differ} of {len(legacy)} rows differ")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Compare table load times of the CSV and Parquet file backends.
+
+    python generate_data.py
+    python parquet_store.py convert
+    python bench_storage.py --data-dir .
+
+Times decoding and a cold load (decode + indexes) of every table through
+CsvStore and ParquetStore, and the applications read behind /students
+(current year, list columns only) with and without Parquet pushdown.
+"""
+import argparse
+import statistics
+import time
+
+import pandas as pd
+
+from csv_store import CsvStore
+from listing import CURRENT_ADMISSION_YEAR
+from parquet_store import ParquetStore
+
+TABLES = ['users', 'applicants', 'applications', 'programs', 'academic_profile', 'student_achievements']
+LIST_COLUMNS = ['application_id', 'applicant_id', 'program_id', 'status', 'submission_date',
+                'days_to_submit', 'fees_paid']
+
+
+def time_cold(make_store, read, repeat):
+    """Median ms of `read(store)` on a fresh store (nothing cached) and the row count it returned"""
+    samples = []
+    rows = 0
+    for _ in range(repeat):
+        store = make_store()
+        start = time.perf_counter()
+        rows = len(read(store))
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CSV vs Parquet table loads")
+    parser.add_argument('--data-dir', default='.', help="Directory with the CSVs and the converted .parquet tables")
+    parser.add_argument('--year', type=int, default=CURRENT_ADMISSION_YEAR)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    year_filter = [('submission_date', '>=', pd.Timestamp(args.year, 1, 1)),
+                   ('submission_date', '<', pd.Timestamp(args.year + 1, 1, 1))]
+    # decode = parse the file into a typed frame; load = decode + build the hash indexes
+    cases = [(f"decode: {name}", lambda store, name=name: getattr(store, name)._read()) for name in TABLES]
+    cases += [(f"load: {name}", lambda store, name=name: getattr(store, name).frame()) for name in TABLES]
+    cases.append((f"/students {args.year}, list columns",
+                  lambda store: store.applications.scan(columns=LIST_COLUMNS, filters=year_filter)))
+
+    print(f"{'case':<42}{'csv ms':>10}{'parquet ms':>12}{'speedup':>9}{'rows':>10}")
+    for label, read in cases:
+        csv_ms, rows = time_cold(lambda: CsvStore(args.data_dir), read, args.repeat)
+        parquet_ms, parquet_rows = time_cold(lambda: ParquetStore(args.data_dir), read, args.repeat)
+        if parquet_rows != rows:
+            print(f"  warning: {label} returned {rows} CSV rows but {parquet_rows} Parquet rows")
+        print(f"{label:<42}{csv_ms:>10.1f}{parquet_ms:>12.1f}{csv_ms / parquet_ms:>8.1f}x{rows:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Throughput of /submit_application under a synthetic deadline spike, written inline vs through the queue.
+
+    DATA_BACKEND=sqlite SQLITE_PATH=scratch.db python bench_submissions.py --requests 2000 --concurrency 32
+
+Every client posts applications back to back (the March-May peak of
+generate_data.MONTH_WEIGHTS compressed into a burst), first with
+SUBMIT_ASYNC off (each request writes its rows) and then through the
+submission queue. Reports acknowledgement latency, acknowledgements per
+second and how long it took until every application was stored.
+The applications are really written: point it at a scratch copy of the data.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+FORM = {
+    'first_name': 'Bench', 'last_name': 'Applicant', 'dob': '2006-05-01', 'gender': 'Other',
+    'city': 'Springfield', 'country': 'USA', 'gpa': '3.40', 'sat_score': '1280',
+    'achievement': 'Science Fair Finalist', 'sop_text': 'I would like to study here. ' * 40,
+}
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def run_spike(app_module, requests, concurrency, program_ids):
+    """Post `requests` submissions from `concurrency` clients; returns (ack latencies ms, seconds, statuses)"""
+    latencies = []
+    statuses = []
+    lock = threading.Lock()
+    per_client = requests // concurrency
+
+    def client(n):
+        test_client = app_module.app.test_client()
+        with test_client.session_transaction() as session:
+            session['role'] = 2
+            session['user_id'] = 'U1001'
+        for i in range(per_client):
+            form = dict(FORM, program_id=program_ids[(n + i) % len(program_ids)], first_name=f"Bench{n}_{i}")
+            start = time.perf_counter()
+            response = test_client.post('/submit_application', data=form)
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                latencies.append(elapsed)
+                statuses.append(response.status_code)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, time.perf_counter() - start, statuses
+
+
+def report(label, latencies, seconds, stored_seconds, statuses):
+    errors = sum(1 for status in statuses if status >= 400)
+    print(f"{label:<8}{len(latencies):>8}{errors:>8}{statistics.median(latencies):>10.1f}"
+          f"{percentile(latencies, 95):>10.1f}{percentile(latencies, 99):>10.1f}"
+          f"{len(latencies) / seconds:>10.1f}{stored_seconds:>11.2f}{len(latencies) / stored_seconds:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark inline vs queued submissions under a spike")
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--mode', choices=['both', 'sync', 'async'], default='both')
+    args = parser.parse_args()
+
+    # A throwaway queue so earlier tickets do not skew the numbers
+    os.environ.setdefault('SUBMIT_QUEUE_PATH', os.path.join(tempfile.mkdtemp(), 'bench_submissions.db'))
+    import app as app_module
+
+    with app_module.app.app_context():
+        program_ids = [program['program_id'] for program in app_module.reference.get('programs')]
+
+    print(f"{'mode':<8}{'posts':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+          f"{'acks/s':>10}{'stored s':>11}{'stored/s':>12}")
+    for mode in (['sync', 'async'] if args.mode == 'both' else [args.mode]):
+        app_module.SUBMIT_ASYNC = mode == 'async'
+        start = time.perf_counter()
+        latencies, seconds, statuses = run_spike(app_module, args.requests, args.concurrency, program_ids)
+        # Stored = the workers have drained everything that was acknowledged
+        while mode == 'async':
+            stats = app_module.submission_queue.stats()
+            if not stats['queued'] and not stats['processing']:
+                break
+            time.sleep(0.05)
+        report(mode, latencies, seconds, time.perf_counter() - start, statuses)
+        if mode == 'async':
+            print(f"        workers: {app_module.submission_workers.metrics()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,292 @@
+"""
+Load generated CSV/Parquet data into SQL Server (replaces migrate.sql's BULK INSERT).
+
+    python bulk_load.py --data-dir .                        # SQL Server (DB_CONNECTION_STRING / --dsn)
+    python bulk_load.py --data-dir . --format parquet       # read the <table>.parquet directories
+    python bulk_load.py --data-dir . --sqlite admissions.db # local SQLite stand-in
+
+Files are streamed in chunks through a real CSV parser (quoted commas in
+sop_text are fine) and inserted with pyodbc fast_executemany. Tables of the
+same foreign-key level load in parallel, one connection each. Nonclustered
+indexes are disabled during the load and rebuilt afterwards, and the ID
+sequences are restarted past the loaded IDs. Pending schema migrations
+(migrations.py) are applied before the load, and the application_search
+index is rebuilt from the loaded rows after it.
+"""
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import pandas as pd
+from dotenv import load_dotenv
+
+import migrations
+import search
+from id_allocator import ID_KINDS
+
+# Tables of one level only reference tables of earlier levels
+LOAD_LEVELS = [
+    ['roles', 'age_ranges', 'programs'],
+    ['users'],
+    ['applicants'],
+    ['applications', 'academic_profile', 'student_achievements'],
+]
+
+# column -> SQL type family, in table order (see database_setup.sql)
+COLUMNS = {
+    'roles': [('role_id', 'int'), ('name', 'str')],
+    'age_ranges': [('range_id', 'int'), ('label', 'str'), ('min', 'int'), ('max', 'int')],
+    'programs': [('program_id', 'str'), ('name', 'str'), ('dept', 'str'), ('median_days', 'int')],
+    'users': [('user_id', 'str'), ('email', 'str'), ('password_hash', 'str'), ('role_id', 'int'),
+              ('created_at', 'date')],
+    'applicants': [('applicant_id', 'str'), ('user_id', 'str'), ('first_name', 'str'), ('last_name', 'str'),
+                   ('dob', 'date'), ('age_range_id', 'int'), ('gender', 'str'), ('country', 'str'),
+                   ('city', 'str'), ('is_first_generation', 'bool')],
+    'applications': [('application_id', 'str'), ('applicant_id', 'str'), ('program_id', 'str'),
+                     ('status', 'str'), ('submission_date', 'date'), ('days_to_submit', 'int'),
+                     ('fees_paid', 'bool'), ('sop_text', 'str'), ('admin_comments', 'str')],
+    'academic_profile': [('profile_id', 'str'), ('applicant_id', 'str'), ('high_school_gpa', 'float'),
+                         ('sat_score', 'int'), ('scholarship_requested', 'bool')],
+    'student_achievements': [('id', 'str'), ('applicant_id', 'str'), ('achievement_name', 'str'),
+                             ('date_awarded', 'date')],
+}
+
+BOOLEANS = {'true': True, 'false': False, '1': True, '0': False}
+
+
+def read_chunks(data_dir, table, fmt, chunk_size):
+    """Yield DataFrames of up to chunk_size rows from <table>.csv or <table>.parquet/"""
+    if fmt == 'parquet':
+        from parquet_store import ParquetTable
+        source = ParquetTable(os.path.join(data_dir, table + '.parquet'))
+        if not source.exists():
+            return
+        for batch in source._dataset().to_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+        return
+    path = os.path.join(data_dir, table + '.csv')
+    if not os.path.exists(path):
+        return
+    yield from pd.read_csv(path, dtype=str, keep_default_na=False, na_values=[''], chunksize=chunk_size)
+
+
+def to_rows(df, columns):
+    """Typed parameter tuples for one chunk (NULL for missing values)"""
+    converted = []
+    for name, kind in columns:
+        values = df[name] if name in df.columns else pd.Series([None] * len(df), index=df.index)
+        if kind == 'int':
+            values = pd.to_numeric(values, errors='coerce').astype('Int64')
+        elif kind == 'float':
+            values = pd.to_numeric(values, errors='coerce')
+        elif kind == 'bool':
+            values = values.map(lambda v: v if isinstance(v, bool) else BOOLEANS.get(str(v).strip().lower()))
+        elif kind == 'date':
+            values = pd.to_datetime(values, errors='coerce').dt.date
+        else:
+            values = values.astype(object)
+        converted.append(values.astype(object).where(values.notna(), None).tolist())
+    return list(zip(*converted))
+
+
+class Loader:
+    def __init__(self, connect, dialect, data_dir, fmt='csv', chunk_size=10_000, workers=4):
+        # connect() -> new DB-API connection; each worker thread uses its own
+        self.connect = connect
+        self.dialect = dialect
+        self.data_dir = data_dir
+        self.fmt = fmt
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self._print_lock = threading.Lock()
+
+    def log(self, message):
+        with self._print_lock:
+            print(message, flush=True)
+
+    # --- indexes ---
+
+    def disable_indexes(self, conn, table):
+        """Disable (SQL Server) or drop (SQLite) nonclustered indexes; returns what rebuild_indexes needs"""
+        cursor = conn.cursor()
+        if self.dialect == 'sqlite':
+            cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? "
+                           "AND sql IS NOT NULL", (table,))
+            indexes = cursor.fetchall()
+            for name, _ in indexes:
+                cursor.execute(f"DROP INDEX {name}")
+        else:
+            cursor.execute("""
+                SELECT name FROM sys.indexes
+                WHERE object_id = OBJECT_ID(?) AND type_desc = 'NONCLUSTERED'
+                  AND is_primary_key = 0 AND is_disabled = 0
+            """, (table,))
+            indexes = [(row[0], None) for row in cursor.fetchall()]
+            for name, _ in indexes:
+                cursor.execute(f"ALTER INDEX [{name}] ON [{table}] DISABLE")
+        conn.commit()
+        return indexes
+
+    def rebuild_indexes(self, conn, table, indexes):
+        cursor = conn.cursor()
+        for name, sql in indexes:
+            if self.dialect == 'sqlite':
+                cursor.execute(sql)
+            else:
+                cursor.execute(f"ALTER INDEX [{name}] ON [{table}] REBUILD")
+        conn.commit()
+
+    # --- loading ---
+
+    def upgrade_schema(self):
+        """Apply pending migrations first: the app writes columns and tables that they add"""
+        conn = self.connect()
+        try:
+            applied = migrations.upgrade(conn, self.dialect, verbose=False)
+            if applied:
+                self.log(f"  applied migrations {', '.join(str(version) for version in applied)}")
+        finally:
+            conn.close()
+
+    def load_table(self, table):
+        """Stream one table into the database; returns (rows, seconds)"""
+        columns = COLUMNS[table]
+        placeholders = ', '.join('?' for _ in columns)
+        sql = f"INSERT INTO {table} ({', '.join(name for name, _ in columns)}) VALUES ({placeholders})"
+        conn = self.connect()
+        try:
+            started = time.perf_counter()
+            indexes = self.disable_indexes(conn, table)
+            cursor = conn.cursor()
+            if self.dialect == 'mssql':
+                cursor.fast_executemany = True
+            rows = 0
+            for chunk in read_chunks(self.data_dir, table, self.fmt, self.chunk_size):
+                cursor.executemany(sql, to_rows(chunk, columns))
+                conn.commit()
+                rows += len(chunk)
+            self.rebuild_indexes(conn, table, indexes)
+            elapsed = time.perf_counter() - started
+            self.log(f"  {table:<22}{rows:>10} rows {elapsed:>8.2f}s {rows / max(elapsed, 1e-9):>12,.0f} rows/s")
+            return rows, elapsed
+        finally:
+            conn.close()
+
+    def clear(self):
+        """Delete existing rows, the change feed and children first, and restart the ID sequences"""
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            # Events of the old rows would otherwise show up in changes_since() for applications that are gone
+            cursor.execute("DELETE FROM application_events")
+            if self.dialect == 'mssql':
+                cursor.execute("DBCC CHECKIDENT ('application_events', RESEED, 0)")
+            for level in reversed(LOAD_LEVELS):
+                for table in level:
+                    cursor.execute(f"DELETE FROM {table}")
+            conn.commit()
+        finally:
+            conn.close()
+        self.resync_sequences()
+
+    def resync_sequences(self):
+        """Restart the ID sequences after the highest loaded IDs (SQL Server only)"""
+        if self.dialect != 'mssql':
+            return
+        tables = {'user': ('users', 'user_id'), 'applicant': ('applicants', 'applicant_id'),
+                  'application': ('applications', 'application_id'), 'profile': ('academic_profile', 'profile_id')}
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            for kind, (table, column) in tables.items():
+                prefix, sequence, first = ID_KINDS[kind]
+                cursor.execute(f"""
+                    IF OBJECT_ID('{sequence}', 'SO') IS NOT NULL
+                    BEGIN
+                        DECLARE @next BIGINT, @sql NVARCHAR(200);
+                        SELECT @next = ISNULL(MAX(TRY_CAST(SUBSTRING({column}, {len(prefix) + 1}, 20) AS BIGINT)),
+                                              {first - 1}) + 1
+                        FROM {table};
+                        SET @sql = N'ALTER SEQUENCE {sequence} RESTART WITH ' + CAST(@next AS NVARCHAR(20));
+                        EXEC sp_executesql @sql;
+                    END
+                """)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def rebuild_search(self):
+        """Refill the full-text search table, if the database has one (migration 5)"""
+        conn = self.connect()
+        try:
+            if search.has_search_table(conn, self.dialect):
+                started = time.perf_counter()
+                rows = search.rebuild(conn, self.dialect)
+                self.log(f"  {'application_search':<22}{rows:>10} rows {time.perf_counter() - started:>8.2f}s")
+        finally:
+            conn.close()
+
+    def run(self, replace=False):
+        """Load every level in order, tables of a level in parallel; returns {table: (rows, seconds)}"""
+        self.upgrade_schema()
+        if replace:
+            self.clear()
+        results = {}
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for level in LOAD_LEVELS:
+                for table, result in zip(level, pool.map(self.load_table, level)):
+                    results[table] = result
+        self.resync_sequences()
+        self.rebuild_search()
+        elapsed = time.perf_counter() - started
+        total = sum(rows for rows, _ in results.values())
+        self.log(f"Loaded {total} rows in {elapsed:.2f}s ({total / max(elapsed, 1e-9):,.0f} rows/s)")
+        return results
+
+
+def sqlite_connect(path):
+    """Connection factory for the SQLite stand-in; creates the schema on first use"""
+    def connect():
+        conn = sqlite3.connect(path, timeout=60)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    sqlite3.register_adapter(date, date.isoformat)
+    conn = connect()
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database_setup_sqlite.sql')) as f:
+        conn.executescript(f.read())
+    conn.close()
+    return connect
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Bulk load generated data into the admissions database")
+    parser.add_argument('--data-dir', default='.')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--dsn', help="ODBC connection string (defaults to DB_CONNECTION_STRING)")
+    parser.add_argument('--sqlite', help="Load into this SQLite file instead of SQL Server")
+    parser.add_argument('--chunk-size', type=int, default=10_000)
+    parser.add_argument('--workers', type=int, default=4, help="Tables loaded at the same time")
+    parser.add_argument('--replace', action='store_true', help="Delete existing rows first")
+    args = parser.parse_args()
+
+    if args.sqlite:
+        connect, dialect = sqlite_connect(args.sqlite), 'sqlite'
+    else:
+        import pyodbc
+        dsn = args.dsn or migrations.default_connection_string()
+        connect, dialect = (lambda: pyodbc.connect(dsn)), 'mssql'
+
+    print(f"Loading {args.format.upper()} files from {os.path.abspath(args.data_dir)} ({dialect})...")
+    Loader(connect, dialect, args.data_dir, args.format, args.chunk_size, args.workers).run(args.replace)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,522 @@
+import os
+import uuid
+from datetime import datetime
+
+import pandas as pd
+
+from analytics import FRAME_COLUMNS
+from csv_store import CsvStore
+from event_log import EventLog
+from id_allocator import FileIdAllocator
+from listing import DEFAULT_PAGE_SIZE, KEYSET_SORTS, SORT_OPTIONS, encode_cursor, page_result
+from profiling import phase, timed
+from ranking import FRAME_COLUMNS as RANKING_COLUMNS
+from repository import Repository, change_event
+from search import MemorySearchIndex, application_id_prefix, query_terms, snippet
+
+# applications columns used by the master list
+LIST_COLUMNS = ['application_id', 'applicant_id', 'program_id', 'status', 'submission_date',
+                'days_to_submit', 'fees_paid']
+# Same columns as sql_repository.EXPORT_SELECT
+EXPORT_COLUMNS = ['application_id', 'applicant_id', 'status', 'submission_date', 'days_to_submit', 'fees_paid',
+                  'updated_at', 'user_id', 'first_name', 'last_name', 'dob', 'gender', 'country', 'city',
+                  'is_first_generation', 'program_id', 'program_name', 'dept', 'email']
+
+
+def _now():
+    """Change time as written to the status log and the updated_at column"""
+    return datetime.now().isoformat(sep=' ', timespec='milliseconds')
+
+
+def _conditions(year=None, date_from=None, date_to=None, status=None, program_id=None):
+    """List filters as store.scan() conditions (the Parquet store pushes them down)"""
+    conditions = []
+    if year:
+        conditions += [('submission_date', '>=', pd.Timestamp(year, 1, 1)),
+                       ('submission_date', '<', pd.Timestamp(year + 1, 1, 1))]
+    if date_from:
+        conditions.append(('submission_date', '>=', pd.Timestamp(date_from)))
+    if date_to:
+        conditions.append(('submission_date', '<=', pd.Timestamp(date_to)))
+    if status:
+        conditions.append(('status', '==', status))
+    if program_id:
+        conditions.append(('program_id', '==', program_id))
+    return conditions
+
+
+def _previous(row):
+    """(status, program_id, year) of an application row before an update"""
+    submitted = row['submission_date']
+    return row['status'], row['program_id'], None if pd.isna(submitted) else submitted.year
+
+
+class CsvRepository(Repository):
+    """Repository over the generated files, held in memory by a CsvStore (or ParquetStore)"""
+
+    def __init__(self, store, id_allocator, events):
+        self.store = store
+        self.id_allocator = id_allocator
+        # Change feed; also hands out the row_version of every change
+        self.events = events
+        self.search_index = MemorySearchIndex(self._search_rows)
+
+    def highest_ids(self):
+        """Largest numeric suffix per ID kind; seeds the counter file the first time it is created"""
+        def highest(table, column):
+            frame = table.frame()
+            if column not in frame.columns or frame.empty:
+                return None
+            numbers = pd.to_numeric(frame[column].str.extract(r'(\d+)$')[0], errors='coerce')
+            return None if numbers.isna().all() else int(numbers.max())
+
+        return {
+            'user': highest(self.store.users, 'user_id'),
+            'applicant': highest(self.store.applicants, 'applicant_id'),
+            'application': highest(self.store.applications, 'application_id'),
+            'profile': highest(self.store.academic_profile, 'profile_id'),
+        }
+
+    # --- users ---
+
+    def get_user(self, email, password):
+        try:
+            user = self.store.users.get('email', email)
+            if user and user['password_hash'] == password:
+                return {'user_id': user['user_id'], 'email': user['email'], 'role_id': int(user['role_id'])}
+            return None
+        except Exception as e:
+            print(f"Error reading users: {e}")
+            return None
+
+    def register(self, email, password):
+        try:
+            if self.store.users.contains('email', email):
+                return False, "Email already exists"
+            new_id = self.id_allocator.next_id('user')
+            new_user = {
+                "user_id": new_id,
+                "email": email,
+                "password_hash": password,
+                "role_id": 2,
+                "created_at": datetime.now().strftime("%Y-%m-%d")
+            }
+            self.store.users.append([new_user])
+            return True, new_id
+        except Exception as e:
+            return False, str(e)
+
+    # --- applications ---
+
+    @timed('pandas')
+    def list_applications(self, page=1, page_size=DEFAULT_PAGE_SIZE, year=None, date_from=None, date_to=None,
+                          status=None, program_id=None, sort='date_desc', after=None, before=None):
+        filters = {'page': page, 'page_size': page_size}
+        store = self.store
+        try:
+            if not store.applications.exists() or not store.applicants.exists():
+                return page_result([], 0, filters)
+
+            # 1+2. LOAD + FILTER FIRST (so the merges only touch matching applications)
+            # Long text (SOP, comments) is served separately by get_sop.
+            # The Parquet store pushes columns and filters down (e.g. only the year's row groups).
+            df_apps = store.applications.scan(columns=LIST_COLUMNS,
+                                              filters=_conditions(year, date_from, date_to, status, program_id))
+
+            merged = pd.merge(df_apps, store.applicants.frame(), on='applicant_id', how='inner')
+            total = len(merged)
+
+            # 3. SORT + PAGE (keyset on submission_date/application_id for date sorts, both directions)
+            descending = SORT_OPTIONS[sort][1]
+            keyset = sort in KEYSET_SORTS
+            if keyset:
+                merged = merged.sort_values(by=['submission_date', 'application_id'],
+                                            ascending=not descending, na_position='last')
+                position = after or before
+                if position:
+                    position_date = pd.Timestamp(position[0])
+                    dates, ids = merged['submission_date'], merged['application_id']
+                    # Rows after the cursor in list order; for before=, the rows ahead of it
+                    if descending == bool(after):
+                        past = (dates < position_date) | ((dates == position_date) & (ids < position[1]))
+                    else:
+                        past = (dates > position_date) | ((dates == position_date) & (ids > position[1]))
+                    merged = merged[past]
+            else:
+                merged = merged.sort_values(by=['last_name', 'first_name', 'application_id'],
+                                            ascending=not descending, na_position='last')
+            if keyset and before:
+                # Previous page: the last rows ahead of the cursor, plus one to know if more precede them
+                merged = merged.iloc[-(page_size + 1):]
+                more = len(merged) > page_size
+                merged = merged.iloc[1:] if more else merged
+            else:
+                offset = 0 if keyset and after else (page - 1) * page_size
+                merged = merged.iloc[offset:offset + page_size + 1]
+                more = len(merged) > page_size
+                merged = merged.iloc[:page_size]
+
+            results = self._page_rows(merged)
+            next_cursor = prev_cursor = None
+            if keyset and results:
+                first, last = results[0], results[-1]
+                if more or before:
+                    next_cursor = encode_cursor(last['submission_date'], last['application_id'])
+                # Rows precede this page when it was reached through a cursor or an offset
+                if (more if before else bool(after) or page > 1):
+                    prev_cursor = encode_cursor(first['submission_date'], first['application_id'])
+
+            return page_result(results, total, filters, next_cursor, prev_cursor)
+
+        except Exception as e:
+            print(f"Data Error: {e}")
+            return page_result([], 0, filters)
+
+    def _page_rows(self, merged):
+        """Row dicts of one page: program and email looked up, dates formatted, gaps filled"""
+        store = self.store
+        # 4. MERGE LOOKUPS for the page only
+        merged = pd.merge(merged, store.programs.frame(), on='program_id', how='left')
+        merged = pd.merge(merged, store.users.frame()[['user_id', 'email']], on='user_id', how='left')
+
+        # 5. CLEAN UP
+        final_df = merged.rename(columns={'name': 'program_name'})
+        final_df['submission_date'] = final_df['submission_date'].dt.strftime('%Y-%m-%d')
+        # Missing numbers and flags are 0 (as in the SQL backend); everything else 'Unknown'
+        numeric = [c for c in ('days_to_submit', 'fees_paid', 'is_first_generation') if c in final_df.columns]
+        final_df[numeric] = final_df[numeric].fillna(0)
+        final_df = final_df.astype(object).fillna("Unknown")
+
+        if 'days_to_submit' not in final_df.columns:
+            final_df['days_to_submit'] = 0
+        return final_df.to_dict(orient='records')
+
+    @timed('pandas')
+    def _search_rows(self):
+        """Index rows (application_id, name, email, location, sop_text, achievements) of every application"""
+        store = self.store
+        apps = store.applications.scan(columns=['application_id', 'applicant_id', 'sop_text'])
+        applicants = store.applicants.frame()[['applicant_id', 'user_id', 'first_name', 'last_name', 'city',
+                                               'country']]
+        achievements = store.student_achievements.frame().dropna(subset=['achievement_name'])
+        achievements = achievements.groupby('applicant_id')['achievement_name'].agg(' '.join)
+        merged = pd.merge(apps, applicants, on='applicant_id', how='inner')
+        merged = pd.merge(merged, store.users.frame()[['user_id', 'email']], on='user_id', how='left')
+        # Parquet columns may be categorical; plain strings concatenate
+        text = {column: merged[column].astype('string').fillna('')
+                for column in ('first_name', 'last_name', 'city', 'country')}
+        merged['name'] = text['first_name'] + ' ' + text['last_name']
+        merged['location'] = text['city'] + ' ' + text['country']
+        merged['achievements'] = merged['applicant_id'].map(achievements)
+        merged = merged[['application_id', 'name', 'email', 'location', 'sop_text', 'achievements']]
+        return merged.astype(object).where(merged.notna(), None).itertuples(index=False, name=None)
+
+    @timed('pandas')
+    def search(self, query, page=1, page_size=DEFAULT_PAGE_SIZE, year=None, date_from=None, date_to=None,
+               status=None, program_id=None):
+        """Rank with the in-memory FTS5 index, then apply the list filters in ranked order (IDs: in ID order)"""
+        filters = {'page': page, 'page_size': page_size}
+        terms = query_terms(query)
+        store = self.store
+        try:
+            if not terms or not store.applications.exists() or not store.applicants.exists():
+                return page_result([], 0, filters)
+
+            df_apps = store.applications.scan(columns=LIST_COLUMNS,
+                                              filters=_conditions(year, date_from, date_to, status, program_id))
+            prefix = application_id_prefix(query)
+            if prefix:
+                by_id = df_apps[df_apps['application_id'].astype(str).str.startswith(prefix)]
+                if len(by_id):
+                    merged = pd.merge(by_id.sort_values('application_id'), store.applicants.frame(),
+                                      on='applicant_id', how='inner')
+                    offset = (page - 1) * page_size
+                    results = self._page_rows(merged.iloc[offset:offset + page_size])
+                    for row in results:
+                        row['score'] = None
+                        row['snippet'] = ''
+                    return page_result(results, len(merged), filters)
+
+            hits = pd.DataFrame.from_records(self.search_index.search(terms),
+                                             columns=['application_id', 'score', 'match_sop', 'match_achievements'])
+            # Inner merges keep the order of the left frame, i.e. the ranking
+            merged = pd.merge(hits, df_apps, on='application_id', how='inner')
+            merged = pd.merge(merged, store.applicants.frame(), on='applicant_id', how='inner')
+            total = len(merged)
+
+            offset = (page - 1) * page_size
+            results = self._page_rows(merged.iloc[offset:offset + page_size])
+            for row in results:
+                row['score'] = round(float(row['score']), 3)
+                texts = [None if text == "Unknown" else text
+                         for text in (row.pop('match_sop'), row.pop('match_achievements'))]
+                row['snippet'] = snippet(texts, terms)
+            return page_result(results, total, filters)
+        except Exception as e:
+            print(f"Search error: {e}")
+            return page_result([], 0, filters)
+
+    def invalidate_search(self):
+        self.search_index.invalidate()
+
+    def get_application(self, app_id):
+        store = self.store
+        try:
+            application = store.applications.get('application_id', app_id)
+            if not application:
+                return None
+            applicant = store.applicants.get('applicant_id', application['applicant_id'])
+            if not applicant:
+                return None
+
+            # Index probes instead of merges: one row from each table
+            program = store.programs.get('program_id', application['program_id']) or {}
+            user = store.users.get('user_id', applicant['user_id']) or {}
+            details = {**applicant, **application, 'program_name': program.get('name'),
+                       'dept': program.get('dept'), 'median_days': program.get('median_days'),
+                       'email': user.get('email')}
+            if not pd.isna(details['submission_date']):
+                details['submission_date'] = details['submission_date'].strftime('%Y-%m-%d')
+            return {k: "Unknown" if pd.isna(v) else v for k, v in details.items()}
+        except Exception as e:
+            print(f"Error loading application {app_id}: {e}")
+            return None
+
+    def get_sop(self, app_id):
+        try:
+            row = self.store.applications.get('application_id', app_id)
+            if not row:
+                return None
+            submitted = row['submission_date']
+            return {
+                'application_id': app_id,
+                'submission_date': None if pd.isna(submitted) else submitted.to_pydatetime(),
+                'sop_text': '' if pd.isna(row['sop_text']) else row['sop_text']
+            }
+        except Exception as e:
+            print(f"Error loading SOP for {app_id}: {e}")
+            return None
+
+    @timed('pandas')
+    def dashboard_counts(self):
+        """Application counts grouped by status, program and submission year (one groupby)"""
+        df = self.store.applications.frame()
+        counts = df.groupby([df['status'], df['program_id'], df['submission_date'].dt.year.rename('year')],
+                            dropna=False, observed=True).size()
+        return [
+            (status, program_id, None if pd.isna(year) else int(year), int(n))
+            for (status, program_id, year), n in counts.items()
+        ]
+
+    def update_status(self, app_id, new_status):
+        changed = self.update_statuses({app_id: new_status})
+        return (changed or {}).get(app_id)
+
+    def update_statuses(self, decisions):
+        """Apply {app_id: new_status} with a single log write, then record the change events"""
+        try:
+            now = _now()
+            # The event log lock is held throughout so versions reach the feed in order
+            with self.events.writing() as events:
+                first = events.next_version()
+                versions = {app_id: first + i for i, app_id in enumerate(decisions)}
+                previous = self.store.applications.update_many(
+                    'application_id',
+                    {app_id: {'status': status, 'updated_at': now, 'row_version': versions[app_id]}
+                     for app_id, status in decisions.items()}
+                )
+                changed = {app_id: _previous(row) for app_id, row in previous.items() if row is not None}
+                events.write([
+                    change_event(versions[app_id], app_id, 'status_changed', old_status, decisions[app_id],
+                                 program_id, now)
+                    for app_id, (old_status, program_id, _) in changed.items()
+                ])
+            return changed
+        except Exception as e:
+            print(f"Error updating: {e}")
+            return None
+
+    def submit_many(self, submissions):
+        """Append each table's new rows with one write per table"""
+        store = self.store
+        submissions = [s for s in submissions if not store.applications.contains('application_id', s['application_id'])]
+        if not submissions:
+            return []
+        now = _now()
+
+        # Email is linked via user_id in users.csv, not stored on the applicant
+        store.applicants.append([{
+            "applicant_id": s['applicant_id'],
+            "user_id": s['user_id'],
+            "first_name": s['form']['first_name'],
+            "last_name": s['form']['last_name'],
+            "dob": s['form']['dob'],
+            "age_range_id": s['form'].get('age_range_id', 1),
+            "gender": s['form']['gender'],
+            "country": s['form']['country'],
+            "city": s['form']['city'],
+            "is_first_generation": s['form']['is_first_gen']
+        } for s in submissions])
+        with self.events.writing() as events:
+            first = events.next_version()
+            store.applications.append([{
+                "application_id": s['application_id'],
+                "applicant_id": s['applicant_id'],
+                "program_id": s['form']['program_id'],
+                "status": "Waitlisted",
+                "submission_date": s['submitted_at'][:10],
+                "days_to_submit": 0,
+                "fees_paid": False,
+                "sop_text": s['form']['sop_text'],
+                "admin_comments": "",
+                "updated_at": now,
+                "row_version": first + i
+            } for i, s in enumerate(submissions)])
+            events.write([change_event(first + i, s['application_id'], 'submitted', None, 'Waitlisted',
+                                       s['form']['program_id'], now) for i, s in enumerate(submissions)])
+        store.academic_profile.append([{
+            "profile_id": s['profile_id'],
+            "applicant_id": s['applicant_id'],
+            "high_school_gpa": s['form']['gpa'],
+            "sat_score": s['form']['sat'],
+            "scholarship_requested": s['form']['scholarship']
+        } for s in submissions])
+        achievements = [{
+            "id": str(uuid.uuid4()),
+            "applicant_id": s['applicant_id'],
+            "achievement_name": s['form']['achievement'],
+            "date_awarded": s['submitted_at'][:10]
+        } for s in submissions if s['form']['achievement']]
+        if achievements:
+            store.student_achievements.append(achievements)
+        self.search_index.add([
+            (s['application_id'], f"{s['form']['first_name']} {s['form']['last_name']}",
+             (store.users.get('user_id', s['user_id']) or {}).get('email'),
+             f"{s['form']['city']} {s['form']['country']}", s['form']['sop_text'], s['form']['achievement'] or None)
+            for s in submissions
+        ])
+        return [s['application_id'] for s in submissions]
+
+    def sop_texts(self, application_ids=None, batch_size=5000):
+        """SOPs from the applications table (probing the ID index for given IDs)"""
+        applications = self.store.applications
+        if application_ids is None:
+            apps = applications.scan(columns=['application_id', 'sop_text'])
+        else:
+            apps = applications.rows_in('application_id', list(application_ids))[['application_id', 'sop_text']]
+        rows = list(apps.astype(object).where(apps.notna(), None).itertuples(index=False, name=None))
+        for start in range(0, len(rows), batch_size):
+            yield rows[start:start + batch_size]
+
+    def export_applications(self, since=None, batch_size=5000):
+        """Stream the master list join in batches, joining each batch through the ID indexes"""
+        store = self.store
+        apps = store.applications.scan()
+        if since:
+            # Rows never changed after submission have no updated_at
+            since = pd.Timestamp(since)
+            updated = apps['updated_at'] if 'updated_at' in apps.columns else pd.Series(pd.NaT, index=apps.index)
+            apps = apps[(updated >= since) | (updated.isna() & (apps['submission_date'] >= since.normalize()))]
+        programs = store.programs.frame().rename(columns={'name': 'program_name'})
+
+        for start in range(0, len(apps), batch_size):
+            with phase('pandas'):
+                chunk = apps.iloc[start:start + batch_size]
+                applicants = store.applicants.rows_in('applicant_id', chunk['applicant_id'].unique())
+                users = store.users.rows_in('user_id', applicants['user_id'].unique())
+                merged = pd.merge(chunk, applicants, on='applicant_id', how='inner')
+                merged = pd.merge(merged, programs[['program_id', 'program_name', 'dept']], on='program_id',
+                                  how='left')
+                merged = pd.merge(merged, users[['user_id', 'email']], on='user_id', how='left')
+                merged = merged.reindex(columns=EXPORT_COLUMNS)
+                batch = merged.astype(object).where(merged.notna(), None).to_dict(orient='records')
+            yield batch
+
+    def changes_since(self, version, limit=500):
+        return self.events.since(version, limit)
+
+    def data_version(self):
+        return self.events.last_version()
+
+    @timed('pandas')
+    def analytics_frame(self):
+        """One narrow row per application (analytics.FRAME_COLUMNS), joined on the ID columns"""
+        store = self.store
+        apps = store.applications.scan(columns=['applicant_id', 'status', 'program_id', 'submission_date',
+                                                'days_to_submit'])
+        applicants = store.applicants.frame()[['applicant_id', 'is_first_generation', 'country']]
+        profiles = store.academic_profile.frame()[['applicant_id', 'high_school_gpa', 'sat_score']]
+        frame = pd.merge(apps, applicants, on='applicant_id', how='inner')
+        frame = pd.merge(frame, profiles.drop_duplicates('applicant_id'), on='applicant_id', how='left')
+        frame['year'] = frame['submission_date'].dt.year
+        return frame.rename(columns={'high_school_gpa': 'gpa'})[FRAME_COLUMNS]
+
+    @timed('pandas')
+    def ranking_frame(self, application_ids=None):
+        """Scoring inputs per application (ranking.FRAME_COLUMNS), probing the ID index for given IDs"""
+        store = self.store
+        columns = ['application_id', 'applicant_id', 'program_id', 'status', 'submission_date']
+        if application_ids is None:
+            apps = store.applications.scan(columns=columns)
+        else:
+            apps = store.applications.rows_in('application_id', list(application_ids))[columns]
+        applicants = store.applicants.frame()[['applicant_id', 'user_id', 'first_name', 'last_name']]
+        profiles = store.academic_profile.frame()[['applicant_id', 'high_school_gpa', 'sat_score',
+                                                   'scholarship_requested']]
+        achievements = store.student_achievements.frame().groupby('applicant_id').size()
+        frame = pd.merge(apps, applicants, on='applicant_id', how='inner')
+        frame = pd.merge(frame, store.users.frame()[['user_id', 'email']], on='user_id', how='left')
+        frame = pd.merge(frame, profiles.drop_duplicates('applicant_id'), on='applicant_id', how='left')
+        frame['year'] = frame['submission_date'].dt.year
+        frame['achievements'] = frame['applicant_id'].map(achievements).fillna(0)
+        # True/False from the CSV files, missing profiles as NaN
+        frame['scholarship_requested'] = frame['scholarship_requested'].astype('float')
+        return frame.rename(columns={'high_school_gpa': 'gpa'})[RANKING_COLUMNS]
+
+    @timed('pandas')
+    def my_applications(self, user_id):
+        store = self.store
+        try:
+            # Probe the user_id -> applicants and applicant_id -> applications indexes
+            user_applicants = store.applicants.rows('user_id', user_id)
+            if user_applicants.empty:
+                return []
+
+            user_apps = store.applications.rows_in('applicant_id', user_applicants['applicant_id'])
+            merged = pd.merge(user_apps, user_applicants, on='applicant_id', how='inner')
+            merged = pd.merge(merged, store.programs.frame(), on='program_id', how='left')
+            merged = merged.rename(columns={'name': 'program_name'})
+            merged = merged.sort_values(by='submission_date', ascending=False)
+            merged['submission_date'] = merged['submission_date'].dt.strftime('%Y-%m-%d')
+            return merged.to_dict(orient='records')
+        except Exception as e:
+            print(f"Error loading applications: {e}")
+            return []
+
+    # --- reference data ---
+
+    def programs(self):
+        return self.store.programs.frame().sort_values('name').to_dict(orient='records')
+
+    def roles(self):
+        return self.store.roles.frame().sort_values('role_id').to_dict(orient='records')
+
+    def age_ranges(self):
+        return self.store.age_ranges.frame().sort_values('min').to_dict(orient='records')
+
+
+def create_csv_repository(data_dir, fmt='csv'):
+    """CsvRepository over data_dir with its status-log compactor and ID counter file"""
+    if fmt == 'parquet':
+        from parquet_store import ParquetStore
+        store = ParquetStore(data_dir)
+    else:
+        store = CsvStore(data_dir)
+    # Status changes go to applications.csv.log; this folds them back into the table
+    store.applications.start_compactor(
+        max_bytes=int(os.getenv('STATUS_LOG_MAX_BYTES', 1024 * 1024)),
+        max_age=float(os.getenv('STATUS_LOG_MAX_AGE', 60))
+    )
+    repo = CsvRepository(store, None, EventLog(os.path.join(data_dir, 'application_events.jsonl')))
+    repo.id_allocator = FileIdAllocator(os.path.join(data_dir, 'id_counters.json'), seed=repo.highest_ids)
+    return repo
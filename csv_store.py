@@ -0,0 +1,419 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from file_lock import FileLock
+from profiling import phase
+
+
+FILTER_OPS = {
+    '==': lambda s, v: s == v,
+    '!=': lambda s, v: s != v,
+    '<': lambda s, v: s < v,
+    '<=': lambda s, v: s <= v,
+    '>': lambda s, v: s > v,
+    '>=': lambda s, v: s >= v,
+    'in': lambda s, v: s.isin(list(v)),
+}
+
+
+def filter_mask(df, filters):
+    """Boolean mask for [(column, op, value), ...] (ANDed), the filter format pyarrow accepts"""
+    mask = pd.Series(True, index=df.index)
+    for column, op, value in filters:
+        mask &= FILTER_OPS[op](df[column], value)
+    return mask
+
+
+class CsvTable:
+    """One CSV file held in memory as a typed DataFrame with hash indexes.
+
+    The file is parsed once and re-read only when its mtime or size changes.
+    `unique` columns map value -> row position, `multi` columns map
+    value -> list of row positions. Returned frames are shared: treat them
+    as read-only and copy before mutating.
+
+    With `log_key` set, updates are not written to the CSV. They are appended
+    (and fsync'd) to a JSON-lines change log next to it and replayed over the
+    table on load; compact() folds the log back into the CSV atomically.
+    """
+
+    def __init__(self, path, unique=(), multi=(), dtype=None, parse_dates=(), read_kwargs=None,
+                 log_key=None):
+        self.path = path
+        self.unique = tuple(unique)
+        self.multi = tuple(multi)
+        self.dtype = dtype or {}
+        self.parse_dates = list(parse_dates)
+        self.read_kwargs = read_kwargs or {}
+        self.log_key = log_key
+        self.log_path = path + '.log' if log_key else None
+
+        self._lock = threading.RLock()
+        # Serializes writers across processes (appends, logged updates, compaction)
+        self._file_lock = FileLock(path + '.lock')
+        self._df = None
+        self._stat = None
+        self._indexes = {}
+        # Header of the file on disk; the in-memory table can gain columns through updates
+        self._file_columns = []
+        self._log_offset = 0
+        self._compactor = None
+        self._stop_compactor = threading.Event()
+
+    # --- loading ---
+
+    def _file_stat(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            return None
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return pd.DataFrame()
+        df = pd.read_csv(self.path, dtype=self.dtype, **self.read_kwargs)
+        for col in self.parse_dates:
+            if col in df.columns:
+                df[col] = pd.to_datetime(df[col], errors='coerce')
+        return df
+
+    def _build_indexes(self, df):
+        indexes = {}
+        for col in self.unique:
+            if col in df.columns:
+                # Later rows win, matching "last write" semantics of appended CSVs
+                indexes[col] = dict(zip(df[col].tolist(), range(len(df))))
+        for col in self.multi:
+            if col in df.columns:
+                indexes[col] = {k: v.tolist() for k, v in df.groupby(col, sort=False).indices.items()}
+        return indexes
+
+    def _refresh(self):
+        """Reload if the file changed on disk, then catch up on the change log. Caller holds the lock."""
+        stat = self._file_stat()
+        if self._df is None or stat != self._stat:
+            with phase('pandas_io'):
+                df = self._read()
+                self._indexes = self._build_indexes(df)
+            self._df = df
+            self._file_columns = list(df.columns)
+            self._stat = stat
+            self._log_offset = 0
+        if self.log_path:
+            self._replay_log()
+
+    def _log_size(self):
+        try:
+            return os.path.getsize(self.log_path)
+        except FileNotFoundError:
+            return 0
+
+    def _replay_log(self):
+        """Apply change log entries written since the last replay (by any process)"""
+        size = self._log_size()
+        if size < self._log_offset:
+            # Another process compacted; its CSV already holds everything we applied
+            self._df = None
+            self._refresh()
+            return
+        if size == self._log_offset:
+            return
+        with open(self.log_path, 'rb') as f:
+            f.seek(self._log_offset)
+            data = f.read(size - self._log_offset)
+        # A line still being written by another process is picked up next time
+        end = data.rfind(b'\n') + 1
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            key = entry.pop(self.log_key)
+            entry.pop('ts', None)
+            self._apply(self._indexes.get(self.log_key, {}).get(key), entry)
+        self._log_offset += end
+
+    def _apply(self, pos, changes):
+        """Set cells of one row in place. Caller holds the lock."""
+        if pos is None:
+            return
+        for col, value in changes.items():
+            if col not in self._df.columns:
+                self._df[col] = pd.NaT if col in self.parse_dates else None
+            self._df.iat[pos, self._df.columns.get_loc(col)] = self._cell(col, value)
+
+    def _cell(self, col, value):
+        """Logged value as stored in the column (ISO strings become Timestamps in date columns)"""
+        if pd.api.types.is_datetime64_any_dtype(self._df[col].dtype):
+            return pd.Timestamp(value) if value is not None else pd.NaT
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._stat = None
+            self._df = None
+
+    # --- reads ---
+
+    def frame(self):
+        """The whole table (shared, read-only)"""
+        with self._lock:
+            self._refresh()
+            return self._df
+
+    def __len__(self):
+        return len(self.frame())
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def scan(self, columns=None, filters=None):
+        """Rows matching `filters` [(column, op, value), ...], limited to `columns`.
+
+        Filters the cached frame; ParquetTable pushes the same arguments down
+        to the files instead.
+        """
+        with self._lock:
+            self._refresh()
+            df = self._df
+            if filters:
+                df = df[filter_mask(df, filters)]
+            if columns is not None:
+                df = df[[c for c in columns if c in df.columns]]
+            return df
+
+    def get(self, column, value):
+        """Row dict for a unique-indexed column, or None"""
+        with self._lock:
+            self._refresh()
+            pos = self._indexes.get(column, {}).get(value)
+            if pos is None:
+                return None
+            return self._df.iloc[pos].to_dict()
+
+    def contains(self, column, value):
+        with self._lock:
+            self._refresh()
+            return value in self._indexes.get(column, {})
+
+    def positions(self, column, value):
+        """Row positions for an indexed column (unique or multi)"""
+        with self._lock:
+            self._refresh()
+            index = self._indexes.get(column, {})
+            found = index.get(value)
+            if found is None:
+                return []
+            return [found] if column in self.unique else list(found)
+
+    def rows(self, column, value):
+        """Sub-frame of rows matching an indexed column"""
+        with self._lock:
+            self._refresh()
+            return self._df.iloc[self.positions(column, value)]
+
+    def rows_in(self, column, values):
+        """Sub-frame of rows matching any of several values of an indexed column"""
+        with self._lock:
+            self._refresh()
+            positions = []
+            for value in values:
+                positions.extend(self.positions(column, value))
+            return self._df.iloc[sorted(positions)]
+
+    # --- writes ---
+
+    def append(self, records):
+        """Append rows to the CSV and to the in-memory table without a full reload"""
+        with self._lock, self._file_lock:
+            self._refresh()
+            new_rows = pd.DataFrame(records)
+            exists = os.path.exists(self.path) and os.path.getsize(self.path) > 0
+            if exists and self._df is not None and len(self._df.columns):
+                added = [col for col in new_rows.columns if col not in self._df.columns]
+                for col in added:
+                    self._df[col] = pd.NaT if col in self.parse_dates else None
+                if list(self._df.columns) != self._file_columns:
+                    # New columns: rewrite once so the header matches the rows appended below
+                    self._rewrite()
+                new_rows = new_rows.reindex(columns=self._df.columns)
+            text = new_rows.to_csv(header=not exists, index=False)
+            with open(self.path, 'a', newline='', encoding='utf-8') as f:
+                f.write(text)
+
+            before = self._stat
+            after = self._file_stat()
+            expected_size = (before[1] if before else 0) + len(text.encode('utf-8'))
+            if before is None or after is None or after[1] != expected_size:
+                # Someone else touched the file too; fall back to a full reload
+                self._stat = None
+                self._refresh()
+                return
+
+            for col in self.parse_dates:
+                if col in new_rows.columns:
+                    new_rows[col] = pd.to_datetime(new_rows[col], errors='coerce')
+            self._extend(new_rows, after)
+
+    def _extend(self, new_rows, stat):
+        """Add rows just written to disk to the in-memory table and its indexes. Caller holds the lock."""
+        start = len(self._df)
+        self._df = pd.concat([self._df, new_rows], ignore_index=True)
+        for col in self.unique:
+            index = self._indexes.setdefault(col, {})
+            for offset, value in enumerate(new_rows[col].tolist() if col in new_rows else []):
+                index[value] = start + offset
+        for col in self.multi:
+            index = self._indexes.setdefault(col, {})
+            for offset, value in enumerate(new_rows[col].tolist() if col in new_rows else []):
+                index.setdefault(value, []).append(start + offset)
+        self._stat = stat
+
+    def update(self, key_column, key, changes):
+        """Change one row (located through a unique index); returns the previous row or None"""
+        with self._lock, self._file_lock:
+            self._refresh()
+            pos = self._indexes.get(key_column, {}).get(key)
+            if pos is None:
+                return None
+            previous = self._df.iloc[pos].to_dict()
+
+            if self.log_path and key_column == self.log_key:
+                # O(1) durable write; the replay on our next refresh is idempotent
+                entry = {'ts': datetime.now().isoformat(timespec='milliseconds'), key_column: key, **changes}
+                fd = os.open(self.log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, (json.dumps(entry) + '\n').encode('utf-8'))
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+                self._apply(pos, changes)
+            else:
+                self._apply(pos, changes)
+                self._rewrite()
+            return previous
+
+    def update_many(self, key_column, changes_by_key):
+        """Change several rows in one locked write (one log fsync, or one CSV rewrite).
+
+        Returns {key: previous row dict, or None when the key does not exist}.
+        """
+        with self._lock, self._file_lock:
+            self._refresh()
+            index = self._indexes.get(key_column, {})
+            previous = {}
+            found = []
+            for key, changes in changes_by_key.items():
+                pos = index.get(key)
+                previous[key] = None if pos is None else self._df.iloc[pos].to_dict()
+                if pos is not None:
+                    found.append((pos, key, changes))
+            if not found:
+                return previous
+
+            if self.log_path and key_column == self.log_key:
+                ts = datetime.now().isoformat(timespec='milliseconds')
+                lines = ''.join(json.dumps({'ts': ts, key_column: key, **changes}) + '\n'
+                                for _, key, changes in found)
+                fd = os.open(self.log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, lines.encode('utf-8'))
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+                for pos, _, changes in found:
+                    self._apply(pos, changes)
+            else:
+                for pos, _, changes in found:
+                    self._apply(pos, changes)
+                self._rewrite()
+            return previous
+
+    def compact(self):
+        """Fold the change log into the CSV (temp file + rename) and truncate the log"""
+        if not self.log_path:
+            return False
+        with self._lock, self._file_lock:
+            self._refresh()
+            if self._log_size() == 0:
+                return False
+            self._rewrite()
+            # A crash before this truncate only means the entries are replayed again
+            with open(self.log_path, 'w') as f:
+                f.flush()
+                os.fsync(f.fileno())
+            self._log_offset = 0
+            return True
+
+    def _rewrite(self):
+        """Replace the file with the in-memory table (temp file + rename). Caller holds both locks."""
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+            self._df.to_csv(f, index=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._file_columns = list(self._df.columns)
+        self._stat = self._file_stat()
+
+    def start_compactor(self, max_bytes=1024 * 1024, max_age=60, interval=5):
+        """Compact in a daemon thread once the log exceeds max_bytes or is older than max_age seconds"""
+        if not self.log_path or self._compactor:
+            return
+
+        def run():
+            last = time.monotonic()
+            while not self._stop_compactor.wait(interval):
+                size = self._log_size()
+                if size >= max_bytes or (size and time.monotonic() - last >= max_age):
+                    try:
+                        self.compact()
+                    except Exception as e:
+                        print(f"Error compacting {self.path}: {e}")
+                    last = time.monotonic()
+
+        self._compactor = threading.Thread(target=run, name=f"compactor:{os.path.basename(self.path)}",
+                                           daemon=True)
+        self._compactor.start()
+
+    def stop_compactor(self):
+        if self._compactor:
+            self._stop_compactor.set()
+            self._compactor.join()
+            self._compactor = None
+            self._stop_compactor.clear()
+
+
+class CsvStore:
+    """Process-wide cache of the admissions CSV tables"""
+
+    table_class = CsvTable
+    suffix = '.csv'
+
+    def __init__(self, base_dir):
+        def table(name, **kwargs):
+            return self.table_class(os.path.join(base_dir, name + self.suffix), **kwargs)
+
+        # IDs are kept as strings so '0'-prefixed or numeric-looking values never change type
+        self.users = table('users', unique=['email', 'user_id'],
+                           dtype={'user_id': str, 'email': str, 'password_hash': str})
+        self.applicants = table('applicants', unique=['applicant_id'], multi=['user_id'],
+                                dtype={'applicant_id': str, 'user_id': str},
+                                read_kwargs={'on_bad_lines': 'skip'})
+        self.applications = table('applications', unique=['application_id'], multi=['applicant_id'],
+                                  dtype={'application_id': str, 'applicant_id': str, 'program_id': str,
+                                         'status': str, 'sop_text': str, 'admin_comments': str,
+                                         'row_version': 'Int64'},
+                                  parse_dates=['submission_date', 'updated_at'], log_key='application_id')
+        self.programs = table('programs', unique=['program_id'], dtype={'program_id': str})
+        self.roles = table('roles', unique=['role_id'])
+        self.age_ranges = table('age_ranges', unique=['range_id'])
+        self.academic_profile = table('academic_profile', unique=['profile_id'], multi=['applicant_id'],
+                                      dtype={'profile_id': str, 'applicant_id': str})
+        self.student_achievements = table('student_achievements', unique=['id'], multi=['applicant_id'],
+                                          dtype={'id': str, 'applicant_id': str})
@@ -54,6 +54,10 @@ CREATE TABLE applications (
     fees_paid BIT,
     sop_text NVARCHAR(MAX),
     admin_comments NVARCHAR(MAX),
+    -- Last status change or submission time (migration 3); NULL means unchanged since submission_date
+    updated_at DATETIME2(3) NULL,
+    -- Version of the row's latest change (migration 4, the change feed)
+    row_version ROWVERSION,
     FOREIGN KEY (applicant_id) REFERENCES applicants(applicant_id),
     FOREIGN KEY (program_id) REFERENCES programs(program_id)
 );
@@ -74,4 +78,24 @@ CREATE TABLE student_achievements (
     achievement_name NVARCHAR(200),
     date_awarded DATE,
     FOREIGN KEY (applicant_id) REFERENCES applicants(applicant_id)
-);
\ No newline at end of file
+);
+
+-- Change feed: one row per submission or status change (migration 4 adds its indexes)
+CREATE TABLE application_events (
+    event_id BIGINT IDENTITY(1,1) PRIMARY KEY,
+    row_version ROWVERSION,
+    application_id NVARCHAR(20) NOT NULL,
+    event_type NVARCHAR(20) NOT NULL,
+    old_status NVARCHAR(20) NULL,
+    new_status NVARCHAR(20) NULL,
+    program_id NVARCHAR(10) NULL,
+    occurred_at DATETIME2(3) NOT NULL
+);
+
+-- ID Sequences
+-- The app reserves blocks from these with sp_sequence_get_range (see id_allocator.py).
+-- migrate.sql restarts them past the highest imported IDs.
+CREATE SEQUENCE seq_user_id AS BIGINT START WITH 1001 INCREMENT BY 1;
+CREATE SEQUENCE seq_applicant_id AS BIGINT START WITH 5001 INCREMENT BY 1;
+CREATE SEQUENCE seq_application_id AS BIGINT START WITH 9001 INCREMENT BY 1;
+CREATE SEQUENCE seq_profile_id AS BIGINT START WITH 1001 INCREMENT BY 1;
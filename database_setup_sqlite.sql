@@ -0,0 +1,95 @@
+-- SQLite version of database_setup.sql
+-- Used as a local stand-in for SQL Server (benchmarks, tests, loader dry runs).
+
+-- Lookup Tables
+CREATE TABLE IF NOT EXISTS roles (
+    role_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS age_ranges (
+    range_id INTEGER PRIMARY KEY,
+    label TEXT NOT NULL,
+    min INTEGER NOT NULL,
+    max INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS programs (
+    program_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    dept TEXT NOT NULL,
+    median_days INTEGER
+);
+
+-- User Tables
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    email TEXT NOT NULL,
+    password_hash TEXT NOT NULL,
+    role_id INTEGER NOT NULL,
+    created_at TEXT,
+    FOREIGN KEY (role_id) REFERENCES roles(role_id)
+);
+
+CREATE TABLE IF NOT EXISTS applicants (
+    applicant_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    first_name TEXT NOT NULL,
+    last_name TEXT NOT NULL,
+    dob TEXT,
+    age_range_id INTEGER,
+    gender TEXT,
+    country TEXT,
+    city TEXT,
+    is_first_generation INTEGER,
+    FOREIGN KEY (user_id) REFERENCES users(user_id),
+    FOREIGN KEY (age_range_id) REFERENCES age_ranges(range_id)
+);
+
+-- Fact Table
+CREATE TABLE IF NOT EXISTS applications (
+    application_id TEXT PRIMARY KEY,
+    applicant_id TEXT NOT NULL,
+    program_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    submission_date TEXT,
+    days_to_submit INTEGER,
+    fees_paid INTEGER,
+    sop_text TEXT,
+    admin_comments TEXT,
+    -- Last status change or submission time (migration 3); NULL means unchanged since submission_date
+    updated_at TEXT,
+    -- Version of the row's latest change (migration 4, the change feed)
+    row_version INTEGER,
+    FOREIGN KEY (applicant_id) REFERENCES applicants(applicant_id),
+    FOREIGN KEY (program_id) REFERENCES programs(program_id)
+);
+
+-- Related Tables
+CREATE TABLE IF NOT EXISTS academic_profile (
+    profile_id TEXT PRIMARY KEY,
+    applicant_id TEXT NOT NULL,
+    high_school_gpa REAL,
+    sat_score INTEGER,
+    scholarship_requested INTEGER,
+    FOREIGN KEY (applicant_id) REFERENCES applicants(applicant_id)
+);
+
+CREATE TABLE IF NOT EXISTS student_achievements (
+    id TEXT PRIMARY KEY,
+    applicant_id TEXT NOT NULL,
+    achievement_name TEXT,
+    date_awarded TEXT,
+    FOREIGN KEY (applicant_id) REFERENCES applicants(applicant_id)
+);
+
+-- Change feed: one row per submission or status change (migration 4 adds its index)
+CREATE TABLE IF NOT EXISTS application_events (
+    version INTEGER PRIMARY KEY AUTOINCREMENT,
+    application_id TEXT NOT NULL,
+    event_type TEXT NOT NULL,
+    old_status TEXT,
+    new_status TEXT,
+    program_id TEXT,
+    occurred_at TEXT NOT NULL
+);
@@ -0,0 +1,225 @@
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available before the checkout timeout"""
+
+
+class ConnectionPool:
+    """Thread-safe pool of DB-API connections with health checks and idle eviction"""
+
+    def __init__(self, connect, min_size=1, max_size=10, timeout=30,
+                 max_idle=300, health_check_query="SELECT 1", check_after=5):
+        self._connect = connect
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size, self.min_size)
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.health_check_query = health_check_query
+        # Connections returned within this many seconds skip the health check
+        self.check_after = check_after
+
+        self._lock = threading.Condition()
+        self._idle = deque()  # (connection, last_used) pairs, most recent on the right
+        self._in_use = 0
+
+        # Counters for sizing the pool
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+        self._created = 0
+        self._discarded = 0
+        self._peak_in_use = 0
+
+    # --- internal helpers ---
+
+    def _open(self):
+        conn = self._connect()
+        with self._lock:
+            self._created += 1
+        return conn
+
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._discarded += 1
+
+    def _is_healthy(self, conn):
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self.health_check_query)
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except Exception as e:
+            print(f"Pool health check failed: {e}")
+            return False
+
+    def _evict_idle(self):
+        """Drop connections idle longer than max_idle, keeping min_size open. Caller holds the lock."""
+        if not self.max_idle:
+            return []
+        now = time.monotonic()
+        evicted = []
+        # Oldest connections are on the left
+        while self._idle and len(self._idle) + self._in_use > self.min_size:
+            conn, last_used = self._idle[0]
+            if now - last_used < self.max_idle:
+                break
+            self._idle.popleft()
+            evicted.append(conn)
+        return evicted
+
+    # --- public API ---
+
+    def prefill(self):
+        """Open connections until min_size is reached"""
+        while True:
+            with self._lock:
+                if len(self._idle) + self._in_use >= self.min_size:
+                    return
+                self._in_use += 1
+            try:
+                conn = self._open()
+            except Exception:
+                with self._lock:
+                    self._in_use -= 1
+                    self._lock.notify()
+                raise
+            with self._lock:
+                self._in_use -= 1
+                self._idle.append((conn, time.monotonic()))
+                self._lock.notify()
+
+    def acquire(self, timeout=None):
+        """Borrow a connection, waiting up to `timeout` seconds if the pool is exhausted"""
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        waited = False
+
+        while True:
+            candidate = None
+            create = False
+            with self._lock:
+                evicted = self._evict_idle()
+                while not self._idle and self._in_use >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(f"No connection available after {timeout}s")
+                    waited = True
+                    self._lock.wait(remaining)
+
+                if self._idle:
+                    candidate, last_used = self._idle.pop()
+                else:
+                    create = True
+                    last_used = None
+                # Reserve the slot before doing any I/O outside the lock
+                self._in_use += 1
+
+            for conn in evicted:
+                self._close_quietly(conn)
+
+            try:
+                if create:
+                    candidate = self._open()
+                elif time.monotonic() - last_used >= self.check_after and not self._is_healthy(candidate):
+                    self._close_quietly(candidate)
+                    with self._lock:
+                        self._in_use -= 1
+                        self._lock.notify()
+                    continue
+            except Exception:
+                with self._lock:
+                    self._in_use -= 1
+                    self._lock.notify()
+                raise
+
+            wait_time = time.monotonic() - start
+            with self._lock:
+                self._checkouts += 1
+                if waited:
+                    self._waits += 1
+                self._wait_time_total += wait_time
+                self._wait_time_max = max(self._wait_time_max, wait_time)
+                self._peak_in_use = max(self._peak_in_use, self._in_use)
+            return candidate
+
+    def release(self, conn, discard=False):
+        """Return a borrowed connection; broken connections should be discarded"""
+        if not discard:
+            try:
+                # Never hand an open transaction to the next borrower
+                conn.rollback()
+            except Exception:
+                discard = True
+
+        if discard:
+            self._close_quietly(conn)
+            with self._lock:
+                self._in_use -= 1
+                self._lock.notify()
+            return
+
+        with self._lock:
+            self._in_use -= 1
+            self._idle.append((conn, time.monotonic()))
+            evicted = self._evict_idle()
+            self._lock.notify()
+        for old in evicted:
+            self._close_quietly(old)
+
+    def close(self):
+        """Close every idle connection; borrowed ones are closed when released with discard=True"""
+        with self._lock:
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+        for conn in idle:
+            self._close_quietly(conn)
+
+    def stats(self):
+        """Snapshot of pool usage for capacity planning"""
+        with self._lock:
+            checkouts = self._checkouts
+            return {
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'peak_in_use': self._peak_in_use,
+                'checkouts': checkouts,
+                'waits': self._waits,
+                'timeouts': self._timeouts,
+                'wait_time_avg_ms': round(self._wait_time_total / checkouts * 1000, 3) if checkouts else 0.0,
+                'wait_time_max_ms': round(self._wait_time_max * 1000, 3),
+                'created': self._created,
+                'discarded': self._discarded,
+            }
+
+
+def init_app(app, pool):
+    """Borrow one pooled connection per app context and return it on teardown"""
+    from flask import g
+
+    def get_connection():
+        if '_db_conn' not in g:
+            g._db_conn = pool.acquire()
+        return g._db_conn
+
+    @app.teardown_appcontext
+    def _return_connection(exc):
+        conn = g.pop('_db_conn', None)
+        if conn is not None:
+            pool.release(conn)
+
+    app.extensions['db_pool'] = pool
+    return get_connection
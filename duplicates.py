@@ -0,0 +1,329 @@
+"""
+Near-duplicate statement of purpose detection with MinHash and LSH.
+
+Each SOP becomes the set of its SHINGLE_WORDS-word shingles. A MinHash
+signature of NUM_PERM values estimates the Jaccard similarity of two sets as
+the share of positions where their signatures agree. Signatures are cut into
+BANDS bands of ROWS values; SOPs that share a whole band are candidates, and
+candidates agreeing on at least THRESHOLD of the values are linked. Clusters
+are the connected components of those links.
+
+Only candidates are compared, so adding an application costs one signature
+and a few bucket lookups instead of a pass over every other SOP. SOPs with
+identical signatures (copies, untouched templates) share one entry, so a
+template used thousands of times is compared once.
+
+SopDuplicates builds the index once (in the background after start(), else on
+first read) and then follows the change feed (Repository.changes_since):
+applications submitted since, by any process, are added on the next read.
+
+    python duplicates.py report --sqlite admissions.db
+    python duplicates.py report --sqlite admissions.db --check 2000   # vs comparing all pairs of 2000 SOPs
+"""
+import argparse
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+from dotenv import load_dotenv
+
+# Words per shingle
+SHINGLE_WORDS = 5
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+# Estimated Jaccard similarity at which two SOPs count as near-duplicates.
+# With 16 bands of 8 rows, a pair at 0.8 becomes a candidate 95% of the time, one at 0.5 6%.
+THRESHOLD = 0.8
+# Entries kept per LSH bucket. A bucket only fills up inside a large cluster of near-duplicates,
+# where matching any of its entries already links a new SOP to the cluster; the cap keeps
+# each insert at most BANDS * BUCKET_SIZE comparisons however large clusters grow.
+BUCKET_SIZE = 64
+# Most similar applications listed per application
+MAX_SIMILAR = 10
+
+_WORD = re.compile(r'\w+')
+# Fixed seed: every process draws the same hash functions, so all workers flag the same pairs
+_rng = np.random.default_rng(20240601)
+_WORD_MULTIPLIERS = _rng.integers(1, 2 ** 63, SHINGLE_WORDS, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+# Multiply-shift hashing: (a * x + b) >> 32 with odd a, in wrapping 64-bit arithmetic
+_PERM_A = _rng.integers(1, 2 ** 63, NUM_PERM, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_PERM_B = _rng.integers(0, 2 ** 63, NUM_PERM, dtype=np.uint64)
+
+
+def shingles(text):
+    """Distinct 64-bit hashes of the SHINGLE_WORDS-word windows of a text (the whole text if shorter)"""
+    words = _WORD.findall((text or '').lower())
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+    hashes = np.fromiter(map(zlib.crc32, map(str.encode, words)), dtype=np.uint64, count=len(words))
+    width = min(SHINGLE_WORDS, len(words))
+    count = len(words) - width + 1
+    windows = np.zeros(count, dtype=np.uint64)
+    for offset in range(width):
+        windows += hashes[offset:offset + count] * _WORD_MULTIPLIERS[offset]
+    return np.unique(windows)
+
+
+def signatures(shingle_sets):
+    """MinHash signatures (len(shingle_sets) x NUM_PERM, uint32) of non-empty shingle sets"""
+    values = np.concatenate(shingle_sets)
+    offsets = np.cumsum([0] + [len(shingle_set) for shingle_set in shingle_sets[:-1]])
+    result = np.empty((len(shingle_sets), NUM_PERM), dtype=np.uint32)
+    # One hash function at a time over every shingle of the batch: 1-D reduceat is the fast path
+    for perm in range(NUM_PERM):
+        hashed = (values * _PERM_A[perm] + _PERM_B[perm]) >> np.uint64(32)
+        result[:, perm] = np.minimum.reduceat(hashed, offsets)
+    return result
+
+
+class SopDuplicates:
+    """Near-duplicate SOP clusters over all applications, kept current from the change feed"""
+
+    def __init__(self, load_sops, data_version, changes_since):
+        # load_sops(application_ids=None) -> iterable of [(application_id, sop_text)] batches (None: all)
+        self._load_sops = load_sops
+        self._data_version = data_version
+        self._changes_since = changes_since
+        self._lock = threading.Lock()
+        self._builder = None
+        self._reset()
+
+    def _reset(self):
+        self._version = None
+        # One entry per distinct signature: its applications, union-find parent and LSH buckets
+        self._matrix = np.empty((1024, NUM_PERM), dtype=np.uint32)
+        self._entry_of_signature = {}
+        self._entry_of_app = {}
+        self._members = []
+        self._parent = []
+        # root entry -> entries of its cluster, for clusters of more than one entry
+        self._clusters = {}
+        self._buckets = [{} for _ in range(BANDS)]
+
+    # --- index ---
+
+    def _find(self, entry):
+        parent = self._parent
+        while parent[entry] != entry:
+            parent[entry] = parent[parent[entry]]
+            entry = parent[entry]
+        return entry
+
+    def _union(self, a, b):
+        a, b = self._find(a), self._find(b)
+        if a == b:
+            return
+        entries_a = self._clusters.pop(a, [a])
+        entries_b = self._clusters.pop(b, [b])
+        if len(entries_a) < len(entries_b):
+            a, b, entries_a, entries_b = b, a, entries_b, entries_a
+        self._parent[b] = a
+        entries_a.extend(entries_b)
+        self._clusters[a] = entries_a
+
+    def _new_entry(self, signature):
+        entry = len(self._members)
+        if entry == len(self._matrix):
+            self._matrix = np.concatenate([self._matrix, np.empty_like(self._matrix)])
+        self._matrix[entry] = signature
+        self._members.append([])
+        self._parent.append(entry)
+
+        bands = [signature[band * ROWS:(band + 1) * ROWS].tobytes() for band in range(BANDS)]
+        candidates = set()
+        for buckets, key in zip(self._buckets, bands):
+            candidates.update(buckets.get(key, ()))
+        if candidates:
+            candidates = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            agreement = (self._matrix[candidates] == signature).mean(axis=1)
+            for root in {self._find(int(other)) for other in candidates[agreement >= THRESHOLD]}:
+                self._union(entry, root)
+        for buckets, key in zip(self._buckets, bands):
+            bucket = buckets.setdefault(key, [])
+            if len(bucket) < BUCKET_SIZE:
+                bucket.append(entry)
+        return entry
+
+    def add(self, rows):
+        """Index [(application_id, sop_text)]; applications already indexed or without text are skipped"""
+        # Identical texts are shingled and signed once per batch
+        by_text = {}
+        for app_id, text in rows:
+            if text and app_id not in self._entry_of_app:
+                by_text.setdefault(text, []).append(app_id)
+        texts = [(shingles(text), app_ids) for text, app_ids in by_text.items()]
+        texts = [(shingle_set, app_ids) for shingle_set, app_ids in texts if len(shingle_set)]
+        if not texts:
+            return
+        for (_, app_ids), signature in zip(texts, signatures([shingle_set for shingle_set, _ in texts])):
+            key = signature.tobytes()
+            entry = self._entry_of_signature.get(key)
+            if entry is None:
+                entry = self._entry_of_signature[key] = self._new_entry(signature)
+            for app_id in app_ids:
+                if app_id not in self._entry_of_app:
+                    self._members[entry].append(app_id)
+                    self._entry_of_app[app_id] = entry
+
+    def _sync(self):
+        """Build the index, or add the applications submitted since it was last read. Caller holds the lock."""
+        version = self._data_version()
+        if self._version is None:
+            # Version first: anything submitted while loading is picked up again (and skipped) next time
+            self._reset()
+            for batch in self._load_sops():
+                self.add(batch)
+            self._version = version
+            return
+        if version == self._version:
+            return
+        submitted = []
+        while True:
+            events = self._changes_since(self._version, 1000)
+            if not events:
+                break
+            submitted.extend(event['application_id'] for event in events if event['event'] == 'submitted')
+            self._version = events[-1]['version']
+        for start in range(0, len(submitted), 500):
+            for batch in self._load_sops(submitted[start:start + 500]):
+                self.add(batch)
+
+    def start(self, run=None):
+        """Build the index in a background thread; run(build) may wrap it (e.g. in an app context)"""
+        if self._builder is not None:
+            return
+        self._builder = threading.Thread(target=run or (lambda build: build()), args=(self.stats,),
+                                         name='sop-duplicates', daemon=True)
+        self._builder.start()
+
+    def building(self):
+        """True while the background build runs; reads would wait for it"""
+        return self._version is None and self._builder is not None and self._builder.is_alive()
+
+    # --- reads ---
+
+    def _cluster_entries(self, entry):
+        root = self._find(entry)
+        return self._clusters.get(root, [root])
+
+    def flags(self, app_id):
+        """Near-duplicates of one application's SOP: {'duplicates': count, 'similar': [...] best first}"""
+        with self._lock:
+            self._sync()
+            entry = self._entry_of_app.get(app_id)
+            if entry is None:
+                return {'application_id': app_id, 'indexed': False, 'duplicates': 0, 'similar': []}
+            entries = self._cluster_entries(entry)
+            agreement = (self._matrix[entries] == self._matrix[entry]).mean(axis=1)
+            similar = [(float(similarity), other)
+                       for similarity, members in zip(agreement, (self._members[e] for e in entries))
+                       for other in members if other != app_id]
+        similar.sort(key=lambda pair: (-pair[0], pair[1]))
+        return {
+            'application_id': app_id,
+            'indexed': True,
+            'duplicates': len(similar),
+            'similar': [{'application_id': other, 'similarity': round(similarity, 3)}
+                        for similarity, other in similar[:MAX_SIMILAR]],
+        }
+
+    def clusters(self, min_size=2):
+        """[{'size', 'application_ids'}] of every cluster with at least min_size applications, largest first"""
+        with self._lock:
+            self._sync()
+            roots = {self._find(entry) for entry, members in enumerate(self._members) if len(members) > 1}
+            roots.update(self._clusters)
+            result = []
+            for root in roots:
+                app_ids = sorted(app_id for entry in self._clusters.get(root, [root])
+                                 for app_id in self._members[entry])
+                if len(app_ids) >= min_size:
+                    result.append({'size': len(app_ids), 'application_ids': app_ids})
+        result.sort(key=lambda cluster: (-cluster['size'], cluster['application_ids'][0]))
+        return result
+
+    def stats(self):
+        with self._lock:
+            self._sync()
+            return {'version': self._version, 'applications': len(self._entry_of_app),
+                    'distinct_signatures': len(self._members)}
+
+    def invalidate(self):
+        """Drop the index; the next read rebuilds it"""
+        with self._lock:
+            self._reset()
+
+
+def _jaccard(a, b):
+    return len(np.intersect1d(a, b, assume_unique=True)) / len(np.union1d(a, b))
+
+
+def check(rows):
+    """(recall, precision, true pairs) of the clusters against comparing every pair of rows exactly.
+
+    A pair counts as found when both SOPs are in the same cluster, so links chained
+    through a third SOP lower precision.
+    """
+    index = SopDuplicates(lambda application_ids=None: [rows], lambda: 0, lambda version, limit: [])
+    found = set()
+    for cluster in index.clusters():
+        members = cluster['application_ids']
+        found.update((a, b) for i, a in enumerate(members) for b in members[i + 1:])
+
+    shingled = [(app_id, shingles(text)) for app_id, text in sorted(rows)]
+    shingled = [(app_id, shingle_set) for app_id, shingle_set in shingled if len(shingle_set)]
+    truth = set()
+    for i, (app_a, set_a) in enumerate(shingled):
+        for app_b, set_b in shingled[i + 1:]:
+            if _jaccard(set_a, set_b) >= THRESHOLD:
+                truth.add((app_a, app_b))
+    recall = len(truth & found) / len(truth) if truth else 1.0
+    precision = len(truth & found) / len(found) if found else 1.0
+    return recall, precision, len(truth)
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Report near-duplicate SOP clusters")
+    parser.add_argument('command', choices=['report'])
+    parser.add_argument('--sqlite', help="SQLite database file instead of SQL Server")
+    parser.add_argument('--dsn', help="ODBC connection string (defaults to DB_CONNECTION_STRING)")
+    parser.add_argument('--top', type=int, default=10, help="Largest clusters to list")
+    parser.add_argument('--check', type=int, default=0,
+                        help="Also compare every pair of the first N SOPs and report LSH recall/precision")
+    args = parser.parse_args()
+
+    import migrations
+    from sql_repository import SqlRepository
+    conn, dialect = migrations.connect(args.sqlite, args.dsn)
+    repo = SqlRepository(lambda: conn, dialect)
+    try:
+        index = SopDuplicates(repo.sop_texts, repo.data_version, repo.changes_since)
+        started = time.perf_counter()
+        stats = index.stats()
+        print(f"Indexed {stats['applications']} SOPs ({stats['distinct_signatures']} distinct signatures) "
+              f"in {time.perf_counter() - started:.2f}s")
+        clusters = index.clusters()
+        print(f"{len(clusters)} clusters, {sum(c['size'] for c in clusters)} applications flagged")
+        for cluster in clusters[:args.top]:
+            print(f"  {cluster['size']:>7}  {', '.join(cluster['application_ids'][:5])}"
+                  f"{' ...' if cluster['size'] > 5 else ''}")
+        if args.check:
+            rows = []
+            for batch in repo.sop_texts():
+                rows.extend(batch)
+                if len(rows) >= args.check:
+                    break
+            started = time.perf_counter()
+            recall, precision, pairs = check(rows[:args.check])
+            print(f"All pairs of {args.check}: {pairs} pairs at Jaccard >= {THRESHOLD}; LSH recall {recall:.3f}, "
+                  f"precision {precision:.3f} ({time.perf_counter() - started:.1f}s)")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
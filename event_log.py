@@ -0,0 +1,94 @@
+import bisect
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+from file_lock import FileLock
+
+
+class EventLog:
+    """Append-only JSON-lines change feed with monotonic versions.
+
+    The CSV backend's counterpart of the application_events table. Writers
+    hold the file lock from reserving a version until the line is written,
+    so versions in the file only ever increase and no reader can see a
+    version before an earlier one is on disk. Every process keeps a
+    (version -> byte offset) index of the file and catches up on lines
+    other processes appended, so since() seeks straight to the first entry
+    it needs instead of re-reading the whole log.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(path + '.lock')
+        self._versions = []
+        self._offsets = []
+        self._size = 0
+
+    def _sync(self):
+        """Index lines appended since the last call (by any process). Caller holds the lock."""
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            size = 0
+        if size <= self._size:
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(self._size)
+            data = f.read(size - self._size)
+        # A line still being written by another process is picked up next time
+        offset = self._size
+        for line in data[:data.rfind(b'\n') + 1].splitlines(keepends=True):
+            if line.strip():
+                self._versions.append(json.loads(line)['version'])
+                self._offsets.append(offset)
+            offset += len(line)
+        self._size = offset
+
+    def last_version(self):
+        with self._lock:
+            self._sync()
+            return self._versions[-1] if self._versions else 0
+
+    @contextmanager
+    def writing(self):
+        """Hold the writer lock; inside, next_version() and write() allocate and record versions"""
+        with self._lock, self._file_lock:
+            self._sync()
+            yield self
+
+    def next_version(self):
+        """First version not used yet. Call inside writing()."""
+        return (self._versions[-1] if self._versions else 0) + 1
+
+    def write(self, events):
+        """Append events (dicts with increasing 'version' keys) with one fsync. Call inside writing()."""
+        if not events:
+            return
+        lines = [(json.dumps(event, default=str) + '\n').encode('utf-8') for event in events]
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, b''.join(lines))
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        for event, line in zip(events, lines):
+            self._versions.append(event['version'])
+            self._offsets.append(self._size)
+            self._size += len(line)
+
+    def since(self, version, limit=500):
+        """Up to `limit` events with a version above `version`, oldest first"""
+        with self._lock:
+            self._sync()
+            start = bisect.bisect_right(self._versions, version)
+            if start >= len(self._versions):
+                return []
+            stop = min(start + limit, len(self._versions))
+            end = self._offsets[stop] if stop < len(self._offsets) else self._size
+            with open(self.path, 'rb') as f:
+                f.seek(self._offsets[start])
+                data = f.read(end - self._offsets[start])
+        return [json.loads(line) for line in data.splitlines() if line.strip()]
@@ -0,0 +1,212 @@
+"""
+Stream the application master list as CSV, NDJSON or Parquet (Power BI refresh feed).
+
+    python export.py --format csv --out applications.csv
+    python export.py --format parquet --out applications.parquet --since 2026-10-01T00:00:00
+    python export.py --format ndjson --out delta.ndjson --state export_state.json
+
+Rows come from the configured repository (DATA_BACKEND, see repository.py)
+in batches, so memory use does not grow with the number of rows. With
+--since (or ?since= on /export/applications) only applications submitted or
+changed at or after that time are written. --state remembers the watermark
+of the last successful run and uses it as the next --since.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+from datetime import date, datetime
+
+# format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+# (column, kind); the order of the exported columns
+EXPORT_COLUMNS = [
+    ('application_id', 'str'), ('applicant_id', 'str'), ('status', 'str'), ('submission_date', 'date'),
+    ('days_to_submit', 'int'), ('fees_paid', 'bool'), ('updated_at', 'datetime'), ('user_id', 'str'),
+    ('first_name', 'str'), ('last_name', 'str'), ('dob', 'date'), ('gender', 'str'), ('country', 'str'),
+    ('city', 'str'), ('is_first_generation', 'bool'), ('program_id', 'str'), ('program_name', 'str'),
+    ('dept', 'str'), ('email', 'str'),
+]
+
+BOOLEANS = {'true': True, 'false': False, '1': True, '0': False}
+
+
+def parse_since(value):
+    """ISO date or timestamp -> datetime; None for empty, ValueError when malformed"""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    # Stored change times are naive local times
+    return parsed.astimezone().replace(tzinfo=None) if parsed.tzinfo else parsed
+
+
+def _to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _to_datetime(value):
+    if hasattr(value, 'to_pydatetime'):
+        return value.to_pydatetime()
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    return datetime.fromisoformat(str(value))
+
+
+def _to_bool(value):
+    if isinstance(value, str):
+        return BOOLEANS.get(value.strip().lower())
+    return bool(value)
+
+
+CONVERTERS = {'str': str, 'int': int, 'date': _to_date, 'datetime': _to_datetime, 'bool': _to_bool}
+
+
+def normalize(batch):
+    """Rows from any backend -> tuples of str/int/bool/date/datetime/None in EXPORT_COLUMNS order"""
+    converters = [(name, CONVERTERS[kind]) for name, kind in EXPORT_COLUMNS]
+    rows = []
+    for row in batch:
+        values = []
+        for name, convert in converters:
+            value = row.get(name)
+            values.append(None if value is None or value == '' else convert(value))
+        rows.append(tuple(values))
+    return rows
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ', timespec='milliseconds')
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def csv_chunks(batches):
+    names = [name for name, _ in EXPORT_COLUMNS]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    for batch in batches:
+        writer.writerows([_text(v) for v in row] for row in normalize(batch))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only when there were no rows
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def ndjson_chunks(batches):
+    names = [name for name, _ in EXPORT_COLUMNS]
+    for batch in batches:
+        yield ''.join(json.dumps(dict(zip(names, [_text(v) if v is not None else None for v in row]))) + '\n'
+                      for row in normalize(batch))
+
+
+class _Sink(io.RawIOBase):
+    """Write-only file that hands back what was written since the last drain()"""
+
+    def __init__(self):
+        self._parts = []
+        self._size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._size += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._size
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def parquet_chunks(batches):
+    """One row group per batch, written out as soon as it is encoded"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {'str': pa.string(), 'int': pa.int32(), 'bool': pa.bool_(), 'date': pa.date32(),
+             'datetime': pa.timestamp('ms')}
+    schema = pa.schema([(name, types[kind]) for name, kind in EXPORT_COLUMNS])
+    sink = _Sink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+    for batch in batches:
+        columns = list(zip(*normalize(batch))) or [[] for _ in EXPORT_COLUMNS]
+        writer.write_table(pa.Table.from_arrays([pa.array(values, type=field.type)
+                                                 for values, field in zip(columns, schema)], schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def export_chunks(batches, fmt):
+    """Encoded chunks (str for csv/ndjson, bytes for parquet) for a stream of row batches"""
+    if fmt == 'csv':
+        return csv_chunks(batches)
+    if fmt == 'ndjson':
+        return ndjson_chunks(batches)
+    if fmt == 'parquet':
+        return parquet_chunks(batches)
+    raise ValueError(f"Unknown export format {fmt!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the application master list")
+    parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='csv')
+    parser.add_argument('--out', help="Output file (default: applications.<ext>)")
+    parser.add_argument('--since', help="Only rows submitted or changed at/after this ISO date or timestamp")
+    parser.add_argument('--state', help="JSON file holding the watermark of the last export (incremental runs)")
+    parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    since = parse_since(args.since)
+    if since is None and args.state and os.path.exists(args.state):
+        with open(args.state) as f:
+            since = parse_since(json.load(f).get('watermark'))
+
+    # Same repository (DATA_BACKEND, DATA_DIR, ...) as the web app
+    from app import app, repo
+
+    out = args.out or f"applications.{EXPORT_FORMATS[args.format][1]}"
+    # Changes made while the export runs are picked up again by the next run
+    watermark = datetime.now()
+    mode = 'wb' if args.format == 'parquet' else 'w'
+    tmp_path = out + '.tmp'
+    with app.app_context():
+        with open(tmp_path, mode, **({} if mode == 'wb' else {'newline': '', 'encoding': 'utf-8'})) as f:
+            for chunk in export_chunks(repo.export_applications(since=since, batch_size=args.batch_size),
+                                       args.format):
+                f.write(chunk)
+    os.replace(tmp_path, out)
+
+    if args.state:
+        with open(args.state, 'w') as f:
+            json.dump({'watermark': watermark.isoformat(timespec='milliseconds'),
+                       'since': since.isoformat(timespec='milliseconds') if since else None}, f)
+    print(f"Exported to {out}" + (f" (changes since {since})" if since else ""))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,15 @@
-import pandas as pd
+import argparse
+import os
 import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
 from faker import Faker
-from datetime import date, timedelta
+from datetime import date
 from datetime import datetime as dt_module
-import uuid
-
-fake = Faker()
-Faker.seed(42)
 
 # --- 1. CONFIGURATION: INDIAN COLLEGE REALISTIC TRENDS ---
 # Indian colleges typically see applications throughout the year with peaks during admission seasons
@@ -55,8 +58,8 @@ ACHIEVEMENT_TYPES = [
 ]
 
 # --- 2. REALISTIC SOP GENERATOR ---
-def generate_sop(program_name, achievement):
-    """Stitches together a coherent, semi-unique SOP based on context."""
+def sop_sentences(program_name, achievement):
+    """Opener, middle and closer sentence choices for one program/achievement"""
     
     openers = [
         f"I have always been deeply fascinated by the world of {program_name}.",
@@ -79,186 +82,406 @@ def generate_sop(program_name, achievement):
         "I hope to bring my unique perspective and dedication to your upcoming cohort."
     ]
     
-    return f"{random.choice(openers)} {random.choice(middles)} {random.choice(closers)}"
+    return openers, middles, closers
 
 # --- 3. HELPER FUNCTIONS ---
-def get_age_range_id(dob, current_year):
-    age = current_year - dob.year
-    for r in AGE_RANGES:
-        if r["min"] <= age <= r["max"]:
-            return r["range_id"]
-    return 5
+# Indian college admission pattern:
+# - Jan-Feb: High (Board exam results + application season start)
+# - Mar-Apr: Peak (Main admission season)
+# - May-Jun: Very High (Summer admissions + late applications)
+# - Jul-Aug: Medium (Monsoon semester intake)
+# - Sep-Oct: Low (Academic year running)
+# - Nov-Dec: Medium (Early applications for next cycle)
+MONTH_WEIGHTS = [0.12, 0.12, 0.15, 0.16, 0.14, 0.13, 0.06, 0.05, 0.03, 0.02, 0.04, 0.08]
+DAYS_IN_MONTH = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
 
 def generate_seasonal_date(year):
+    """Single submission date following the seasonal month weights"""
+    month = random.choices(range(1, 13), weights=MONTH_WEIGHTS)[0]
+    day = random.randint(1, DAYS_IN_MONTH[month - 1])
+    return date(year, month, day)
+
+def stats_for_year(year):
+    """Configured stats, or those of the nearest configured year for years outside YEARLY_STATS"""
+    if year in YEARLY_STATS:
+        return YEARLY_STATS[year]
+    nearest = min(YEARLY_STATS, key=lambda y: abs(y - year))
+    return YEARLY_STATS[nearest]
+
+def parse_years(spec):
+    """'2017-2026', '2020,2022' or '2024' -> sorted list of years"""
+    if not spec:
+        return sorted(YEARLY_STATS)
+    years = set()
+    for part in spec.split(','):
+        if '-' in part:
+            first, last = part.split('-')
+            years.update(range(int(first), int(last) + 1))
+        else:
+            years.add(int(part))
+    return sorted(years)
+
+# --- 4. VECTORIZED GENERATION ---
+# Every column of a chunk is drawn in one NumPy call. Names, cities and email
+# domains come from pools pre-sampled with Faker, and every possible SOP is
+# pre-rendered, so no per-row Python work is needed.
+
+STATUS_GOOD = ('Enrolled', 'Accepted', 'Lost')
+GENDERS = ['Male', 'Female', 'Other']
+GENDER_WEIGHTS = [0.48, 0.48, 0.04]
+COUNTRIES = ['USA', 'India', 'China', 'France', 'UK', 'Nigeria', 'Canada']
+OPENERS, MIDDLES, CLOSERS = 4, 4, 4
+
+def build_pools(seed, size=5000):
+    """Pre-sampled Faker values shared by every chunk"""
+    fake = Faker()
+    Faker.seed(seed)
+    return {
+        "first_names": np.array([fake.first_name() for _ in range(size)], dtype=object),
+        "last_names": np.array([fake.last_name() for _ in range(size)], dtype=object),
+        "cities": np.array([fake.city() for _ in range(size)], dtype=object),
+        "email_domains": np.array(sorted({fake.free_email_domain() for _ in range(200)}), dtype=object),
+    }
+
+def build_sop_table():
+    """Every SOP sop_sentences() can stitch together, indexed [program, opener, middle slot, closer].
+
+    Only the first middle sentence mentions the achievement, so the middle axis
+    has one slot per achievement followed by the achievement-free sentences.
     """
-    Indian college admission pattern:
-    - Jan-Feb: High (Board exam results + application season start)
-    - Mar-Apr: Peak (Main admission season)
-    - May-Jun: Very High (Summer admissions + late applications)
-    - Jul-Aug: Medium (Monsoon semester intake)
-    - Sep-Oct: Low (Academic year running)
-    - Nov-Dec: Medium (Early applications for next cycle)
+    table = np.empty((len(PROGRAMS), OPENERS, len(ACHIEVEMENT_TYPES) + MIDDLES - 1, CLOSERS), dtype=object)
+    for p, program in enumerate(PROGRAMS):
+        for a, achievement in enumerate(ACHIEVEMENT_TYPES):
+            openers, middles, closers = sop_sentences(program["name"], achievement)
+            for m, middle in enumerate(middles):
+                slot = a if m == 0 else len(ACHIEVEMENT_TYPES) + m - 1
+                for o, opener in enumerate(openers):
+                    for c, closer in enumerate(closers):
+                        table[p, o, slot, c] = f"{opener} {middle} {closer}"
+    return table
+
+def uuid4_strings(rng, n):
+    """n random (version 4) UUID strings drawn from rng, so achievement IDs are reproducible"""
+    raw = rng.integers(0, 256, size=(n, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    hexes = raw.tobytes().hex()
+    return [
+        f"{h[0:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:32]}"
+        for h in (hexes[i:i + 32] for i in range(0, 32 * n, 32))
+    ]
+
+FACT_COLUMNS = {
+    "users": ["user_id", "email", "password_hash", "role_id", "created_at"],
+    "applicants": ["applicant_id", "user_id", "first_name", "last_name", "dob", "age_range_id", "gender",
+                   "country", "city", "is_first_generation"],
+    "applications": ["application_id", "applicant_id", "program_id", "status", "submission_date",
+                     "days_to_submit", "fees_paid", "sop_text", "admin_comments"],
+    "academic_profile": ["profile_id", "applicant_id", "high_school_gpa", "sat_score", "scholarship_requested"],
+    "student_achievements": ["id", "applicant_id", "achievement_name", "date_awarded"],
+}
+FACT_TABLES = list(FACT_COLUMNS)
+
+# Rows drawn from one random stream. Fixed, so --chunk-size only changes how
+# much is buffered before writing, never the generated values.
+RNG_BLOCK = 10_000
+
+def generate_block(year, stats, block, rows, ids, seed, pools, sop_table, today):
+    """Generate block number `block` of a year with `rows` planned applications.
+
+    `ids` holds the numbers the year's first row uses for (user, applicant,
+    application, profile); row i of the year gets ids + i. Each block has its
+    own random stream seeded by (seed, year, block). Rows dated in the future
+    are dropped, leaving gaps in the ID ranges just like the original generator.
     """
-    month_weights = [0.12, 0.12, 0.15, 0.16, 0.14, 0.13, 0.06, 0.05, 0.03, 0.02, 0.04, 0.08]
-    month = random.choices(range(1, 13), weights=month_weights)[0]
-    
-    if month == 2: 
-        day = random.randint(1, 28)
-    elif month in [4, 6, 9, 11]: 
-        day = random.randint(1, 30)
-    else: 
-        day = random.randint(1, 31)
-    
-    return date(year, month, day)
+    rng = np.random.default_rng([seed, year, block])
+    first_row = block * RNG_BLOCK
+    n = min(RNG_BLOCK, rows - first_row)
+    row_idx = np.arange(first_row, first_row + n)
 
-# --- 4. MAIN GENERATION LOOP ---
-users_data = []
-applicants_data = []
-applications_data = []
-academic_data = []
-achievements_data = []
+    # Status from the year's acceptance and yield rates
+    accepted = rng.random(n) < stats['accept_rate']
+    enrolled = rng.random(n) < stats['yield_rate']
+    rejected = rng.random(n) < 0.8
+    status = np.where(accepted, np.where(enrolled, 'Enrolled', 'Accepted'),
+                      np.where(rejected, 'Rejected', 'Waitlisted')).astype(object)
+    if year < 2025:
+        status[status == 'Accepted'] = 'Lost'  # Old "Accepted" offers that didn't enroll are now "Lost"
+        status[status == 'Waitlisted'] = 'Rejected'  # Old waitlists are closed
 
-# ID Counters
-g_uid, g_aid, g_app_id, g_pid = 1000, 5000, 9000, 1
+    program_idx = rng.integers(0, len(PROGRAMS), n)
 
-print("Generating Data with Realistic Indian College Trends...")
+    # Submission dates: seasonal months, or Jan 1 .. yesterday for the current year
+    if year == today.year:
+        days_since_start = (today - date(year, 1, 1)).days
+        if days_since_start <= 0:
+            return None
+        submission = np.datetime64(f"{year}-01-01") + rng.integers(0, days_since_start, n).astype('timedelta64[D]')
+    else:
+        weights = np.array(MONTH_WEIGHTS) / sum(MONTH_WEIGHTS)
+        month = rng.choice(12, size=n, p=weights)
+        day = (rng.random(n) * np.array(DAYS_IN_MONTH)[month]).astype(int)
+        month_start = np.datetime64(f"{year}-01", 'M') + month.astype('timedelta64[M]')
+        submission = month_start.astype('datetime64[D]') + day.astype('timedelta64[D]')
 
-TODAY = dt_module.now().date()
+    median_days = np.array([p["median_days"] for p in PROGRAMS])[program_idx]
+    days_to_submit = np.clip(np.trunc(rng.normal(median_days, 20)), 1, 250).astype(int)
 
-for year, stats in YEARLY_STATS.items():
-    print(f"  Processing {year}: {stats['apps']} applicants (Accept Rate: {stats['accept_rate']:.0%})")
-    
-    for _ in range(stats['apps']):
-        g_uid += 1
-        g_aid += 1
-        g_app_id += 1
-        g_pid += 1
-        
-        # Dimensions
-        user_id = f"U{g_uid}"
-        applicant_id = f"A{g_aid}"
-        
-        # Determine Status based on Year's specific rates
-        is_accepted = random.random() < stats['accept_rate']
-        
-        if is_accepted:
-            # If accepted, do they enroll? (Yield Rate)
-            is_enrolled = random.random() < stats['yield_rate']
-            status = 'Enrolled' if is_enrolled else 'Accepted'
-            if year < 2025 and status == 'Accepted': 
-                status = 'Lost'  # Old "Accepted" offers that didn't enroll are now "Lost"
-        else:
-            status = random.choices(['Rejected', 'Waitlisted'], weights=[0.8, 0.2])[0]
-            if year < 2025 and status == 'Waitlisted':
-                status = 'Rejected'  # Old waitlists are closed
-
-        # Generate Context
-        program = random.choice(PROGRAMS)
-        
-        # Generate submission date throughout the calendar year
-        submission_date = generate_seasonal_date(year)
-        
-        # For 2026, ensure we don't exceed yesterday's date
-        if year == 2026:
-            # Generate dates only from Jan 1, 2026 to yesterday
-            days_since_start = (TODAY - date(2026, 1, 1)).days
-            if days_since_start <= 0:
-                continue
-            random_day = random.randint(0, days_since_start - 1)
-            submission_date = date(2026, 1, 1) + timedelta(days=random_day)
-        
-        # Skip if submission date is in the future
-        if submission_date > TODAY:
-            continue
-        
-        # Calculate days to submit (just for tracking purposes, not tied to cycle open date)
-        days_to_submit = int(random.gauss(program["median_days"], 20))
-        days_to_submit = max(1, min(days_to_submit, 250))
-        
-        dob = fake.date_of_birth(minimum_age=17, maximum_age=28)
-        achievement_name = random.choice(ACHIEVEMENT_TYPES)
-        
-        # --- POPULATE TABLES (SQL SCHEMA FORMAT) ---
-        
-        # Users table
-        users_data.append({
-            "user_id": user_id,
-            "email": fake.unique.email(),
+    # Ages 17-28 as of today, like fake.date_of_birth(minimum_age=17, maximum_age=28)
+    today64 = np.datetime64(today)
+    dob = today64 - rng.integers(int(17 * 365.25), int(29 * 365.25), n).astype('timedelta64[D]')
+    age = year - dob.astype('datetime64[Y]').astype(int) - 1970
+    age_range_id = np.full(n, 5)
+    for r in reversed(AGE_RANGES):
+        age_range_id[(age >= r["min"]) & (age <= r["max"])] = r["range_id"]
+
+    achievement_idx = rng.integers(0, len(ACHIEVEMENT_TYPES), n)
+    first_names = pools["first_names"][rng.integers(0, len(pools["first_names"]), n)]
+    last_names = pools["last_names"][rng.integers(0, len(pools["last_names"]), n)]
+    cities = pools["cities"][rng.integers(0, len(pools["cities"]), n)]
+    domains = pools["email_domains"][rng.integers(0, len(pools["email_domains"]), n)]
+    gender = np.array(GENDERS, dtype=object)[rng.choice(3, size=n, p=GENDER_WEIGHTS)]
+    country = np.array(COUNTRIES, dtype=object)[rng.integers(0, len(COUNTRIES), n)]
+    first_gen = rng.integers(0, 3, n) == 0
+
+    # Fees Logic: Enrolled MUST have paid. Accepted MIGHT have paid.
+    fees_paid = (status == 'Enrolled') | ((status == 'Accepted') & (rng.random(n) < 0.5))
+
+    # SOPs are gathered from the pre-rendered table
+    opener = rng.integers(0, OPENERS, n)
+    middle = rng.integers(0, MIDDLES, n)
+    closer = rng.integers(0, CLOSERS, n)
+    middle_slot = np.where(middle == 0, achievement_idx, len(ACHIEVEMENT_TYPES) + middle - 1)
+    sop = sop_table[program_idx, opener, middle_slot, closer]
+
+    # Correlate scores with status (Enrolled usually higher scores)
+    good = np.isin(status, STATUS_GOOD)
+    gpa = np.round(np.where(good, rng.uniform(3.4, 4.0, n), rng.uniform(2.3, 3.6, n)), 2)
+    sat = np.where(good, rng.integers(1300, 1601, n), rng.integers(900, 1401, n))
+    scholarship = rng.random(n) < 0.5
+
+    achievement_ids = uuid4_strings(rng, n)
+    date_awarded = today64 - rng.integers(365, 3 * 365, n).astype('timedelta64[D]')
+
+    # Skip if submission date is in the future
+    keep = submission <= today64
+    if not keep.any():
+        return None
+
+    uid, aid, app_id, pid = ids
+    user_ids = "U" + (uid + row_idx).astype(str).astype(object)
+    applicant_ids = "A" + (aid + row_idx).astype(str).astype(object)
+    submission_str = submission.astype(str)
+    # Unique without a global set: the user number is part of the address
+    emails = (np.char.lower(first_names.astype(str)).astype(object) + "."
+              + np.char.lower(last_names.astype(str)).astype(object)
+              + (uid + row_idx).astype(str).astype(object) + "@" + domains)
+    program_ids = np.array([p["program_id"] for p in PROGRAMS], dtype=object)[program_idx]
+
+    tables = {
+        "users": pd.DataFrame({
+            "user_id": user_ids,
+            "email": emails,
             "password_hash": "hash_placeholder",
             "role_id": 2,
-            "created_at": submission_date
-        })
-        
-        # Applicants table
-        applicants_data.append({
-            "applicant_id": applicant_id,
-            "user_id": user_id,
-            "first_name": fake.first_name(),
-            "last_name": fake.last_name(),
-            "dob": dob,
-            "age_range_id": get_age_range_id(dob, year),
-            "gender": random.choices(['Male', 'Female', 'Other'], weights=[0.48, 0.48, 0.04])[0],
-            "country": random.choice(['USA', 'India', 'China', 'France', 'UK', 'Nigeria', 'Canada']),
-            "city": fake.city(),
-            "is_first_generation": random.choice([True, False, False])
-        })
-        
-        # Applications table (Fact)
-        # Fees Logic: Enrolled MUST have paid. Accepted MIGHT have paid.
-        fees_paid = True if status == 'Enrolled' else (random.choice([True, False]) if status == 'Accepted' else False)
-        
-        applications_data.append({
-            "application_id": f"APP{g_app_id}",
-            "applicant_id": applicant_id,
-            "program_id": program["program_id"],
+            "created_at": submission_str,
+        }),
+        "applicants": pd.DataFrame({
+            "applicant_id": applicant_ids,
+            "user_id": user_ids,
+            "first_name": first_names,
+            "last_name": last_names,
+            "dob": dob.astype(str),
+            "age_range_id": age_range_id,
+            "gender": gender,
+            "country": country,
+            "city": cities,
+            "is_first_generation": first_gen,
+        }),
+        "applications": pd.DataFrame({
+            "application_id": "APP" + (app_id + row_idx).astype(str).astype(object),
+            "applicant_id": applicant_ids,
+            "program_id": program_ids,
             "status": status,
-            "submission_date": submission_date,
+            "submission_date": submission_str,
             "days_to_submit": days_to_submit,
             "fees_paid": fees_paid,
-            "sop_text": generate_sop(program["name"], achievement_name),
-            "admin_comments": ""
-        })
-        
-        # Academic Profile
-        # Correlate scores with status (Enrolled usually higher scores)
-        if status in ['Enrolled', 'Accepted', 'Lost']:
-            gpa = round(random.uniform(3.4, 4.0), 2)
-            sat = random.randint(1300, 1600)
-        else:
-            gpa = round(random.uniform(2.3, 3.6), 2)
-            sat = random.randint(900, 1400)
-            
-        academic_data.append({
-            "profile_id": f"P{g_pid}",
-            "applicant_id": applicant_id,
+            "sop_text": sop,
+            "admin_comments": "",
+        }),
+        "academic_profile": pd.DataFrame({
+            "profile_id": "P" + (pid + row_idx).astype(str).astype(object),
+            "applicant_id": applicant_ids,
             "high_school_gpa": gpa,
             "sat_score": sat,
-            "scholarship_requested": random.choice([True, False])
-        })
-        
-        # Student Achievements
-        achievements_data.append({
-            "id": str(uuid.uuid4()),
-            "applicant_id": applicant_id,
-            "achievement_name": achievement_name,
-            "date_awarded": fake.date_between(start_date='-3y', end_date='-1y')
-        })
-
-# --- SAVE FILES ---
-print(f"\nSaving files...")
-print(f"  Total records generated: {len(applications_data)}")
-
-pd.DataFrame([{"role_id": 1, "name": "Admin"}, {"role_id": 2, "name": "Applicant"}]).to_csv("roles.csv", index=False)
-pd.DataFrame(AGE_RANGES).to_csv("age_ranges.csv", index=False)
-pd.DataFrame(PROGRAMS).to_csv("programs.csv", index=False)
-pd.DataFrame(users_data).to_csv("users.csv", index=False)
-pd.DataFrame(applicants_data).to_csv("applicants.csv", index=False)
-pd.DataFrame(applications_data).to_csv("applications.csv", index=False)
-pd.DataFrame(academic_data).to_csv("academic_profile.csv", index=False)
-pd.DataFrame(achievements_data).to_csv("student_achievements.csv", index=False)
-
-print("\n✅ Success! Data Generation Complete.")
-print(f"\nBreakdown by year:")
-apps_df = pd.DataFrame(applications_data)
-apps_df['year'] = pd.to_datetime(apps_df['submission_date']).dt.year
-print(apps_df.groupby('year').size())
\ No newline at end of file
+            "scholarship_requested": scholarship,
+        }),
+        "student_achievements": pd.DataFrame({
+            "id": achievement_ids,
+            "applicant_id": applicant_ids,
+            "achievement_name": np.array(ACHIEVEMENT_TYPES, dtype=object)[achievement_idx],
+            "date_awarded": date_awarded.astype(str),
+        }),
+    }
+    return {name: df[keep] for name, df in tables.items()}
+
+def iter_year_chunks(year, stats, rows, ids, seed, pools, sop_table, today, chunk_size=200_000):
+    """Yield {table: DataFrame} chunks of about chunk_size rows covering one year"""
+    pending = []
+    pending_rows = 0
+    for block in range(-(-rows // RNG_BLOCK)):
+        frames = generate_block(year, stats, block, rows, ids, seed, pools, sop_table, today)
+        if frames is None:
+            continue
+        pending.append(frames)
+        pending_rows += len(frames["applications"])
+        if pending_rows >= chunk_size:
+            yield {name: pd.concat([f[name] for f in pending]) for name in FACT_TABLES}
+            pending, pending_rows = [], 0
+    if pending:
+        yield {name: pd.concat([f[name] for f in pending]) for name in FACT_TABLES}
+
+# ID numbers of the first row of the first year: (user, applicant, application, profile)
+FIRST_IDS = (1001, 5001, 9001, 2)
+
+def plan_years(years, scale):
+    """(year, stats, row count, first IDs) per year; IDs are contiguous across years"""
+    plan = []
+    offset = 0
+    for year in years:
+        stats = stats_for_year(year)
+        rows = int(round(stats["apps"] * scale))
+        plan.append((year, stats, rows, tuple(first + offset for first in FIRST_IDS)))
+        offset += rows
+    return plan
+
+def write_lookup_tables(out_dir):
+    pd.DataFrame([{"role_id": 1, "name": "Admin"}, {"role_id": 2, "name": "Applicant"}]).to_csv(
+        os.path.join(out_dir, "roles.csv"), index=False)
+    pd.DataFrame(AGE_RANGES).to_csv(os.path.join(out_dir, "age_ranges.csv"), index=False)
+    pd.DataFrame(PROGRAMS).to_csv(os.path.join(out_dir, "programs.csv"), index=False)
+
+def plan_shards(plan, chunk_size):
+    """Split every year into (year, stats, rows, ids, first block, last block) shards of about chunk_size rows.
+
+    Shards are whole RNG blocks, so each one draws from exactly the streams
+    (seed, year, block) the serial run would use, and its IDs are already
+    fixed by the year plan: they merge in order without renumbering.
+    """
+    blocks_per_shard = max(1, -(-chunk_size // RNG_BLOCK))
+    shards = []
+    for year, stats, rows, ids in plan:
+        n_blocks = -(-rows // RNG_BLOCK)
+        for first in range(0, n_blocks, blocks_per_shard):
+            shards.append((year, stats, rows, ids, first, min(first + blocks_per_shard, n_blocks)))
+    return shards
+
+_worker = {}
+
+def _init_worker(seed):
+    """Build the Faker pools and SOP table once per worker process"""
+    _worker["pools"] = build_pools(seed)
+    _worker["sop_table"] = build_sop_table()
+
+def generate_shard(shard, seed, today, part_dir):
+    """Write one shard's rows (no header) to part files; returns (year, applications written)"""
+    year, stats, rows, ids, first, last = shard
+    frames = [generate_block(year, stats, block, rows, ids, seed, _worker["pools"], _worker["sop_table"], today)
+              for block in range(first, last)]
+    frames = [f for f in frames if f is not None]
+    written = 0
+    for name in FACT_TABLES:
+        part = os.path.join(part_dir, f"{name}.{year}.{first}.csv")
+        if frames:
+            df = pd.concat([f[name] for f in frames])
+            df.to_csv(part, header=False, index=False)
+            written = len(df)
+    return year, written
+
+def generate(out_dir=".", scale=1.0, years=None, seed=42, chunk_size=200_000, today=None, workers=1):
+    """Stream every year chunk by chunk into the CSVs; returns {year: applications written}
+
+    With workers > 1 the shards are generated in a process pool into part
+    files that are appended to the CSVs in shard order. The files are
+    byte-identical to a single-process run with the same options.
+    """
+    today = today or dt_module.now().date()
+    os.makedirs(out_dir, exist_ok=True)
+    write_lookup_tables(out_dir)
+
+    # Headers first; every chunk or shard is then appended in plan order
+    paths = {name: os.path.join(out_dir, f"{name}.csv") for name in FACT_TABLES}
+    for name, table_columns in FACT_COLUMNS.items():
+        with open(paths[name], "w", newline="", encoding="utf-8") as f:
+            f.write(",".join(table_columns) + "\n")
+
+    plan = plan_years(years or sorted(YEARLY_STATS), scale)
+    for year, stats, rows, _ in plan:
+        print(f"  Processing {year}: {rows} applicants (Accept Rate: {stats['accept_rate']:.0%})")
+    per_year = {year: 0 for year, _, _, _ in plan}
+
+    if workers <= 1:
+        _init_worker(seed)
+        for year, stats, rows, ids in plan:
+            for chunk in iter_year_chunks(year, stats, rows, ids, seed, _worker["pools"], _worker["sop_table"],
+                                          today, chunk_size):
+                for name, df in chunk.items():
+                    df.to_csv(paths[name], mode="a", header=False, index=False)
+                per_year[year] += len(chunk["applications"])
+        return per_year
+
+    shards = plan_shards(plan, chunk_size)
+    part_dir = tempfile.mkdtemp(prefix="generate_data_", dir=out_dir)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(seed,)) as pool:
+            results = pool.map(generate_shard, shards, [seed] * len(shards), [today] * len(shards),
+                               [part_dir] * len(shards))
+            for (year, written), shard in zip(results, shards):
+                per_year[year] += written
+                for name in FACT_TABLES:
+                    part = os.path.join(part_dir, f"{name}.{year}.{shard[4]}.csv")
+                    if not os.path.exists(part):
+                        continue
+                    with open(part, "rb") as src, open(paths[name], "ab") as dst:
+                        shutil.copyfileobj(src, dst, 16 * 1024 * 1024)
+                    os.remove(part)
+    finally:
+        shutil.rmtree(part_dir, ignore_errors=True)
+    return per_year
+
+# --- 5. MAIN ---
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic admissions CSVs")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Multiply every year's application count (e.g. 1000 for ~10M rows)")
+    parser.add_argument("--years", help="Years to generate, e.g. 2017-2026 or 2024,2025 (default: all configured)")
+    parser.add_argument("--seed", type=int, default=42, help="Same seed + same options = identical files")
+    parser.add_argument("--chunk-size", type=int, default=200_000, help="Rows held in memory at once")
+    parser.add_argument("--out-dir", default=".")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Generate shards in this many processes (0 = one per CPU); output is unchanged")
+    parser.add_argument("--today", type=date.fromisoformat,
+                        help="Pretend today is this date (YYYY-MM-DD); fixes the output across days")
+    parser.add_argument("--parquet", action="store_true",
+                        help="Also convert the CSVs to typed Parquet tables (see parquet_store.py)")
+    args = parser.parse_args()
+
+    print("Generating Data with Realistic Indian College Trends...")
+    started = time.perf_counter()
+    workers = args.workers or os.cpu_count() or 1
+    per_year = generate(args.out_dir, args.scale, parse_years(args.years), args.seed, args.chunk_size, args.today,
+                        workers)
+    if args.parquet:
+        from parquet_store import convert
+        convert(args.out_dir, args.out_dir)
+    elapsed = time.perf_counter() - started
+
+    total = sum(per_year.values())
+    print("\n✅ Success! Data Generation Complete.")
+    print(f"  Total records generated: {total} in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} rows/s)")
+    print(f"\nBreakdown by year:")
+    for year, count in per_year.items():
+        print(f"{year}    {count}")
+
+if __name__ == "__main__":
+    main()
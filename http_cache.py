@@ -0,0 +1,41 @@
+import hashlib
+import json
+from datetime import datetime, date
+
+from flask import request, jsonify, make_response
+
+
+def etag_for(payload):
+    """Stable strong ETag for JSON-serializable data or a rendered string"""
+    if not isinstance(payload, (str, bytes)):
+        payload = json.dumps(payload, sort_keys=True, default=str)
+    if isinstance(payload, str):
+        payload = payload.encode('utf-8')
+    return hashlib.sha1(payload).hexdigest()
+
+
+def conditional_response(response, etag, last_modified=None, max_age=0, private=True):
+    """Attach validators and answer 304 when the client's copy is still current"""
+    response.set_etag(etag)
+    if isinstance(last_modified, date) and not isinstance(last_modified, datetime):
+        last_modified = datetime(last_modified.year, last_modified.month, last_modified.day)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.max_age = max_age
+    if private:
+        response.cache_control.private = True
+    else:
+        response.cache_control.public = True
+    if not max_age:
+        response.cache_control.must_revalidate = True
+    return response.make_conditional(request)
+
+
+def conditional_json(payload, last_modified=None, max_age=0, private=True):
+    """jsonify() with ETag/Last-Modified revalidation"""
+    return conditional_response(jsonify(payload), etag_for(payload), last_modified, max_age, private)
+
+
+def conditional_html(html, etag=None, max_age=0, private=True):
+    """Rendered page with ETag revalidation; public pages can be stored by a reverse proxy"""
+    return conditional_response(make_response(html), etag or etag_for(html), max_age=max_age, private=private)
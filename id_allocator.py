@@ -0,0 +1,114 @@
+import json
+import os
+import threading
+
+from file_lock import FileLock
+
+# kind -> (ID prefix, SQL Server sequence, first number handed out on an empty dataset)
+ID_KINDS = {
+    'user': ('U', 'dbo.seq_user_id', 1001),
+    'applicant': ('A', 'dbo.seq_applicant_id', 5001),
+    'application': ('APP', 'dbo.seq_application_id', 9001),
+    'profile': ('P', 'dbo.seq_profile_id', 1001),
+}
+
+
+def format_id(kind, number):
+    return f"{ID_KINDS[kind][0]}{number}"
+
+
+class SequenceIdAllocator:
+    """hi/lo allocator over SQL Server SEQUENCE objects.
+
+    Each process reserves a block of `block_size` numbers with one call to
+    sp_sequence_get_range and hands them out locally, so most IDs cost no
+    round trip. Blocks never overlap, so workers cannot collide; numbers
+    left in a block when the process exits are simply skipped.
+    """
+
+    def __init__(self, get_connection, block_size=20):
+        self._get_connection = get_connection
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._blocks = {}  # kind -> [next, end)
+
+    def _reserve_block(self, kind):
+        conn = self._get_connection()
+        if not conn:
+            raise RuntimeError("Database connection failed")
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SET NOCOUNT ON;
+            DECLARE @first SQL_VARIANT;
+            EXEC sys.sp_sequence_get_range
+                @sequence_name = N'{ID_KINDS[kind][1]}',
+                @range_size = ?,
+                @range_first_value = @first OUTPUT;
+            SELECT CAST(@first AS BIGINT);
+        """, (self.block_size,))
+        first = int(cursor.fetchone()[0])
+        return [first, first + self.block_size]
+
+    def next_id(self, kind):
+        with self._lock:
+            block = self._blocks.get(kind)
+            if not block or block[0] >= block[1]:
+                block = self._blocks[kind] = self._reserve_block(kind)
+            number = block[0]
+            block[0] += 1
+        return format_id(kind, number)
+
+    def next_ids(self, kinds):
+        """{kind: new ID} for several kinds at once"""
+        return {kind: self.next_id(kind) for kind in kinds}
+
+
+class FileIdAllocator:
+    """Counter file shared by every process of the CSV backend.
+
+    The counters live in a small JSON file updated under an exclusive file
+    lock, so each ID costs one tiny read/write regardless of table size. On
+    first use the counters are seeded from the highest IDs already present.
+    """
+
+    def __init__(self, path, seed=None):
+        self.path = path
+        # seed() -> {kind: highest number already used}
+        self._seed = seed
+        self._lock = FileLock(path + '.lock')
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            counters = {kind: first - 1 for kind, (_, _, first) in ID_KINDS.items()}
+            if self._seed:
+                for kind, highest in self._seed().items():
+                    if highest is not None:
+                        counters[kind] = max(counters[kind], int(highest))
+            return counters
+
+    def _save(self, counters):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(counters, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def next_id(self, kind):
+        with self._lock:
+            counters = self._load()
+            counters[kind] = counters.get(kind, ID_KINDS[kind][2] - 1) + 1
+            self._save(counters)
+            return format_id(kind, counters[kind])
+
+    def next_ids(self, kinds):
+        """{kind: new ID} for several kinds under one lock and one write"""
+        with self._lock:
+            counters = self._load()
+            for kind in kinds:
+                counters[kind] = counters.get(kind, ID_KINDS[kind][2] - 1) + 1
+            self._save(counters)
+            return {kind: format_id(kind, counters[kind]) for kind in kinds}
@@ -0,0 +1,94 @@
+import threading
+import time
+from collections import Counter
+
+
+class KpiCounters:
+    """Cached application counts by status, program and year.
+
+    Loaded with one aggregate query and then kept current by applying each
+    status change or submission as a delta. A TTL forces a periodic reload so
+    workers that did not see a change still converge.
+    """
+
+    def __init__(self, loader, ttl=300):
+        # loader() returns an iterable of (status, program_id, year, count)
+        self._loader = loader
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self._reset()
+
+    def _reset(self):
+        self.total = 0
+        self.by_status = Counter()
+        self.by_program = Counter()
+        self.by_year = Counter()
+        self.cells = Counter()
+
+    def _bump(self, status, program_id, year, delta):
+        self.total += delta
+        self.by_status[status] += delta
+        self.by_program[program_id] += delta
+        self.by_year[year] += delta
+        self.cells[(status, program_id, year)] += delta
+
+    def _ensure_loaded(self):
+        """Reload from the backend when empty or expired. Caller holds the lock."""
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl:
+            return
+        rows = list(self._loader())
+        self._reset()
+        for status, program_id, year, count in rows:
+            self._bump(status, program_id, year, count)
+        self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        """Drop the cached counts; the next read reloads them"""
+        with self._lock:
+            self._loaded_at = None
+
+    def record_submission(self, program_id, year, status='Waitlisted'):
+        """Count a newly submitted application"""
+        with self._lock:
+            if self._loaded_at is not None:
+                self._bump(status, program_id, year, 1)
+
+    def record_status_change(self, program_id, year, old_status, new_status):
+        """Move one application from old_status to new_status"""
+        if old_status == new_status:
+            return
+        with self._lock:
+            if self._loaded_at is not None:
+                self._bump(old_status, program_id, year, -1)
+                self._bump(new_status, program_id, year, 1)
+
+    def by_program_for(self, status):
+        """{program_id: count} of applications currently in `status` (e.g. Enrolled students)"""
+        with self._lock:
+            try:
+                self._ensure_loaded()
+            except Exception as e:
+                print(f"Error loading dashboard counts: {e}")
+            counts = Counter()
+            for (cell_status, program_id, _), n in self.cells.items():
+                if cell_status == status:
+                    counts[program_id] += n
+            return counts
+
+    def summary(self):
+        """Counts for the dashboard cards and the /dashboard_stats endpoint"""
+        with self._lock:
+            try:
+                self._ensure_loaded()
+            except Exception as e:
+                print(f"Error loading dashboard counts: {e}")
+                if self._loaded_at is None:
+                    return {'total': 0, 'by_status': {}, 'by_program': {}, 'by_year': {}}
+            return {
+                'total': self.total,
+                'by_status': {k: v for k, v in self.by_status.items() if v},
+                'by_program': {k: v for k, v in self.by_program.items() if v},
+                'by_year': {str(k) if k is not None else 'Unknown': v
+                            for k, v in sorted(self.by_year.items(), key=lambda kv: str(kv[0])) if v},
+            }
@@ -0,0 +1,102 @@
+from datetime import date
+
+# Shared request parsing for the paginated application lists (app.py and app2.py)
+
+# /students shows the current admission cycle unless another year is requested
+CURRENT_ADMISSION_YEAR = 2026
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+STATUSES = ['Waitlisted', 'Accepted', 'Rejected', 'Enrolled', 'Lost']
+
+# sort key -> (column, descending). Date sorts are keyset-paginated on
+# (submission_date, application_id) in both directions (after= / before=);
+# name sorts fall back to OFFSET paging.
+SORT_OPTIONS = {
+    'date_desc': ('submission_date', True),
+    'date_asc': ('submission_date', False),
+    'name_asc': ('name', False),
+    'name_desc': ('name', True),
+}
+KEYSET_SORTS = ('date_desc', 'date_asc')
+
+
+def _to_int(value, default):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _to_date(value):
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def encode_cursor(submission_date, application_id):
+    """Keyset cursor pointing just past the given row"""
+    return f"{submission_date}|{application_id}"
+
+
+def decode_cursor(cursor):
+    """Return (submission_date, application_id) or None for a malformed cursor"""
+    if not cursor or '|' not in cursor:
+        return None
+    day, app_id = cursor.split('|', 1)
+    day = _to_date(day)
+    if day is None or not app_id:
+        return None
+    return day, app_id
+
+
+def parse_list_args(args, default_year=None):
+    """Turn query-string arguments into validated list filters"""
+    sort = args.get('sort', 'date_desc')
+    if sort not in SORT_OPTIONS:
+        sort = 'date_desc'
+
+    status = args.get('status') or None
+    if status not in STATUSES:
+        status = None
+
+    after = decode_cursor(args.get('after')) if sort in KEYSET_SORTS else None
+    before = decode_cursor(args.get('before')) if sort in KEYSET_SORTS and not after else None
+
+    year = _to_int(args.get('year'), default_year)
+    if args.get('year') == 'all':
+        year = None
+
+    return {
+        'page': max(1, _to_int(args.get('page'), 1)),
+        'page_size': min(MAX_PAGE_SIZE, max(1, _to_int(args.get('page_size'), DEFAULT_PAGE_SIZE))),
+        'year': year,
+        'date_from': _to_date(args.get('date_from')),
+        'date_to': _to_date(args.get('date_to')),
+        'status': status,
+        'program_id': args.get('program_id') or None,
+        'sort': sort,
+        'after': after,
+        'before': before,
+    }
+
+
+def page_result(items, total, filters, next_cursor=None, prev_cursor=None):
+    """Common response shape for a page of applications (cursors only for keyset-paginated lists)"""
+    page_size = filters['page_size']
+    return {
+        'items': items,
+        'total': total,
+        'page': filters['page'],
+        'page_size': page_size,
+        'pages': (total + page_size - 1) // page_size,
+        'next_cursor': next_cursor,
+        'prev_cursor': prev_cursor,
+    }
+
+
+def search_args(filters):
+    """The list filters that also narrow a search (results are ranked, so no sort or cursor)"""
+    return {key: value for key, value in filters.items() if key not in ('sort', 'after', 'before')}
@@ -0,0 +1,358 @@
+"""
+Replay realistic admissions traffic against the app and report latency per route.
+
+    python generate_data.py --out-dir data
+    python bulk_load.py --sqlite data/admissions.db --data-dir data      # SQLite stand-in for SQL Server
+    python loadtest.py --target app --sqlite data/admissions.db --data-dir data --out app.json
+    python loadtest.py --target app2 --data-dir data --out app2.json
+    python loadtest.py --url http://localhost:5000 --data-dir data --baseline app.json
+
+Virtual users arrive over --duration seconds following the seasonal curve of
+generate_data.generate_seasonal_date: each session draws a submission date
+and the year is compressed onto the run, so March-May bring a burst and
+September-October a lull. Each session plays one scenario of the --mix
+(returning applicant, new registration, anonymous visitor, admin review)
+with real applicant credentials from the generated users.csv.
+
+--target app / app2 runs the app in this process through Flask test clients
+(no server needed; --target app uses DATA_BACKEND=sqlite); --url drives a
+running server over HTTP. Writes are real: use a scratch copy of the data.
+The report lists requests, errors, p50/p95/p99 latency and requests per
+second per route. --out saves it as JSON; --baseline compares against a
+saved report and exits with status 1 when a route's p95 or throughput is
+worse by more than --tolerance.
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import pandas as pd
+
+from generate_data import generate_seasonal_date
+
+ADMIN = {'email': 'admin@mm.edu', 'password': 'admin123'}
+DEFAULT_MIX = 'applicant=55,register=10,visitor=25,admin=10'
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+class TestClientSession:
+    """One virtual user's cookie session against the app in this process"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, data=None, json_body=None):
+        response = self.client.open(path, method=method, data=data, json=json_body)
+        return response.status_code
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # A redirect is the answer being measured (e.g. /login_action), not a new request
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpSession:
+    """One virtual user's cookie session against a running server"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect())
+
+    def request(self, method, path, data=None, json_body=None):
+        body = None
+        headers = {}
+        if json_body is not None:
+            body = json.dumps(json_body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        elif data is not None:
+            body = urllib.parse.urlencode(data).encode('utf-8')
+        req = urllib.request.Request(self.base_url + path, data=body, headers=headers, method=method)
+        try:
+            with self.opener.open(req, timeout=60) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+
+class Recorder:
+    """Latency samples and error counts per route"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+
+    def call(self, session, route, method, path, data=None, json_body=None, expect=None):
+        """Time one request; errors are 4xx/5xx or, when given, any status other than `expect`"""
+        start = time.perf_counter()
+        try:
+            status = session.request(method, path, data=data, json_body=json_body)
+        except Exception as e:
+            print(f"Request error on {route}: {e}")
+            status = 599
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.samples.setdefault(route, []).append(elapsed)
+            if status >= 400 or (expect is not None and status != expect):
+                self.errors[route] = self.errors.get(route, 0) + 1
+        return status
+
+    def report(self, seconds):
+        routes = {}
+        for route, samples in sorted(self.samples.items()):
+            routes[route] = {
+                'requests': len(samples),
+                'errors': self.errors.get(route, 0),
+                'p50_ms': round(statistics.median(samples), 2),
+                'p95_ms': round(percentile(samples, 95), 2),
+                'p99_ms': round(percentile(samples, 99), 2),
+                'rps': round(len(samples) / seconds, 2),
+            }
+        return routes
+
+
+class Traffic:
+    """Scenario inputs drawn from the generated data"""
+
+    def __init__(self, data_dir, seed):
+        self.random = random.Random(seed)
+        users = pd.read_csv(os.path.join(data_dir, 'users.csv'), usecols=['email', 'password_hash', 'role_id'])
+        applicants = users[users['role_id'] == 2]
+        self.credentials = list(zip(applicants['email'], applicants['password_hash']))
+        self.program_ids = pd.read_csv(os.path.join(data_dir, 'programs.csv'))['program_id'].tolist()
+        apps = pd.read_csv(os.path.join(data_dir, 'applications.csv'), usecols=['application_id', 'status'])
+        pending = apps[apps['status'] == 'Waitlisted']['application_id']
+        self.application_ids = (pending if len(pending) else apps['application_id']).tolist()
+        self._lock = threading.Lock()
+        self._registered = 0
+
+    def pick(self, values):
+        with self._lock:
+            return self.random.choice(values)
+
+    def new_email(self):
+        with self._lock:
+            self._registered += 1
+            return f"loadtest.{os.getpid()}.{int(time.time())}.{self._registered}@example.com"
+
+    def application_form(self):
+        with self._lock:
+            rng = self.random
+            return {
+                'first_name': rng.choice(['Ava', 'Liam', 'Noah', 'Mia', 'Zoe', 'Omar']),
+                'last_name': rng.choice(['Khan', 'Smith', 'Garcia', 'Chen', 'Okafor']),
+                'dob': date(rng.randint(2004, 2008), rng.randint(1, 12), rng.randint(1, 28)).isoformat(),
+                'gender': rng.choice(['Male', 'Female', 'Other']),
+                'city': 'Springfield',
+                'country': rng.choice(['USA', 'India', 'Nigeria', 'UK']),
+                'gpa': f"{rng.uniform(2.5, 4.0):.2f}",
+                'sat_score': str(rng.randint(900, 1600)),
+                'achievement': rng.choice(['', 'Math Olympiad Gold', 'Debate Champion']),
+                'program_id': rng.choice(self.program_ids),
+                'sop_text': 'I want to study here because the program matches my goals. ' * 20,
+            }
+
+
+def scenario_applicant(session, rec, traffic):
+    """Returning applicant: log in, check applications, apply again"""
+    email, password = traffic.pick(traffic.credentials)
+    rec.call(session, '/login_action', 'POST', '/login_action', data={'email': email, 'password': password},
+             expect=302)
+    rec.call(session, '/my_application', 'GET', '/my_application')
+    rec.call(session, '/apply', 'GET', '/apply')
+    rec.call(session, '/submit_application', 'POST', '/submit_application', data=traffic.application_form())
+    rec.call(session, '/my_application', 'GET', '/my_application')
+
+
+def scenario_register(session, rec, traffic):
+    """New applicant: register, log in and submit a first application"""
+    email, password = traffic.new_email(), 'loadtest-password'
+    rec.call(session, '/register_action', 'POST', '/register_action',
+             data={'reg_email': email, 'reg_password': password})
+    rec.call(session, '/login_action', 'POST', '/login_action', data={'email': email, 'password': password},
+             expect=302)
+    rec.call(session, '/apply', 'GET', '/apply')
+    rec.call(session, '/submit_application', 'POST', '/submit_application', data=traffic.application_form())
+
+
+def scenario_visitor(session, rec, traffic):
+    """Anonymous visitor looking at the application form"""
+    rec.call(session, '/apply', 'GET', '/apply')
+
+
+def scenario_admin(session, rec, traffic):
+    """Admissions officer: dashboard, master list, a few decisions"""
+    rec.call(session, '/login_action', 'POST', '/login_action', data=ADMIN, expect=302)
+    rec.call(session, '/admin_dashboard', 'GET', '/admin_dashboard')
+    rec.call(session, '/students', 'GET', '/students')
+    for _ in range(3):
+        rec.call(session, '/update_application', 'POST', '/update_application',
+                 json_body={'app_id': traffic.pick(traffic.application_ids),
+                            'action': traffic.pick(['accept', 'reject'])})
+
+
+SCENARIOS = {
+    'applicant': scenario_applicant,
+    'register': scenario_register,
+    'visitor': scenario_visitor,
+    'admin': scenario_admin,
+}
+
+
+def parse_mix(spec):
+    """'applicant=55,visitor=25' -> {'applicant': 55, 'visitor': 25}"""
+    mix = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in SCENARIOS:
+            raise ValueError(f"Unknown scenario {name!r}; expected one of {', '.join(SCENARIOS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def arrival_offsets(sessions, duration, rng):
+    """Start offsets (seconds) of the sessions: seasonal submission dates compressed onto `duration`"""
+    random.seed(rng.random())
+    year = date.today().year
+    offsets = []
+    for _ in range(sessions):
+        day = generate_seasonal_date(year).timetuple().tm_yday - 1
+        offsets.append((day + rng.random()) / 365 * duration)
+    return sorted(offsets)
+
+
+def load_app(target, data_dir, sqlite_path):
+    """The Flask app of app.py (SQLite stand-in) or app2.py (files in data_dir), imported in-process"""
+    os.environ['DATA_DIR'] = data_dir
+    os.environ.setdefault('SUBMIT_QUEUE_PATH', os.path.join(tempfile.mkdtemp(), 'loadtest_submissions.db'))
+    if target == 'app':
+        os.environ['DATA_BACKEND'] = 'sqlite'
+        os.environ['SQLITE_PATH'] = sqlite_path or os.path.join(data_dir, 'admissions.db')
+        from app import app
+    else:
+        from app2 import app
+    return app
+
+
+def compare(report, baseline, tolerance, min_delta_ms=5):
+    """Print the change against a baseline report; returns the routes that regressed"""
+    regressions = []
+    # Throughput follows the offered load, so it only compares between runs of the same plan
+    same_load = all(report.get(key) == baseline.get(key) for key in ('sessions', 'mix', 'duration_plan_s'))
+    if not same_load:
+        print("\nBaseline replayed a different load (sessions, duration or mix); only latency is compared.")
+    print(f"\n{'route':<22}{'p95 ms':>10}{'baseline':>10}{'change':>9}{'rps':>9}{'baseline':>10}{'change':>9}")
+    for route, now in report['routes'].items():
+        before = baseline.get('routes', {}).get(route)
+        if not before:
+            print(f"{route:<22}{now['p95_ms']:>10.1f}{'-':>10}{'new':>9}{now['rps']:>9.1f}{'-':>10}{'new':>9}")
+            continue
+        p95_change = (now['p95_ms'] - before['p95_ms']) / before['p95_ms'] if before['p95_ms'] else 0
+        rps_change = (now['rps'] - before['rps']) / before['rps'] if before['rps'] else 0
+        flag = ''
+        # A few ms either way on a fast route is noise, not a regression
+        slower = p95_change > tolerance and now['p95_ms'] - before['p95_ms'] > min_delta_ms
+        if slower or (same_load and rps_change < -tolerance):
+            regressions.append(route)
+            flag = '  REGRESSION'
+        print(f"{route:<22}{now['p95_ms']:>10.1f}{before['p95_ms']:>10.1f}{p95_change:>+9.0%}"
+              f"{now['rps']:>9.1f}{before['rps']:>10.1f}{rps_change:>+9.0%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seasonal load test of the admissions app")
+    parser.add_argument('--target', choices=['app', 'app2'], default='app',
+                        help="App to run in-process: app.py over SQLite or app2.py over the files")
+    parser.add_argument('--url', help="Drive a running server over HTTP instead of --target")
+    parser.add_argument('--data-dir', default='.', help="generate_data.py output (credentials, programs, IDs)")
+    parser.add_argument('--sqlite', help="SQLite database for --target app (default: <data-dir>/admissions.db)")
+    parser.add_argument('--sessions', type=int, default=300, help="Virtual users over the whole run")
+    parser.add_argument('--duration', type=float, default=60, help="Seconds the admissions year is compressed into")
+    parser.add_argument('--concurrency', type=int, default=32, help="Most sessions running at once")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f"Scenario weights (default: {DEFAULT_MIX})")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out', help="Save the report as JSON (a future --baseline)")
+    parser.add_argument('--baseline', help="Report JSON to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed p95/throughput change vs baseline")
+    parser.add_argument('--min-delta-ms', type=float, default=5,
+                        help="p95 increases smaller than this never count as regressions")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    rng = random.Random(args.seed)
+    traffic = Traffic(args.data_dir, args.seed)
+    if args.url:
+        target = args.url
+        make_session = lambda: HttpSession(args.url)  # noqa: E731
+    else:
+        target = args.target
+        app = load_app(args.target, args.data_dir, args.sqlite)
+        make_session = lambda: TestClientSession(app)  # noqa: E731
+
+    plan = [(offset, rng.choices(list(mix), weights=list(mix.values()))[0])
+            for offset in arrival_offsets(args.sessions, args.duration, rng)]
+    rec = Recorder()
+
+    def run_session(scenario):
+        try:
+            SCENARIOS[scenario](make_session(), rec, traffic)
+        except Exception as e:
+            print(f"Session error ({scenario}): {e}")
+
+    print(f"Replaying {len(plan)} sessions over {args.duration:.0f}s against {target}...")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        for offset, scenario in plan:
+            delay = offset - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(run_session, scenario)
+    seconds = time.perf_counter() - start
+
+    report = {
+        'target': target,
+        'sessions': len(plan),
+        'duration_plan_s': args.duration,
+        'duration_s': round(seconds, 2),
+        'mix': mix,
+        'routes': rec.report(seconds),
+    }
+    print(f"\n{'route':<22}{'requests':>9}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'rps':>8}")
+    for route, row in report['routes'].items():
+        print(f"{route:<22}{row['requests']:>9}{row['errors']:>8}{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}"
+              f"{row['p99_ms']:>9.1f}{row['rps']:>8.1f}")
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved report to {args.out}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} route(s) regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,8 @@
 -- ============================================
 -- CSV to SQL Server Migration Script
 -- Run this AFTER creating tables with schema.sql
+-- bulk_load.py does the same without path edits and copes with
+-- the commas inside sop_text; prefer it for generated data.
 -- ============================================
 
 USE UniversityAdmissions;
@@ -105,8 +107,17 @@ GO
 -- 6. IMPORT APPLICATIONS
 -- ============================================
 PRINT '6. Importing applications...';
+GO
+
+-- applications.csv has no updated_at/row_version; loading through a view of the CSV's columns
+-- leaves them NULL/generated instead of shifting the fields
+CREATE VIEW applications_csv AS
+SELECT application_id, applicant_id, program_id, status, submission_date, days_to_submit, fees_paid,
+       sop_text, admin_comments
+FROM applications;
+GO
 
-BULK INSERT applications
+BULK INSERT applications_csv
 FROM 'C:\path\to\your\csv\files\applications.csv'  -- UPDATE PATH!
 WITH (
     FIRSTROW = 2,
@@ -116,6 +127,7 @@ WITH (
 );
 
 PRINT '   Imported ' + CAST(@@ROWCOUNT AS VARCHAR) + ' applications';
+DROP VIEW applications_csv;
 GO
 
 -- ============================================
@@ -153,7 +165,31 @@ PRINT '   Imported ' + CAST(@@ROWCOUNT AS VARCHAR) + ' achievements';
 GO
 
 -- ============================================
--- 9. VERIFY IMPORT
+-- 9. RESYNC ID SEQUENCES
+-- ============================================
+PRINT '9. Restarting ID sequences after the imported data...';
+
+DECLARE @next BIGINT, @sql NVARCHAR(200);
+
+SELECT @next = ISNULL(MAX(TRY_CAST(SUBSTRING(user_id, 2, 20) AS BIGINT)), 1000) + 1 FROM users;
+SET @sql = N'ALTER SEQUENCE seq_user_id RESTART WITH ' + CAST(@next AS NVARCHAR(20));
+EXEC sp_executesql @sql;
+
+SELECT @next = ISNULL(MAX(TRY_CAST(SUBSTRING(applicant_id, 2, 20) AS BIGINT)), 5000) + 1 FROM applicants;
+SET @sql = N'ALTER SEQUENCE seq_applicant_id RESTART WITH ' + CAST(@next AS NVARCHAR(20));
+EXEC sp_executesql @sql;
+
+SELECT @next = ISNULL(MAX(TRY_CAST(SUBSTRING(application_id, 4, 20) AS BIGINT)), 9000) + 1 FROM applications;
+SET @sql = N'ALTER SEQUENCE seq_application_id RESTART WITH ' + CAST(@next AS NVARCHAR(20));
+EXEC sp_executesql @sql;
+
+SELECT @next = ISNULL(MAX(TRY_CAST(SUBSTRING(profile_id, 2, 20) AS BIGINT)), 1000) + 1 FROM academic_profile;
+SET @sql = N'ALTER SEQUENCE seq_profile_id RESTART WITH ' + CAST(@next AS NVARCHAR(20));
+EXEC sp_executesql @sql;
+GO
+
+-- ============================================
+-- 10. VERIFY IMPORT
 -- ============================================
 PRINT '';
 PRINT '============================================';
@@ -0,0 +1,325 @@
+"""
+Versioned schema migrations for the admissions database.
+
+Run after database_setup.sql (and migrate.sql, if you imported CSVs):
+    python migrations.py status
+    python migrations.py upgrade
+    python migrations.py upgrade --sqlite admissions.db
+
+Applied versions are recorded in the schema_migrations table, so running
+upgrade again only applies what is new.
+"""
+import argparse
+import os
+import sqlite3
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+from search import FTS5_TABLE, source_select
+
+
+def _sequence_sql(sequence, table, column, prefix_len, floor):
+    """Create an ID sequence starting after the highest ID already in `table`"""
+    return f"""
+        IF NOT EXISTS (SELECT 1 FROM sys.sequences WHERE name = '{sequence}')
+        BEGIN
+            DECLARE @next BIGINT, @sql NVARCHAR(200);
+            SELECT @next = ISNULL(MAX(TRY_CAST(SUBSTRING({column}, {prefix_len + 1}, 20) AS BIGINT)), {floor}) + 1
+            FROM {table};
+            SET @sql = N'CREATE SEQUENCE {sequence} AS BIGINT START WITH ' + CAST(@next AS NVARCHAR(20));
+            EXEC sp_executesql @sql;
+        END
+    """
+
+
+class Autocommit(str):
+    """Statement SQL Server refuses inside a user transaction (full-text DDL); run with autocommit on"""
+
+
+class AddColumn(str):
+    """SQLite ALTER TABLE ... ADD COLUMN, skipped when the column exists (SQLite has no IF NOT EXISTS for it)"""
+
+    def __new__(cls, table, column, definition):
+        statement = super().__new__(cls, f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        statement.table = table
+        statement.column = column
+        return statement
+
+
+def _has_column(cursor, table, column):
+    cursor.execute(f"PRAGMA table_info({table})")
+    return any(row[1] == column for row in cursor.fetchall())
+
+
+def _mssql_index(name, table, definition):
+    return f"""
+        IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = '{name}' AND object_id = OBJECT_ID('{table}'))
+            CREATE {definition}
+    """
+
+
+# (version, name, {dialect: [statements]})
+# SQLite has no INCLUDE columns, so its covering indexes put them in the key instead.
+MIGRATIONS = [
+    (1, 'id_sequences', {
+        'mssql': [
+            _sequence_sql('seq_user_id', 'users', 'user_id', 1, 1000),
+            _sequence_sql('seq_applicant_id', 'applicants', 'applicant_id', 1, 5000),
+            _sequence_sql('seq_application_id', 'applications', 'application_id', 3, 9000),
+            _sequence_sql('seq_profile_id', 'academic_profile', 'profile_id', 1, 1000),
+        ],
+        'sqlite': [],
+    }),
+    (2, 'hot_path_indexes', {
+        'mssql': [
+            # Login and registration dedupe
+            _mssql_index('ux_users_email', 'users',
+                         "UNIQUE NONCLUSTERED INDEX ux_users_email ON users (email) "
+                         "INCLUDE (password_hash, role_id)"),
+            # /my_application: applicants of one user
+            _mssql_index('ix_applicants_user_id', 'applicants',
+                         "NONCLUSTERED INDEX ix_applicants_user_id ON applicants (user_id) "
+                         "INCLUDE (first_name, last_name)"),
+            # Joins from applicants to their applications
+            _mssql_index('ix_applications_applicant_id', 'applications',
+                         "NONCLUSTERED INDEX ix_applications_applicant_id ON applications (applicant_id) "
+                         "INCLUDE (program_id, status, submission_date, fees_paid)"),
+            # Master list ordering, year filter and keyset pagination
+            _mssql_index('ix_applications_submission_date', 'applications',
+                         "NONCLUSTERED INDEX ix_applications_submission_date "
+                         "ON applications (submission_date DESC, application_id DESC) "
+                         "INCLUDE (applicant_id, program_id, status, days_to_submit, fees_paid)"),
+            # Status/program filters and the dashboard GROUP BY
+            _mssql_index('ix_applications_status_program', 'applications',
+                         "NONCLUSTERED INDEX ix_applications_status_program "
+                         "ON applications (status, program_id) INCLUDE (submission_date)"),
+            _mssql_index('ix_academic_profile_applicant_id', 'academic_profile',
+                         "NONCLUSTERED INDEX ix_academic_profile_applicant_id ON academic_profile (applicant_id) "
+                         "INCLUDE (high_school_gpa, sat_score, scholarship_requested)"),
+            _mssql_index('ix_student_achievements_applicant_id', 'student_achievements',
+                         "NONCLUSTERED INDEX ix_student_achievements_applicant_id "
+                         "ON student_achievements (applicant_id) INCLUDE (achievement_name)"),
+        ],
+        'sqlite': [
+            "CREATE UNIQUE INDEX IF NOT EXISTS ux_users_email ON users (email)",
+            "CREATE INDEX IF NOT EXISTS ix_applicants_user_id ON applicants (user_id)",
+            "CREATE INDEX IF NOT EXISTS ix_applications_applicant_id ON applications (applicant_id)",
+            "CREATE INDEX IF NOT EXISTS ix_applications_submission_date "
+            "ON applications (submission_date DESC, application_id DESC)",
+            "CREATE INDEX IF NOT EXISTS ix_applications_status_program "
+            "ON applications (status, program_id, submission_date)",
+            "CREATE INDEX IF NOT EXISTS ix_academic_profile_applicant_id "
+            "ON academic_profile (applicant_id, high_school_gpa, sat_score, scholarship_requested)",
+            "CREATE INDEX IF NOT EXISTS ix_student_achievements_applicant_id "
+            "ON student_achievements (applicant_id)",
+        ],
+    }),
+    # Last status change or submission time; NULL means unchanged since submission_date.
+    # Incremental exports (export.py, /export/applications?since=) filter on it.
+    (3, 'applications_updated_at', {
+        'mssql': [
+            "IF COL_LENGTH('applications', 'updated_at') IS NULL "
+            "ALTER TABLE applications ADD updated_at DATETIME2(3) NULL",
+            _mssql_index('ix_applications_updated_at', 'applications',
+                         "NONCLUSTERED INDEX ix_applications_updated_at ON applications (updated_at)"),
+        ],
+        'sqlite': [
+            AddColumn('applications', 'updated_at', 'TEXT'),
+            "CREATE INDEX IF NOT EXISTS ix_applications_updated_at ON applications (updated_at)",
+        ],
+    }),
+    # Change feed: one event per submission/status change with a monotonic version.
+    # SQL Server versions are rowversions, read only below MIN_ACTIVE_ROWVERSION() so an
+    # uncommitted lower version can never be skipped; SQLite has a single writer, so
+    # AUTOINCREMENT order is commit order.
+    (4, 'application_events', {
+        'mssql': [
+            "IF COL_LENGTH('applications', 'row_version') IS NULL "
+            "ALTER TABLE applications ADD row_version ROWVERSION",
+            """
+                IF OBJECT_ID('application_events') IS NULL
+                    CREATE TABLE application_events (
+                        event_id BIGINT IDENTITY(1,1) PRIMARY KEY,
+                        row_version ROWVERSION,
+                        application_id NVARCHAR(20) NOT NULL,
+                        event_type NVARCHAR(20) NOT NULL,
+                        old_status NVARCHAR(20) NULL,
+                        new_status NVARCHAR(20) NULL,
+                        program_id NVARCHAR(10) NULL,
+                        occurred_at DATETIME2(3) NOT NULL
+                    )
+            """,
+            _mssql_index('ux_application_events_row_version', 'application_events',
+                         "UNIQUE NONCLUSTERED INDEX ux_application_events_row_version "
+                         "ON application_events (row_version)"),
+            _mssql_index('ix_application_events_application_id', 'application_events',
+                         "NONCLUSTERED INDEX ix_application_events_application_id "
+                         "ON application_events (application_id)"),
+        ],
+        'sqlite': [
+            AddColumn('applications', 'row_version', 'INTEGER'),
+            """
+                CREATE TABLE IF NOT EXISTS application_events (
+                    version INTEGER PRIMARY KEY AUTOINCREMENT,
+                    application_id TEXT NOT NULL,
+                    event_type TEXT NOT NULL,
+                    old_status TEXT,
+                    new_status TEXT,
+                    program_id TEXT,
+                    occurred_at TEXT NOT NULL
+                )
+            """,
+            "CREATE INDEX IF NOT EXISTS ix_application_events_application_id "
+            "ON application_events (application_id)",
+        ],
+    }),
+    # Search index over names, email, city/country, SOPs and achievements (see search.py).
+    # SQL Server gets a full-text index on it only where Full-Text Search is installed.
+    (5, 'application_search', {
+        'mssql': [
+            """
+                IF OBJECT_ID('application_search') IS NULL
+                    CREATE TABLE application_search (
+                        application_id NVARCHAR(20) NOT NULL CONSTRAINT pk_application_search PRIMARY KEY,
+                        name NVARCHAR(200) NULL,
+                        email NVARCHAR(255) NULL,
+                        location NVARCHAR(200) NULL,
+                        sop_text NVARCHAR(MAX) NULL,
+                        achievements NVARCHAR(MAX) NULL
+                    )
+            """,
+            "INSERT INTO application_search (application_id, name, email, location, sop_text, achievements) "
+            + source_select('mssql')
+            + " WHERE NOT EXISTS (SELECT 1 FROM application_search s WHERE s.application_id = app.application_id)",
+            Autocommit("""
+                IF FULLTEXTSERVICEPROPERTY('IsFullTextInstalled') = 1
+                   AND NOT EXISTS (SELECT 1 FROM sys.fulltext_catalogs WHERE name = 'ft_admissions')
+                    EXEC('CREATE FULLTEXT CATALOG ft_admissions')
+            """),
+            Autocommit("""
+                IF FULLTEXTSERVICEPROPERTY('IsFullTextInstalled') = 1
+                   AND NOT EXISTS (SELECT 1 FROM sys.fulltext_indexes
+                                   WHERE object_id = OBJECT_ID('application_search'))
+                    EXEC('CREATE FULLTEXT INDEX ON application_search
+                              (name, email, location, sop_text, achievements)
+                          KEY INDEX pk_application_search ON ft_admissions
+                          WITH CHANGE_TRACKING AUTO')
+            """),
+        ],
+        'sqlite': [
+            FTS5_TABLE,
+            "INSERT INTO application_search (application_id, name, email, location, sop_text, achievements) "
+            + source_select('sqlite'),
+        ],
+    }),
+]
+
+
+def default_connection_string():
+    """Same Windows-authentication connection app.py uses, overridable with DB_CONNECTION_STRING"""
+    return os.getenv('DB_CONNECTION_STRING') or (
+        "DRIVER={ODBC Driver 17 for SQL Server};"
+        f"SERVER={os.getenv('DB_SERVER', 'localhost')};"
+        f"DATABASE={os.getenv('DB_NAME', 'UniversityAdmissions')};"
+        "Trusted_Connection=yes;"
+    )
+
+
+def connect(sqlite_path=None, dsn=None):
+    """Return (connection, dialect) for SQLite or SQL Server"""
+    if sqlite_path:
+        return sqlite3.connect(sqlite_path), 'sqlite'
+    import pyodbc
+    return pyodbc.connect(dsn or default_connection_string()), 'mssql'
+
+
+def ensure_version_table(conn, dialect):
+    cursor = conn.cursor()
+    if dialect == 'sqlite':
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TEXT NOT NULL
+            )
+        """)
+    else:
+        cursor.execute("""
+            IF OBJECT_ID('schema_migrations') IS NULL
+                CREATE TABLE schema_migrations (
+                    version INT PRIMARY KEY,
+                    name NVARCHAR(100) NOT NULL,
+                    applied_at DATETIME2 NOT NULL
+                )
+        """)
+    conn.commit()
+
+
+def applied_versions(conn, dialect):
+    ensure_version_table(conn, dialect)
+    cursor = conn.cursor()
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def upgrade(conn, dialect, target=None, verbose=True):
+    """Apply pending migrations in order, each in its own transaction"""
+    done = applied_versions(conn, dialect)
+    applied = []
+    for version, name, statements in MIGRATIONS:
+        if version in done or (target is not None and version > target):
+            continue
+        if verbose:
+            print(f"Applying {version:03d}_{name}...")
+        cursor = conn.cursor()
+        try:
+            if dialect == 'sqlite':
+                # sqlite3 only opens a transaction before DML on its own; BEGIN makes the DDL roll back too
+                cursor.execute("BEGIN")
+            for statement in statements[dialect]:
+                if isinstance(statement, AddColumn) and _has_column(cursor, statement.table, statement.column):
+                    continue
+                if isinstance(statement, Autocommit):
+                    conn.commit()
+                    conn.autocommit = True
+                    try:
+                        cursor.execute(statement)
+                    finally:
+                        conn.autocommit = False
+                else:
+                    cursor.execute(statement)
+            cursor.execute("INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)",
+                           (version, name, datetime.now().isoformat(sep=' ', timespec='seconds')))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+    return applied
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations")
+    parser.add_argument('command', choices=['status', 'upgrade'])
+    parser.add_argument('--to', type=int, help="Stop after this version")
+    parser.add_argument('--sqlite', help="Migrate a SQLite database file instead of SQL Server")
+    parser.add_argument('--dsn', help="ODBC connection string (defaults to DB_CONNECTION_STRING)")
+    args = parser.parse_args()
+
+    conn, dialect = connect(args.sqlite, args.dsn)
+    try:
+        if args.command == 'status':
+            done = applied_versions(conn, dialect)
+            for version, name, _ in MIGRATIONS:
+                print(f"  [{'x' if version in done else ' '}] {version:03d}_{name}")
+        else:
+            applied = upgrade(conn, dialect, args.to)
+            print(f"Applied {len(applied)} migration(s)." if applied else "Database is up to date.")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
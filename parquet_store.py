@@ -0,0 +1,358 @@
+"""
+Parquet storage for the file backend.
+
+    python parquet_store.py convert --csv-dir . --out-dir .
+
+Each table is a directory (users.parquet/, applications.parquet/, ...) of
+Parquet files with the explicit types in SCHEMAS. applications is written
+with row groups that never span a submission year, so a year filter only
+reads that year's row groups. Start app2 with DATA_FORMAT=parquet to use it.
+"""
+import argparse
+import json
+import os
+import re
+import time
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from csv_store import CsvStore, CsvTable, filter_mask
+from profiling import phase
+
+STATUS = pa.dictionary(pa.int8(), pa.string())
+
+SCHEMAS = {
+    'roles': pa.schema([('role_id', pa.int32()), ('name', pa.string())]),
+    'age_ranges': pa.schema([('range_id', pa.int32()), ('min', pa.int32()), ('max', pa.int32()),
+                             ('label', pa.string())]),
+    'programs': pa.schema([('program_id', pa.string()), ('name', pa.string()), ('dept', pa.string()),
+                           ('median_days', pa.int32())]),
+    'users': pa.schema([('user_id', pa.string()), ('email', pa.string()), ('password_hash', pa.string()),
+                        ('role_id', pa.int32()), ('created_at', pa.string())]),
+    'applicants': pa.schema([('applicant_id', pa.string()), ('user_id', pa.string()),
+                             ('first_name', pa.string()), ('last_name', pa.string()), ('dob', pa.string()),
+                             ('age_range_id', pa.int32()), ('gender', STATUS), ('country', STATUS),
+                             ('city', pa.string()), ('is_first_generation', pa.bool_())]),
+    'applications': pa.schema([('application_id', pa.string()), ('applicant_id', pa.string()),
+                               ('program_id', pa.string()), ('status', STATUS),
+                               ('submission_date', pa.timestamp('ms')), ('days_to_submit', pa.int32()),
+                               ('fees_paid', pa.bool_()), ('sop_text', pa.string()),
+                               ('admin_comments', pa.string()), ('updated_at', pa.timestamp('ms')),
+                               ('row_version', pa.int64())]),
+    'academic_profile': pa.schema([('profile_id', pa.string()), ('applicant_id', pa.string()),
+                                   ('high_school_gpa', pa.float64()), ('sat_score', pa.int32()),
+                                   ('scholarship_requested', pa.bool_())]),
+    'student_achievements': pa.schema([('id', pa.string()), ('applicant_id', pa.string()),
+                                       ('achievement_name', pa.string()), ('date_awarded', pa.string())]),
+}
+
+BOOLEANS = {'true': True, 'false': False, '1': True, '0': False}
+
+# Rows per row group; applications row groups are also cut at every year boundary
+ROW_GROUP_SIZE = 100_000
+
+
+def coerce_frame(df, schema):
+    """Convert a frame of strings/mixed values to the schema's types without inference"""
+    out = {}
+    for field in schema:
+        values = df[field.name] if field.name in df.columns else pd.Series([None] * len(df), index=df.index)
+        if pa.types.is_integer(field.type):
+            out[field.name] = pd.to_numeric(values, errors='coerce').astype('Int64')
+        elif pa.types.is_floating(field.type):
+            out[field.name] = pd.to_numeric(values, errors='coerce')
+        elif pa.types.is_boolean(field.type):
+            out[field.name] = values.map(lambda v: BOOLEANS.get(str(v).strip().lower())
+                                         if not isinstance(v, bool) else v).astype('boolean')
+        elif pa.types.is_timestamp(field.type):
+            out[field.name] = pd.to_datetime(values, errors='coerce')
+        else:
+            out[field.name] = values.astype(object).where(values.notna(), None)
+    return pd.DataFrame(out, index=df.index)
+
+
+def to_arrow(df, schema):
+    return pa.Table.from_pandas(coerce_frame(df, schema), schema=schema, preserve_index=False)
+
+
+def from_arrow(table):
+    """Arrow -> pandas; dictionary columns become categoricals, int64 (row_version) stays integer with nulls"""
+    return table.to_pandas(types_mapper={pa.int64(): pd.Int64Dtype()}.get)
+
+
+class ParquetTable(CsvTable):
+    """CsvTable backed by a directory of Parquet files.
+
+    Files are named g<generation>-<part>.parquet. Appends add a part to the
+    current generation; rewrites (compaction, unlogged updates) write a
+    single file of the next generation and then delete the old one, so a
+    reader in another process always sees exactly one complete generation.
+    """
+
+    _file_pattern = re.compile(r'^g(\d+)-(\d+)\.parquet$')
+
+    def __init__(self, path, **kwargs):
+        # dtype/parse_dates/read_kwargs are CSV concerns; types come from the schema
+        for key in ('dtype', 'parse_dates', 'read_kwargs'):
+            kwargs.pop(key, None)
+        super().__init__(path, **kwargs)
+        self.schema = SCHEMAS[os.path.basename(path).split('.')[0]]
+        self._scans = {}
+
+    # --- files ---
+
+    def _parts(self):
+        """(generation, sorted part file names) of the newest generation on disk"""
+        try:
+            names = os.listdir(self.path)
+        except FileNotFoundError:
+            return 0, []
+        parts = {}
+        for name in names:
+            match = self._file_pattern.match(name)
+            if match:
+                parts.setdefault(int(match.group(1)), []).append((int(match.group(2)), name))
+        if not parts:
+            return 0, []
+        generation = max(parts)
+        return generation, [name for _, name in sorted(parts[generation])]
+
+    def _file_stat(self):
+        generation, names = self._parts()
+        if not names:
+            return None
+        return tuple((name, os.path.getsize(os.path.join(self.path, name))) for name in names)
+
+    def _dataset(self):
+        _, names = self._parts()
+        return ds.dataset([os.path.join(self.path, name) for name in names], schema=self.schema,
+                          format='parquet')
+
+    def _read(self):
+        if not self._parts()[1]:
+            return from_arrow(self.schema.empty_table())
+        return from_arrow(self._dataset().to_table())
+
+    def _write_file(self, table, generation, part):
+        os.makedirs(self.path, exist_ok=True)
+        name = f"g{generation}-{part:06d}.parquet"
+        tmp_path = os.path.join(self.path, f".{uuid.uuid4().hex}.tmp")
+        write_parquet(table, tmp_path, self.schema)
+        os.replace(tmp_path, os.path.join(self.path, name))
+        return name
+
+    def exists(self):
+        return bool(self._parts()[1])
+
+    # --- reads ---
+
+    def scan(self, columns=None, filters=None):
+        """Read only `columns` and the row groups that can match `filters` from disk.
+
+        Pending change log entries are applied to the result; filters on
+        columns the log changed are evaluated after that instead of being
+        pushed down. Results are cached until the files or the log change.
+        """
+        with self._lock:
+            filters = list(filters or ())
+            key = (tuple(columns) if columns is not None else None,
+                   tuple((c, op, tuple(v) if op == 'in' else v) for c, op, v in filters))
+            version = (self._file_stat(), self._log_size() if self.log_path else 0)
+            cached = self._scans.get(key)
+            if cached and cached[0] == version:
+                return cached[1]
+
+            pending = self._pending_changes()
+            changed = {col for changes in pending.values() for col in changes}
+            pushed = [f for f in filters if f[0] not in changed]
+            late = [f for f in filters if f[0] in changed]
+
+            read_columns = None
+            if columns is not None:
+                read_columns = [c for c in self.schema.names
+                                if c in columns or c in {f[0] for f in late} or (pending and c == self.log_key)]
+            if self._parts()[1]:
+                expression = pq.filters_to_expression(pushed) if pushed else None
+                with phase('pandas_io'):
+                    df = from_arrow(self._dataset().to_table(columns=read_columns, filter=expression))
+            else:
+                df = from_arrow(self.schema.empty_table())
+                if read_columns is not None:
+                    df = df[read_columns]
+            df = self._overlay(df, pending)
+            if late:
+                df = df[filter_mask(df, late)]
+            if columns is not None:
+                df = df[[c for c in columns if c in df.columns]]
+
+            if len(self._scans) > 32:
+                self._scans.clear()
+            self._scans[key] = (version, df)
+            return df
+
+    def _pending_changes(self):
+        """{key: {column: value}} with the latest logged value per key and column"""
+        if not self.log_path or not self._log_size():
+            return {}
+        with open(self.log_path, 'rb') as f:
+            data = f.read()
+        latest = {}
+        for line in data[:data.rfind(b'\n') + 1].splitlines():
+            if line.strip():
+                entry = json.loads(line)
+                entry.pop('ts', None)
+                latest.setdefault(entry.pop(self.log_key), {}).update(entry)
+        return latest
+
+    def _overlay(self, df, pending):
+        """Apply pending changes to a scanned frame"""
+        if not pending or self.log_key not in df.columns:
+            return df
+        df = df.copy()
+        keys = df[self.log_key]
+        for col in {c for changes in pending.values() for c in changes}:
+            if col not in df.columns:
+                continue
+            updates = {k: changes[col] for k, changes in pending.items() if col in changes}
+            hit = keys.isin(list(updates))
+            if hit.any():
+                if isinstance(df[col].dtype, pd.CategoricalDtype):
+                    df[col] = df[col].astype(object)
+                values = keys[hit].map(updates)
+                if pd.api.types.is_datetime64_any_dtype(df[col].dtype):
+                    values = pd.to_datetime(values)
+                df.loc[hit, col] = values
+        return df
+
+    # --- writes ---
+
+    def _apply(self, pos, changes):
+        if pos is None:
+            return
+        for col, value in changes.items():
+            if col in self._df.columns and isinstance(self._df[col].dtype, pd.CategoricalDtype) \
+                    and value not in self._df[col].cat.categories:
+                self._df[col] = self._df[col].cat.add_categories([value])
+        super()._apply(pos, changes)
+
+    def append(self, records):
+        """Write the records as a new part file and extend the in-memory table"""
+        with self._lock, self._file_lock:
+            self._refresh()
+            table = to_arrow(pd.DataFrame(records), self.schema)
+            generation, names = self._parts()
+            last = int(self._file_pattern.match(names[-1]).group(2)) if names else -1
+            before = self._stat
+            name = self._write_file(table, generation, last + 1)
+            after = self._file_stat()
+            if after != (before or ()) + ((name, os.path.getsize(os.path.join(self.path, name))),):
+                self._stat = None
+                self._refresh()
+                return
+            self._extend(from_arrow(table), after)
+
+    def _rewrite(self):
+        """Write the whole table as the next generation, then drop the previous one. Caller holds both locks."""
+        generation, names = self._parts()
+        self._write_file(to_arrow(self._df, self.schema), generation + 1, 0)
+        for name in names:
+            os.remove(os.path.join(self.path, name))
+        self._stat = self._file_stat()
+
+
+class ParquetStore(CsvStore):
+    """CsvStore over <table>.parquet directories"""
+
+    table_class = ParquetTable
+    suffix = '.parquet'
+
+
+def year_slices(table):
+    """Split an applications table into one table per submission year (nulls last)"""
+    years = pc.year(table['submission_date'])
+    slices = []
+    for year in sorted(y for y in pc.unique(years).to_pylist() if y is not None):
+        slices.append(table.filter(pc.equal(years, year)))
+    if years.null_count:
+        slices.append(table.filter(pc.is_null(years)))
+    return slices
+
+
+def write_parquet(table, path, schema):
+    """Write one file; tables with submission_date get row groups that never span two years"""
+    with pq.ParquetWriter(path, schema) as writer:
+        if 'submission_date' in schema.names:
+            for part in year_slices(table):
+                writer.write_table(part, row_group_size=ROW_GROUP_SIZE)
+        else:
+            writer.write_table(table, row_group_size=ROW_GROUP_SIZE)
+
+
+def convert_csv(csv_path, out_dir, name, chunk_size=ROW_GROUP_SIZE):
+    """Stream one CSV into <out_dir>/<name>.parquet/g0-000000.parquet; returns rows written"""
+    schema = SCHEMAS[name]
+    table_dir = os.path.join(out_dir, name + '.parquet')
+    os.makedirs(table_dir, exist_ok=True)
+    for old in os.listdir(table_dir):
+        if old.endswith('.parquet'):
+            os.remove(os.path.join(table_dir, old))
+    tmp_path = os.path.join(table_dir, '.convert.tmp')
+    by_year = 'submission_date' in schema.names
+    pending = {}  # year -> [arrow tables] still to be written (applications only)
+    rows = 0
+
+    def flush(writer, year):
+        writer.write_table(pa.concat_tables(pending.pop(year)), row_group_size=ROW_GROUP_SIZE)
+
+    with pq.ParquetWriter(tmp_path, schema) as writer:
+        for chunk in pd.read_csv(csv_path, dtype=str, keep_default_na=False, na_values=[''],
+                                 chunksize=chunk_size, on_bad_lines='skip'):
+            table = to_arrow(chunk, schema)
+            rows += table.num_rows
+            if not by_year:
+                writer.write_table(table, row_group_size=ROW_GROUP_SIZE)
+                continue
+            # Buffer per year so every row group holds a single year
+            for part in year_slices(table):
+                year = part['submission_date'][0].as_py()
+                year = year.year if year is not None else None
+                pending.setdefault(year, []).append(part)
+                if sum(t.num_rows for t in pending[year]) >= ROW_GROUP_SIZE:
+                    flush(writer, year)
+        for year in sorted(pending, key=lambda y: (y is None, y or 0)):
+            flush(writer, year)
+    os.replace(tmp_path, os.path.join(table_dir, 'g0-000000.parquet'))
+    return rows
+
+
+def convert(csv_dir, out_dir):
+    """Convert every generated CSV in csv_dir; returns {table: rows}"""
+    converted = {}
+    for name in SCHEMAS:
+        csv_path = os.path.join(csv_dir, name + '.csv')
+        if os.path.exists(csv_path):
+            converted[name] = convert_csv(csv_path, out_dir, name)
+    return converted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parquet storage for the CSV backend")
+    parser.add_argument('command', choices=['convert'])
+    parser.add_argument('--csv-dir', default='.')
+    parser.add_argument('--out-dir', default='.')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    converted = convert(args.csv_dir, args.out_dir)
+    for name, rows in converted.items():
+        print(f"  {name}: {rows} rows -> {os.path.join(args.out_dir, name + '.parquet')}")
+    print(f"Converted {len(converted)} table(s) in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
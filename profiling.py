@@ -0,0 +1,402 @@
+"""
+Where request time goes: per-route phase timings, SQL statement counts, /metrics and sampled profiles.
+
+Every request collects exclusive time per phase:
+    connect    borrowing a pooled connection (opening one when the pool is empty)
+    query      cursor.execute / executemany / commit
+    fetch      fetchone / fetchmany / fetchall
+    convert    turning fetched rows into dicts for the templates and JSON
+    pandas_io  reading CSV/Parquet tables into frames (file backends)
+    pandas     filtering, merging and grouping frames (file backends)
+    render     Jinja templates
+plus the number and duration of SQL statements. Time in a phase that runs
+inside another (a fetch during convert) is only counted once, in the inner
+phase; whatever no phase covers is reported as 'other'.
+
+The totals are kept per process and rendered in the Prometheus text format
+by MetricsRegistry.render() (app.py serves it at /metrics). Each response
+also carries a Server-Timing header with its own breakdown, which browser dev
+tools show next to the request.
+
+Set PROFILE_SAMPLE_RATE (0-1) to run that share of requests under cProfile
+(or pyinstrument with PROFILER=pyinstrument, when installed); those slower
+than PROFILE_SLOW_MS are written to PROFILE_DIR for snakeviz/pstats or a
+browser.
+"""
+import functools
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+# Request duration histogram buckets (seconds)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_local = threading.local()
+
+
+class RequestTimings:
+    """Phase times and SQL statements of the request running on this thread"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+        self._stack = []  # [name, start, seconds spent in nested phases]
+
+    def enter(self, name):
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def exit(self):
+        """Close the innermost phase; returns its inclusive duration"""
+        name, start, nested = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        self.phases[name] = self.phases.get(name, 0.0) + elapsed - nested
+        if self._stack:
+            self._stack[-1][2] += elapsed
+        return elapsed
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def current():
+    """Timings of the request on this thread, or None (background threads, CLI scripts)"""
+    return getattr(_local, 'timings', None)
+
+
+@contextmanager
+def phase(name):
+    """Attribute the time spent in the block to `name` for the current request (no-op outside one)"""
+    timings = current()
+    if timings is None:
+        yield
+        return
+    timings.enter(name)
+    try:
+        yield
+    finally:
+        timings.exit()
+
+
+def timed(name):
+    """Decorator form of phase() for whole functions (not generators)"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class InstrumentedCursor:
+    """DB-API cursor that reports execute/fetch time and statement counts to the current request"""
+
+    def __init__(self, cursor):
+        object.__setattr__(self, '_cursor', cursor)
+
+    def _execute(self, method, args):
+        timings = current()
+        if timings is None:
+            result = method(*args)
+        else:
+            timings.enter('query')
+            try:
+                result = method(*args)
+            finally:
+                timings.sql_seconds += timings.exit()
+                timings.sql_statements += 1
+        # Keep chained calls (cursor.execute(...).fetchone()) on the wrapper
+        return self if result is self._cursor else result
+
+    def execute(self, *args):
+        return self._execute(self._cursor.execute, args)
+
+    def executemany(self, *args):
+        return self._execute(self._cursor.executemany, args)
+
+    def fetchone(self):
+        with phase('fetch'):
+            return self._cursor.fetchone()
+
+    def fetchmany(self, *args):
+        with phase('fetch'):
+            return self._cursor.fetchmany(*args)
+
+    def fetchall(self):
+        with phase('fetch'):
+            return self._cursor.fetchall()
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        # e.g. cursor.fast_executemany = True
+        setattr(self._cursor, name, value)
+
+
+class InstrumentedConnection:
+    """Connection whose cursors are InstrumentedCursors; what the pool hands out"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, *args):
+        return InstrumentedCursor(self._conn.cursor(*args))
+
+    def execute(self, *args):
+        cursor = self.cursor()
+        cursor.execute(*args)
+        return cursor
+
+    def commit(self):
+        with phase('query'):
+            return self._conn.commit()
+
+    def rollback(self):
+        with phase('query'):
+            return self._conn.rollback()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{key}="{_label(value)}"' for key, value in labels.items()) + '}'
+
+
+class MetricsRegistry:
+    """Per-process request metrics, rendered in the Prometheus text exposition format"""
+
+    def __init__(self, prefix='admissions', buckets=BUCKETS):
+        self.prefix = prefix
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._requests = {}    # (route, method, status) -> count
+        self._durations = {}   # (route, method) -> [count per bucket..., +Inf count, sum]
+        self._phases = {}      # (route, phase) -> seconds
+        self._sql = {}         # route -> [statements, seconds]
+        self._exceptions = {}  # route -> count
+
+    def observe(self, route, method, status, timings, seconds):
+        with self._lock:
+            key = (route, method, str(status))
+            self._requests[key] = self._requests.get(key, 0) + 1
+            histogram = self._durations.setdefault((route, method), [0] * (len(self.buckets) + 1) + [0.0])
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[i] += 1
+            histogram[len(self.buckets)] += 1
+            histogram[-1] += seconds
+            accounted = 0.0
+            for name, spent in timings.phases.items():
+                self._phases[(route, name)] = self._phases.get((route, name), 0.0) + spent
+                accounted += spent
+            self._phases[(route, 'other')] = self._phases.get((route, 'other'), 0.0) + max(0.0, seconds - accounted)
+            sql = self._sql.setdefault(route, [0, 0.0])
+            sql[0] += timings.sql_statements
+            sql[1] += timings.sql_seconds
+
+    def observe_exception(self, route):
+        with self._lock:
+            self._exceptions[route] = self._exceptions.get(route, 0) + 1
+
+    def render(self, gauges=()):
+        """Prometheus text; `gauges` adds (name, help, [(labels dict, value)]) series such as pool usage"""
+        p = self.prefix
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {p}_{name} {help_text}")
+            lines.append(f"# TYPE {p}_{name} {kind}")
+
+        with self._lock:
+            family('http_requests_total', 'counter', "Requests handled, by route, method and status.")
+            for (route, method, status), count in sorted(self._requests.items()):
+                lines.append(f"{p}_http_requests_total{_labels(route=route, method=method, status=status)} {count}")
+
+            family('http_request_duration_seconds', 'histogram', "Request duration, by route and method.")
+            for (route, method), histogram in sorted(self._durations.items()):
+                for bound, count in zip(self.buckets, histogram):
+                    labels = _labels(route=route, method=method, le=repr(bound))
+                    lines.append(f"{p}_http_request_duration_seconds_bucket{labels} {count}")
+                total = histogram[len(self.buckets)]
+                lines.append(f"{p}_http_request_duration_seconds_bucket"
+                             f"{_labels(route=route, method=method, le='+Inf')} {total}")
+                lines.append(f"{p}_http_request_duration_seconds_sum{_labels(route=route, method=method)} "
+                             f"{histogram[-1]:.6f}")
+                lines.append(f"{p}_http_request_duration_seconds_count{_labels(route=route, method=method)} {total}")
+
+            family('request_phase_seconds_total', 'counter',
+                   "Time spent per request phase (connect, query, fetch, convert, pandas_io, pandas, render, other).")
+            for (route, name), seconds in sorted(self._phases.items()):
+                lines.append(f"{p}_request_phase_seconds_total{_labels(route=route, phase=name)} {seconds:.6f}")
+
+            family('sql_statements_total', 'counter', "SQL statements executed, by route.")
+            for route, (statements, _) in sorted(self._sql.items()):
+                lines.append(f"{p}_sql_statements_total{_labels(route=route)} {statements}")
+            family('sql_duration_seconds_total', 'counter', "Time spent executing SQL statements, by route.")
+            for route, (_, seconds) in sorted(self._sql.items()):
+                lines.append(f"{p}_sql_duration_seconds_total{_labels(route=route)} {seconds:.6f}")
+
+            family('request_exceptions_total', 'counter', "Unhandled exceptions, by route.")
+            for route, count in sorted(self._exceptions.items()):
+                lines.append(f"{p}_request_exceptions_total{_labels(route=route)} {count}")
+
+        for name, help_text, series in gauges:
+            family(name, 'gauge', help_text)
+            for labels, value in series:
+                lines.append(f"{p}_{name}{_labels(**labels) if labels else ''} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+class SampledProfiler:
+    """Profile a random share of requests; keep the dumps of the slow ones"""
+
+    def __init__(self, sample_rate=0.0, slow_ms=500, out_dir='profiles', engine='cprofile'):
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.out_dir = out_dir
+        self.engine = engine
+        # Only one profiler can be active per process on newer Pythons
+        self._busy = threading.Lock()
+
+    def start(self):
+        """A running profiler for this request, or None when it is not sampled"""
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        if not self._busy.acquire(blocking=False):
+            return None
+        try:
+            if self.engine == 'pyinstrument':
+                try:
+                    from pyinstrument import Profiler
+                    profiler = Profiler(async_mode='disabled')
+                    profiler.start()
+                    return profiler
+                except ImportError:
+                    print("pyinstrument is not installed; falling back to cProfile")
+                    self.engine = 'cprofile'
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+            return profiler
+        except Exception as e:
+            print(f"Profiler error: {e}")
+            self._busy.release()
+            return None
+
+    def finish(self, profiler, route, seconds):
+        """Stop the profiler and write its output when the request was slow; returns the file or None"""
+        try:
+            if self.engine == 'pyinstrument':
+                profiler.stop()
+            else:
+                profiler.disable()
+            if seconds * 1000 < self.slow_ms:
+                return None
+            os.makedirs(self.out_dir, exist_ok=True)
+            slug = re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'
+            base = os.path.join(self.out_dir, f"{time.strftime('%Y%m%d-%H%M%S')}_{slug}_{seconds * 1000:.0f}ms")
+            if self.engine == 'pyinstrument':
+                path = base + '.html'
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(profiler.output_html())
+            else:
+                path = base + '.prof'
+                profiler.dump_stats(path)
+            return path
+        except Exception as e:
+            print(f"Profiler error: {e}")
+            return None
+        finally:
+            self._busy.release()
+
+
+def init_app(app, registry, profiler=None):
+    """Time every request of `app` into `registry`, profiling a sample of them with `profiler`"""
+    from flask import before_render_template, g, got_request_exception, request, template_rendered
+
+    def route_label():
+        # The rule, not the path, so /applications/<app_id> is one series
+        return request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+
+    def finish(timings, route, method, path, status, running):
+        seconds = timings.elapsed()
+        registry.observe(route, method, status, timings, seconds)
+        if running is not None:
+            dump = profiler.finish(running, route, seconds)
+            if dump:
+                print(f"Slow request {method} {path} ({seconds * 1000:.0f} ms) profiled to {dump}")
+
+    def timed_body(body, timings):
+        # A streamed body is generated after the request is torn down; keep timing it
+        _local.timings = timings
+        try:
+            yield from body
+        finally:
+            _local.timings = None
+
+    @app.before_request
+    def _start_timing():
+        _local.timings = RequestTimings()
+        if profiler is not None:
+            g._profiler = profiler.start()
+
+    @app.after_request
+    def _server_timing(response):
+        timings = current()
+        if timings is None:
+            return response
+        g._status = response.status_code
+        parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.phases.items()]
+        parts.append(f"sql;desc=\"{timings.sql_statements} statements\";dur={timings.sql_seconds * 1000:.1f}")
+        parts.append(f"total;dur={timings.elapsed() * 1000:.1f}")
+        response.headers['Server-Timing'] = ', '.join(parts)
+        if response.is_streamed:
+            # Recorded when the client has the whole body instead of at teardown
+            g._streamed = True
+            response.response = timed_body(response.response, timings)
+            args = (timings, route_label(), request.method, request.path, response.status_code,
+                    g.pop('_profiler', None))
+            response.call_on_close(lambda: finish(*args))
+        return response
+
+    @app.teardown_request
+    def _finish_timing(exc):
+        timings = current()
+        _local.timings = None
+        if timings is None or g.get('_streamed'):
+            return
+        status = 500 if exc is not None else g.get('_status', 500)
+        finish(timings, route_label(), request.method, request.path, status, g.pop('_profiler', None))
+
+    def _render_started(sender, template, context, **extra):
+        timings = current()
+        if timings is not None:
+            timings.enter('render')
+
+    def _render_finished(sender, template, context, **extra):
+        timings = current()
+        if timings is not None and timings._stack and timings._stack[-1][0] == 'render':
+            timings.exit()
+
+    def _exception(sender, exception, **extra):
+        registry.observe_exception(route_label())
+
+    # Signal receivers are held weakly; keep them alive with the app
+    app.extensions['profiling'] = (registry, profiler, _render_started, _render_finished, _exception)
+    before_render_template.connect(_render_started, app)
+    template_rendered.connect(_render_finished, app)
+    got_request_exception.connect(_exception, app)
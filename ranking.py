@@ -0,0 +1,277 @@
+"""
+Composite applicant scores, ranked waitlists and proposed offer cutoffs per program.
+
+Every application gets a score, the weighted mean (x100) of features scaled to 0..1 over fixed ranges:
+
+    gpa                    academic_profile.high_school_gpa over 0-4
+    sat_score              academic_profile.sat_score over 400-1600
+    achievements           student_achievements rows, counted up to ACHIEVEMENTS_CAP
+    scholarship_requested  1 when requested (weight 0 by default: the ranking is need-blind)
+
+Missing values count as 0. RANKING_WEIGHTS="gpa=0.5,sat_score=0.3,achievements=0.2" changes the
+weights (features left out keep DEFAULT_WEIGHTS).
+
+Waitlisted applications of a cycle are ranked per program, best score first. For each program:
+
+    seats        PROGRAM_SEATS="P101=40,P109=120" (or ?seats= for one program); else last cycle's Enrolled
+    yield        Enrolled / (Enrolled + Lost) in earlier cycles (all programs' when the program has none)
+    open seats   seats - Enrolled - Accepted x yield, in the ranked cycle
+    offers       open seats / yield, at most the waitlist
+
+and the proposed cutoff is the score of the last applicant within the offers.
+
+The scales are fixed, so a score depends on its own row only: RankingCache scores the whole
+table in one pass, then follows the change feed, scoring just the new submissions and
+applying status changes in place before ranking again.
+"""
+import math
+import threading
+
+import numpy as np
+import pandas as pd
+
+from profiling import phase
+
+# Columns of Repository.ranking_frame(), one row per application
+FRAME_COLUMNS = ['application_id', 'first_name', 'last_name', 'email', 'program_id', 'status', 'submission_date',
+                 'year', 'gpa', 'sat_score', 'scholarship_requested', 'achievements']
+# Achievements beyond this many add nothing to the score
+ACHIEVEMENTS_CAP = 3
+# feature -> (value scored 0, value scored 1)
+SCALES = {
+    'gpa': (0.0, 4.0),
+    'sat_score': (400, 1600),
+    'achievements': (0, ACHIEVEMENTS_CAP),
+    'scholarship_requested': (0, 1),
+}
+DEFAULT_WEIGHTS = {'gpa': 0.45, 'sat_score': 0.35, 'achievements': 0.2, 'scholarship_requested': 0.0}
+
+
+def _number(value, digits=2):
+    """JSON-friendly float (None for NaN)"""
+    if value is None or pd.isna(value):
+        return None
+    return round(float(value), digits)
+
+
+def _pairs(text):
+    """[(key, value)] of "key=value,key=value" """
+    pairs = []
+    for part in (text or '').split(','):
+        if part.strip():
+            key, _, value = part.partition('=')
+            pairs.append((key.strip(), value.strip()))
+    return pairs
+
+
+def parse_weights(text):
+    """{feature: weight} from "gpa=0.5,sat_score=0.3"; raises ValueError"""
+    weights = dict(DEFAULT_WEIGHTS)
+    for feature, value in _pairs(text):
+        if feature not in weights:
+            raise ValueError(f"Unknown ranking feature '{feature}' (use {', '.join(SCALES)})")
+        weights[feature] = float(value)
+    if not any(weights.values()):
+        raise ValueError("At least one ranking weight must be non-zero")
+    return weights
+
+
+def parse_seats(text):
+    """{program_id: seats} from "P101=40,P109=120"; raises ValueError"""
+    return {program_id: max(0, int(value)) for program_id, value in _pairs(text)}
+
+
+def scores(frame, weights):
+    """Composite score of every row: one matrix product over the scaled features"""
+    columns = []
+    for feature, (low, high) in SCALES.items():
+        values = pd.to_numeric(frame[feature], errors='coerce').to_numpy(dtype=float)
+        columns.append(np.clip((values - low) / (high - low), 0.0, 1.0))
+    features = np.nan_to_num(np.column_stack(columns))
+    vector = np.array([weights[feature] for feature in SCALES])
+    return 100.0 * (features @ vector) / np.abs(vector).sum()
+
+
+def prepare(frame, weights):
+    """ranking_frame() rows indexed by application_id, with dates parsed and a score column"""
+    frame = frame.drop_duplicates('application_id', keep='last').set_index('application_id')
+    frame['submission_date'] = pd.to_datetime(frame['submission_date'], errors='coerce')
+    frame['year'] = pd.to_numeric(frame['year'], errors='coerce')
+    # Plain strings: status changes write values a categorical column may not have
+    frame['status'] = frame['status'].astype(object)
+    frame['score'] = scores(frame, weights)
+    return frame
+
+
+def rank(frame, year):
+    """Waitlisted rows of `year` (every year when None), best first within each program, with a rank column"""
+    waitlist = frame[frame['status'] == 'Waitlisted']
+    if year is not None:
+        waitlist = waitlist[waitlist['year'] == year]
+    waitlist = waitlist.reset_index().sort_values(['program_id', 'score', 'submission_date', 'application_id'],
+                                                  ascending=[True, False, True, True], na_position='last')
+    waitlist['rank'] = waitlist.groupby('program_id', observed=True).cumcount() + 1
+    return waitlist
+
+
+def cycle_counts(frame, year):
+    """Per program: waitlisted, enrolled and accepted in the cycle, last cycle's Enrolled and historical yield"""
+    if year is None:
+        # No cycle chosen: the latest one stands in for "this year"
+        year = int(frame['year'].max()) if frame['year'].notna().any() else 0
+    by_program = frame.groupby(['program_id', 'year', 'status'], observed=True).size()
+    counts = by_program.unstack('status', fill_value=0)
+    counts = counts.reindex(columns=['Waitlisted', 'Accepted', 'Enrolled', 'Lost'], fill_value=0)
+    years = counts.index.get_level_values('year')
+    current = counts[years == year].droplevel('year')
+    last = counts[years == year - 1].droplevel('year')
+    # Decided offers only: Accepted offers are still open, so their outcome is unknown
+    history = counts[years < year].groupby(level='program_id').sum()
+    decided = history['Enrolled'] + history['Lost']
+    yields = (history['Enrolled'] / decided.where(decided > 0)).dropna()
+    overall = float(history['Enrolled'].sum() / decided.sum()) if decided.sum() else None
+
+    programs = {}
+    for program_id in counts.index.get_level_values('program_id').unique():
+        row = current.loc[program_id] if program_id in current.index else None
+        programs[program_id] = {
+            'waitlisted': int(row['Waitlisted']) if row is not None else 0,
+            'accepted': int(row['Accepted']) if row is not None else 0,
+            'enrolled': int(row['Enrolled']) if row is not None else 0,
+            'last_cycle_enrolled': int(last.loc[program_id, 'Enrolled']) if program_id in last.index else 0,
+            'yield_rate': float(yields[program_id]) if program_id in yields.index else overall,
+        }
+    return programs
+
+
+def plan(counts, seats, names):
+    """Proposed offers per program from cycle_counts() and {program_id: seats} (last cycle's Enrolled if absent)"""
+    plans = []
+    for program_id, row in sorted(counts.items()):
+        seat_count = seats.get(program_id, row['last_cycle_enrolled'])
+        yield_rate = row['yield_rate']
+        if yield_rate:
+            open_seats = max(0, seat_count - row['enrolled'] - round(row['accepted'] * yield_rate))
+            offers = min(row['waitlisted'], math.ceil(open_seats / yield_rate))
+        else:
+            # No offer has ever been decided: every open seat needs one offer
+            open_seats = max(0, seat_count - row['enrolled'] - row['accepted'])
+            offers = min(row['waitlisted'], open_seats)
+        plans.append({
+            'program_id': program_id,
+            'program_name': names.get(program_id),
+            'seats': seat_count,
+            'seats_configured': program_id in seats,
+            'enrolled': row['enrolled'],
+            'accepted': row['accepted'],
+            'yield_rate': _number(yield_rate, 4),
+            'open_seats': open_seats,
+            'waitlisted': row['waitlisted'],
+            'offers': offers,
+            'cutoff_score': None,
+        })
+    return plans
+
+
+def _items(rows, offers, names):
+    """Row dicts of one page of the ranked waitlist"""
+    rows = rows.assign(program_name=rows['program_id'].map(names),
+                       submission_date=rows['submission_date'].dt.strftime('%Y-%m-%d'),
+                       score=rows['score'].round(2),
+                       scholarship_requested=rows['scholarship_requested'].astype('boolean'),
+                       above_cutoff=rows['rank'] <= rows['program_id'].map(offers).fillna(0))
+    columns = ['application_id', 'first_name', 'last_name', 'email', 'program_id', 'program_name', 'status',
+               'submission_date', 'gpa', 'sat_score', 'scholarship_requested', 'achievements', 'score', 'rank',
+               'above_cutoff']
+    rows = rows[columns].astype(object)
+    return rows.where(rows.notna(), None).to_dict(orient='records')
+
+
+class RankingCache:
+    """Scores of every application, kept current from the change feed.
+
+    The first read loads and scores everything; later reads apply the events
+    since (new submissions are loaded and scored, status changes set in place).
+    Ranked waitlists and cycle counts are kept per year until the data moves.
+    """
+
+    def __init__(self, load_frame, data_version, changes_since, programs, weights=None, seats=None):
+        # load_frame(application_ids=None) -> DataFrame with FRAME_COLUMNS; programs() -> program dicts
+        self._load_frame = load_frame
+        self._data_version = data_version
+        self._changes_since = changes_since
+        self._programs = programs
+        self.weights = dict(weights or DEFAULT_WEIGHTS)
+        self.seats = dict(seats or {})
+        self._lock = threading.Lock()
+        self._version = None
+        self._frame = None
+        self._ranked = {}
+
+    def _sync(self):
+        """Load and score everything, or apply the changes since the last read. Caller holds the lock."""
+        version = self._data_version()
+        if self._frame is None:
+            # Version first: anything written while loading is applied again (idempotently) next time
+            with phase('pandas'):
+                self._frame = prepare(self._load_frame(), self.weights)
+            self._version = version
+            self._ranked = {}
+            return
+        if version == self._version:
+            return
+        submitted, statuses = [], {}
+        while True:
+            events = self._changes_since(self._version, 1000)
+            if not events:
+                break
+            for event in events:
+                if event['event'] == 'submitted':
+                    submitted.append(event['application_id'])
+                else:
+                    statuses[event['application_id']] = event['new_status']
+            self._version = events[-1]['version']
+        with phase('pandas'):
+            frame = self._frame
+            if submitted:
+                new = [prepare(self._load_frame(submitted[start:start + 500]), self.weights)
+                       for start in range(0, len(submitted), 500)]
+                frame = pd.concat([frame.drop(index=submitted, errors='ignore'), *new])
+            known = [app_id for app_id in statuses if app_id in frame.index]
+            if known:
+                frame.loc[known, 'status'] = [statuses[app_id] for app_id in known]
+            self._frame = frame
+        self._ranked = {}
+
+    def ranking(self, year=None, program_id=None, seats=None, offset=0, limit=50):
+        """(version, program plans, total, items) of the waitlist of `year`, best first; seats override the config"""
+        with self._lock:
+            self._sync()
+            cached = self._ranked.get(year)
+            if cached is None:
+                with phase('pandas'):
+                    cached = self._ranked[year] = (rank(self._frame, year), cycle_counts(self._frame, year))
+            version = self._version
+        waitlist, counts = cached
+        names = {program['program_id']: program['name'] for program in self._programs()}
+        plans = plan(counts, {**self.seats, **(seats or {})}, names)
+        offers = {row['program_id']: row['offers'] for row in plans}
+        # Cutoff: the score of the last applicant within the offers
+        ranked = waitlist.set_index(['program_id', 'rank'])['score']
+        for row in plans:
+            if row['offers'] and (row['program_id'], row['offers']) in ranked.index:
+                row['cutoff_score'] = _number(ranked[(row['program_id'], row['offers'])])
+        if program_id is not None:
+            waitlist = waitlist[waitlist['program_id'] == program_id]
+            plans = [row for row in plans if row['program_id'] == program_id]
+        else:
+            # Across programs: best scores first (rank stays the place within the program)
+            waitlist = waitlist.sort_values(['score', 'application_id'], ascending=[False, True])
+        return version, plans, len(waitlist), _items(waitlist.iloc[offset:offset + limit], offers, names)
+
+    def invalidate(self):
+        """Drop the scores; the next read loads everything again"""
+        with self._lock:
+            self._version = None
+            self._frame = None
+            self._ranked = {}
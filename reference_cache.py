@@ -0,0 +1,54 @@
+import threading
+import time
+
+from http_cache import etag_for
+
+
+class ReferenceCache:
+    """Per-process cache of read-mostly lookup tables (programs, roles, age_ranges).
+
+    Each table is loaded once (prefill() at startup, or on first use) and
+    served from memory until its TTL runs out or invalidate() drops it. If a
+    reload fails, the last good copy keeps being served.
+    """
+
+    def __init__(self, loaders, ttl=3600):
+        # name -> loader() returning a list of row dicts
+        self._loaders = loaders
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}  # name -> (loaded_at, rows, etag)
+
+    def _entry(self, name):
+        """Cached (loaded_at, rows, etag), reloading when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                return entry
+            try:
+                rows = list(self._loaders[name]())
+            except Exception as e:
+                print(f"Error loading {name}: {e}")
+                if entry is None:
+                    return (None, [], etag_for([]))
+                return entry
+            entry = self._entries[name] = (time.monotonic(), rows, etag_for(rows))
+            return entry
+
+    def get(self, name):
+        """Rows of one table (shared: do not mutate)"""
+        return self._entry(name)[1]
+
+    def etag(self, name):
+        """Validator that changes whenever the table's contents do"""
+        return self._entry(name)[2]
+
+    def invalidate(self, *names):
+        """Drop the given tables (all when none are named); the next read reloads them"""
+        with self._lock:
+            for name in names or list(self._entries):
+                self._entries.pop(name, None)
+
+    def prefill(self):
+        for name in self._loaders:
+            self._entry(name)
@@ -0,0 +1,203 @@
+"""
+Storage backends behind the Flask app.
+
+app.py talks only to a Repository; DATA_BACKEND picks the implementation:
+    mssql   SQL Server through pyodbc (default)
+    sqlite  a local SQLite file (SQLITE_PATH), e.g. one filled by bulk_load.py
+    csv     the generated files in DATA_DIR, as CSV or Parquet (DATA_FORMAT)
+"""
+import os
+from datetime import datetime
+
+from db_pool import ConnectionPool, PoolTimeout, init_app as init_db_pool
+from id_allocator import FileIdAllocator, SequenceIdAllocator
+from profiling import InstrumentedConnection, phase
+
+BACKENDS = ('mssql', 'sqlite', 'csv')
+
+
+class Repository:
+    """Data access used by the routes.
+
+    Status updates return what the dashboard counters need to adjust
+    themselves: (old_status, program_id, submission_year) per application.
+    Submissions and status changes are also recorded as versioned change
+    events ('submitted', 'status_changed') for incremental consumers.
+    """
+
+    def get_user(self, email, password):
+        """User dict (user_id, email, role_id) for valid credentials, else None"""
+        raise NotImplementedError
+
+    def register(self, email, password):
+        """(True, new user_id) or (False, message)"""
+        raise NotImplementedError
+
+    def list_applications(self, page=1, page_size=None, year=None, date_from=None, date_to=None,
+                          status=None, program_id=None, sort='date_desc', after=None, before=None):
+        """One page of the master list (listing.page_result)"""
+        raise NotImplementedError
+
+    def search(self, query, page=1, page_size=None, year=None, date_from=None, date_to=None,
+               status=None, program_id=None):
+        """One page of applications matching a full-text query, best first (listing.page_result).
+
+        Items are master list rows plus 'score' (higher is better) and 'snippet',
+        an HTML excerpt with the matched words in <mark>.
+        """
+        raise NotImplementedError
+
+    def invalidate_search(self):
+        """Drop search state kept in memory (CSV backend); the SQL backends' index is a table"""
+
+    def get_application(self, app_id):
+        """One application with applicant, program and long text fields, or None"""
+        raise NotImplementedError
+
+    def get_sop(self, app_id):
+        """{'application_id', 'submission_date' (datetime or None), 'sop_text'} or None"""
+        raise NotImplementedError
+
+    def update_status(self, app_id, new_status):
+        """Previous (status, program_id, year) of the application, or None if it was not updated"""
+        raise NotImplementedError
+
+    def update_statuses(self, decisions):
+        """Apply {app_id: new_status}; returns {app_id: previous (status, program_id, year)} or None on failure"""
+        raise NotImplementedError
+
+    def reserve_submission(self, user_id, form):
+        """Submission dict for submit_many: the parsed form plus IDs reserved up front"""
+        ids = self.id_allocator.next_ids(['applicant', 'application', 'profile'])
+        return {
+            'user_id': user_id,
+            'form': form,
+            'applicant_id': ids['applicant'],
+            'application_id': ids['application'],
+            'profile_id': ids['profile'],
+            'submitted_at': datetime.now().isoformat(sep=' ', timespec='milliseconds'),
+        }
+
+    def submit(self, user_id, form):
+        """Store a new application (fields parsed by the route); returns its (application_id, applicant_id)"""
+        submission = self.reserve_submission(user_id, form)
+        self.submit_many([submission])
+        return submission['application_id'], submission['applicant_id']
+
+    def submit_many(self, submissions):
+        """Store reserved submissions in one transaction; returns the application IDs written.
+
+        Submissions whose application already exists are skipped, so a batch
+        replayed after a crash is not stored twice.
+        """
+        raise NotImplementedError
+
+    def programs(self):
+        """Programs ordered by name; raises when the backend is unavailable (see ReferenceCache)"""
+        raise NotImplementedError
+
+    def roles(self):
+        raise NotImplementedError
+
+    def age_ranges(self):
+        """Age ranges (range_id, label, min, max) ordered by min"""
+        raise NotImplementedError
+
+    def dashboard_counts(self):
+        """[(status, program_id, year, count)] for kpi.KpiCounters"""
+        raise NotImplementedError
+
+    def my_applications(self, user_id):
+        """Applications of one user, newest first"""
+        raise NotImplementedError
+
+    def analytics_frame(self):
+        """pandas DataFrame with analytics.FRAME_COLUMNS, one row per application"""
+        raise NotImplementedError
+
+    def ranking_frame(self, application_ids=None):
+        """pandas DataFrame with ranking.FRAME_COLUMNS, one row per application (or per given ID)"""
+        raise NotImplementedError
+
+    def sop_texts(self, application_ids=None, batch_size=5000):
+        """Yield [(application_id, sop_text)] batches of every application, or of the given IDs"""
+        raise NotImplementedError
+
+    def export_applications(self, since=None, batch_size=5000):
+        """Yield the master list (plus updated_at) as lists of row dicts; `since` keeps rows changed at or after it"""
+        raise NotImplementedError
+
+    def changes_since(self, version, limit=500):
+        """Up to `limit` change events (change_event dicts) with a version above `version`, oldest first"""
+        raise NotImplementedError
+
+    def data_version(self):
+        """Current version of the applications data; every submission or status change raises it"""
+        raise NotImplementedError
+
+
+def change_event(version, application_id, event, old_status, new_status, program_id, occurred_at):
+    """One entry of the change feed, the same shape for every backend"""
+    if hasattr(occurred_at, 'isoformat'):
+        occurred_at = occurred_at.isoformat(sep=' ', timespec='milliseconds')
+    return {'version': int(version), 'application_id': application_id, 'event': event,
+            'old_status': old_status, 'new_status': new_status, 'program_id': program_id,
+            'occurred_at': occurred_at}
+
+
+def create_repository(app, backend=None, connection_string=None):
+    """Build the configured repository; returns (repository, connection pool or None)"""
+    backend = backend or os.getenv('DATA_BACKEND', 'mssql')
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown DATA_BACKEND {backend!r}; expected one of {', '.join(BACKENDS)}")
+
+    if backend == 'csv':
+        from csv_repository import create_csv_repository
+        data_dir = os.getenv('DATA_DIR', os.getcwd())
+        return create_csv_repository(data_dir, os.getenv('DATA_FORMAT', 'csv')), None
+
+    from sql_repository import SqlRepository
+    if backend == 'sqlite':
+        import sqlite3
+        sqlite_path = os.getenv('SQLITE_PATH', 'admissions.db')
+
+        def connect():
+            # The pool hands a connection to one thread at a time
+            return InstrumentedConnection(sqlite3.connect(sqlite_path, timeout=30, check_same_thread=False))
+    else:
+        import pyodbc
+        # Our pool replaces the ODBC driver manager's pooling so there is only one layer to size
+        pyodbc.pooling = False
+
+        def connect():
+            return InstrumentedConnection(pyodbc.connect(connection_string))
+
+    pool = ConnectionPool(
+        connect,
+        min_size=int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+        max_size=int(os.getenv('DB_POOL_MAX_SIZE', 20)),
+        timeout=float(os.getenv('DB_POOL_TIMEOUT', 30)),
+        max_idle=float(os.getenv('DB_POOL_MAX_IDLE', 300))
+    )
+    borrow_connection = init_db_pool(app, pool)
+
+    def get_connection():
+        """Return the pooled connection borrowed for the current request"""
+        try:
+            with phase('connect'):
+                return borrow_connection()
+        except PoolTimeout as e:
+            print(f"Database pool exhausted: {e}")
+            return None
+        except Exception as e:
+            print(f"Database connection error: {e}")
+            return None
+
+    repo = SqlRepository(get_connection, backend)
+    if backend == 'sqlite':
+        # SQLite has no sequences; a counter file next to the database plays their part
+        repo.id_allocator = FileIdAllocator(os.getenv('SQLITE_PATH', 'admissions.db') + '.ids.json',
+                                            seed=repo.highest_ids)
+    else:
+        repo.id_allocator = SequenceIdAllocator(get_connection, block_size=int(os.getenv('ID_BLOCK_SIZE', 20)))
+    return repo, pool
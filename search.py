@@ -0,0 +1,218 @@
+"""
+Full-text search over applications: applicant name, email, city/country, SOP and achievements.
+
+The index is the application_search table (migration 5), one row per application:
+    sqlite   an FTS5 table, ranked with bm25()
+    mssql    a plain table with a full-text index (CHANGE_TRACKING AUTO) where Full-Text Search
+             is installed, ranked by CONTAINSTABLE; without it, LIKE with weighted column matches
+    csv      the same FTS5 table in an in-memory SQLite database (MemorySearchIndex)
+
+submit_many adds each new application's row in the same transaction, so nothing is
+rebuilt on /submit_application. After loading data outside the app (bulk_load.py does
+this itself):
+    python search.py rebuild --sqlite admissions.db
+    python search.py rebuild                      # SQL Server (DB_CONNECTION_STRING or --dsn)
+
+Every word of a query must match, as a prefix: "comp sci" finds "Computer Science".
+A query that is an application ID, or the start of one ("APP123"), lists those
+applications by ID instead; it falls back to the index when none exists.
+"""
+import argparse
+import html
+import re
+import sqlite3
+import threading
+
+from dotenv import load_dotenv
+
+# (column, weight): a hit in the name or email outranks one in the SOP
+SEARCH_COLUMNS = [('name', 10.0), ('email', 10.0), ('location', 3.0), ('sop_text', 1.0), ('achievements', 2.0)]
+FTS5_TABLE = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS application_search USING fts5(
+        application_id UNINDEXED, name, email, location, sop_text, achievements,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )
+"""
+INSERT_INTO = "INSERT INTO application_search (application_id, name, email, location, sop_text, achievements)"
+# Higher is better; bm25() itself is lower-is-better and the first weight is for application_id
+FTS5_SCORE = f"-bm25(application_search, 0, {', '.join(str(weight) for _, weight in SEARCH_COLUMNS)})"
+# Words of a query that are used; the rest are ignored
+MAX_TERMS = 8
+# Words around the first hit shown in a result snippet
+SNIPPET_WORDS = 16
+
+_WORD = re.compile(r'\w+')
+# Application IDs are APP + a number (id_allocator.ID_KINDS)
+_APPLICATION_ID = re.compile(r'APP\d+', re.IGNORECASE)
+
+
+def query_terms(text):
+    """Lowercased words of a search box query"""
+    return _WORD.findall((text or '').lower())[:MAX_TERMS]
+
+
+def application_id_prefix(text):
+    """The application ID (or start of one) a query consists of, uppercased; None for any other query"""
+    text = (text or '').strip()
+    return text.upper() if _APPLICATION_ID.fullmatch(text) else None
+
+
+def fts5_match(terms):
+    """FTS5 MATCH expression: every term as a prefix"""
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def contains_condition(terms):
+    """SQL Server CONTAINS/CONTAINSTABLE condition: every term as a prefix"""
+    return ' AND '.join(f'"{term}*"' for term in terms)
+
+
+def source_select(dialect):
+    """SELECT of index rows (application_id + SEARCH_COLUMNS) from the base tables"""
+    if dialect == 'sqlite':
+        name = "a.first_name || ' ' || a.last_name"
+        location = "COALESCE(a.city, '') || ' ' || COALESCE(a.country, '')"
+        achievements = "group_concat(sa.achievement_name, ' ')"
+    else:
+        name = "CONCAT(a.first_name, ' ', a.last_name)"
+        location = "CONCAT(a.city, ' ', a.country)"
+        achievements = "STRING_AGG(CAST(sa.achievement_name AS NVARCHAR(MAX)), ' ')"
+    return f"""
+        SELECT app.application_id, {name}, u.email, {location}, app.sop_text,
+               (SELECT {achievements} FROM student_achievements sa WHERE sa.applicant_id = app.applicant_id)
+        FROM applications app
+        INNER JOIN applicants a ON app.applicant_id = a.applicant_id
+        LEFT JOIN users u ON a.user_id = u.user_id
+    """
+
+
+def index_applications(cursor, dialect, application_ids):
+    """Add the index rows of newly written applications (call inside the writing transaction)"""
+    for start in range(0, len(application_ids), 500):
+        batch = application_ids[start:start + 500]
+        cursor.execute(f"{INSERT_INTO} {source_select(dialect)} "
+                       f"WHERE app.application_id IN ({', '.join('?' for _ in batch)})", batch)
+
+
+def rebuild(conn, dialect):
+    """Refill application_search from the base tables; returns the number of rows indexed"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM application_search")
+        cursor.execute(f"{INSERT_INTO} {source_select(dialect)}")
+        cursor.execute("SELECT COUNT(*) FROM application_search")
+        count = cursor.fetchone()[0]
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return count
+
+
+def has_search_table(conn, dialect):
+    cursor = conn.cursor()
+    if dialect == 'sqlite':
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'application_search'")
+    else:
+        cursor.execute("SELECT 1 FROM sys.tables WHERE name = 'application_search'")
+    return cursor.fetchone() is not None
+
+
+def snippet(texts, terms, words=SNIPPET_WORDS):
+    """HTML excerpt of the first text containing a term, hits in <mark> (everything else escaped)"""
+    prefixes = tuple(terms)
+    for text in texts:
+        if not text:
+            continue
+        matches = list(_WORD.finditer(text))
+        hits = [i for i, match in enumerate(matches) if match.group().lower().startswith(prefixes)]
+        if not hits:
+            continue
+        first = max(0, hits[0] - words // 4)
+        last = min(len(matches), first + words)
+        parts = ['...' if first else '']
+        position = matches[first].start()
+        for match in matches[first:last]:
+            parts.append(html.escape(text[position:match.start()]))
+            word = html.escape(match.group())
+            parts.append(f"<mark>{word}</mark>" if match.group().lower().startswith(prefixes) else word)
+            position = match.end()
+        parts.append('...' if last < len(matches) else '')
+        return ''.join(parts)
+    return ''
+
+
+class MemorySearchIndex:
+    """application_search as FTS5 in an in-memory SQLite database (the CSV/Parquet backend's index).
+
+    Built from load_rows() on the first search; add() indexes new submissions in place.
+    """
+
+    def __init__(self, load_rows):
+        # load_rows() -> iterable of (application_id, name, email, location, sop_text, achievements)
+        self._load_rows = load_rows
+        self._lock = threading.Lock()
+        self._conn = None
+        self._indexed = set()
+
+    def _connect(self):
+        """The index, building it on first use. Caller holds the lock."""
+        if self._conn is None:
+            conn = sqlite3.connect(':memory:', check_same_thread=False)
+            conn.execute(FTS5_TABLE)
+            rows = list(self._load_rows())
+            conn.executemany(f"{INSERT_INTO} VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._indexed.update(row[0] for row in rows)
+            self._conn = conn
+        return self._conn
+
+    def add(self, rows):
+        """Index new applications (skipped until the first search builds the index)"""
+        with self._lock:
+            if self._conn is None:
+                return
+            # Keyed by application_id: each application is indexed once, even if repeated in `rows`
+            rows = list({row[0]: row for row in rows if row[0] not in self._indexed}.values())
+            self._conn.executemany(f"{INSERT_INTO} VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._indexed.update(row[0] for row in rows)
+
+    def search(self, terms):
+        """[(application_id, score, sop_text, achievements)] of every match, best first"""
+        with self._lock:
+            return self._connect().execute(f"""
+                SELECT application_id, {FTS5_SCORE} AS score, sop_text, achievements
+                FROM application_search
+                WHERE application_search MATCH ?
+                ORDER BY score DESC
+            """, (fts5_match(terms),)).fetchall()
+
+    def invalidate(self):
+        """Drop the index; the next search rebuilds it"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = None
+            self._indexed = set()
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Rebuild the application search index")
+    parser.add_argument('command', choices=['rebuild'])
+    parser.add_argument('--sqlite', help="SQLite database file instead of SQL Server")
+    parser.add_argument('--dsn', help="ODBC connection string (defaults to DB_CONNECTION_STRING)")
+    args = parser.parse_args()
+
+    import migrations
+    conn, dialect = migrations.connect(args.sqlite, args.dsn)
+    try:
+        if not has_search_table(conn, dialect):
+            print("No application_search table; run `python migrations.py upgrade` first.")
+            return
+        print(f"Indexed {rebuild(conn, dialect)} applications.")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
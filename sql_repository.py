@@ -0,0 +1,834 @@
+import uuid
+from datetime import date, datetime
+
+import pandas as pd
+
+from analytics import FRAME_COLUMNS
+from listing import DEFAULT_PAGE_SIZE, KEYSET_SORTS, SORT_OPTIONS, encode_cursor, page_result
+from profiling import phase
+from ranking import FRAME_COLUMNS as RANKING_COLUMNS
+from repository import Repository, change_event
+from search import FTS5_SCORE, SEARCH_COLUMNS, application_id_prefix, contains_condition, fts5_match, \
+    has_search_table, index_applications, query_terms, snippet
+
+# Joins behind the master list, details, export and search queries
+APPLICATIONS_JOINS = """
+    INNER JOIN applicants a ON app.applicant_id = a.applicant_id
+    LEFT JOIN programs p ON app.program_id = p.program_id
+    LEFT JOIN users u ON a.user_id = u.user_id
+"""
+APPLICATIONS_FROM = "\n    FROM applications app" + APPLICATIONS_JOINS
+# Master list columns; {long_text} adds the SOP and comments for get_application
+APPLICATIONS_SELECT = """
+    SELECT
+        app.application_id,
+        app.applicant_id,
+        app.status,
+        app.submission_date,
+        app.days_to_submit,
+        app.fees_paid,{long_text}
+        a.user_id,
+        a.first_name,
+        a.last_name,
+        a.dob,
+        a.gender,
+        a.country,
+        a.city,
+        a.is_first_generation,
+        p.program_id,
+        p.name AS program_name,
+        p.dept,
+        u.email
+""" + APPLICATIONS_FROM
+# OUTPUT ... INTO clause recording each status change in the change feed (SQL Server)
+EVENTS_OUTPUT = """OUTPUT inserted.application_id, 'status_changed', deleted.status, inserted.status,
+                           deleted.program_id, inserted.updated_at
+                    INTO application_events (application_id, event_type, old_status, new_status, program_id,
+                                             occurred_at)"""
+DETAILS_SELECT = APPLICATIONS_SELECT.format(long_text="\n        app.sop_text,\n        app.admin_comments,")
+EXPORT_SELECT = APPLICATIONS_SELECT.format(long_text="\n        app.updated_at,")
+# Master list page as (expression, column, kind). Dates are formatted and NULLs replaced in the
+# SELECT itself, so rows come back ready for the template/JSON: 'date' -> 'YYYY-MM-DD',
+# 'text' and 'date' default to 'Unknown', 'number' and 'flag' (BIT on SQL Server) to 0.
+LIST_COLUMNS = [
+    ('app.application_id', 'application_id', 'text'),
+    ('app.applicant_id', 'applicant_id', 'text'),
+    ('app.status', 'status', 'text'),
+    ('app.submission_date', 'submission_date', 'date'),
+    ('app.days_to_submit', 'days_to_submit', 'number'),
+    ('app.fees_paid', 'fees_paid', 'flag'),
+    ('a.user_id', 'user_id', 'text'),
+    ('a.first_name', 'first_name', 'text'),
+    ('a.last_name', 'last_name', 'text'),
+    ('a.dob', 'dob', 'date'),
+    ('a.gender', 'gender', 'text'),
+    ('a.country', 'country', 'text'),
+    ('a.city', 'city', 'text'),
+    ('a.is_first_generation', 'is_first_generation', 'flag'),
+    ('p.program_id', 'program_id', 'text'),
+    ('p.name', 'program_name', 'text'),
+    ('p.dept', 'dept', 'text'),
+    ('u.email', 'email', 'text'),
+]
+# Rows per fetchmany call when materializing results
+FETCH_BATCH_SIZE = 1000
+
+
+def list_fields(dialect):
+    """SELECT list of the master list page in the given dialect"""
+    fields = []
+    for expression, column, kind in LIST_COLUMNS:
+        if kind == 'date':
+            # DATE/DATETIME (SQL Server) or ISO text (SQLite) -> 'YYYY-MM-DD'
+            if dialect == 'sqlite':
+                expression = f"SUBSTR({expression}, 1, 10)"
+            else:
+                expression = f"CONVERT(CHAR(10), {expression}, 23)"
+        if kind == 'flag':
+            default = "0" if dialect == 'sqlite' else "CAST(0 AS BIT)"
+        else:
+            default = "0" if kind == 'number' else "'Unknown'"
+        fields.append(f"COALESCE({expression}, {default}) AS {column}")
+    return "\n    SELECT\n        " + ",\n        ".join(fields)
+
+
+def list_select(dialect):
+    """SELECT ... FROM for the master list page in the given dialect"""
+    return list_fields(dialect) + APPLICATIONS_FROM
+
+
+def _date_str(value):
+    """DATE from SQL Server (date object) or SQLite (ISO text) as 'YYYY-MM-DD'"""
+    if hasattr(value, 'strftime'):
+        return value.strftime('%Y-%m-%d')
+    return str(value)[:10]
+
+
+def _dict_batches(cursor, batch_size=FETCH_BATCH_SIZE):
+    """Result rows as lists of dicts, fetched with fetchmany so one batch of raw rows is held at a time"""
+    columns = [column[0] for column in cursor.description]
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        with phase('convert'):
+            batch = [dict(zip(columns, row)) for row in rows]
+        yield batch
+
+
+def _dicts(cursor):
+    results = []
+    for batch in _dict_batches(cursor):
+        results.extend(batch)
+    return results
+
+
+class SqlRepository(Repository):
+    """Repository over SQL Server ('mssql') or SQLite ('sqlite') with the same schema"""
+
+    def __init__(self, get_connection, dialect='mssql', id_allocator=None):
+        # get_connection() -> the connection borrowed for the current request, or None
+        self.get_connection = get_connection
+        self.dialect = dialect
+        self.id_allocator = id_allocator
+        self.list_fields = list_fields(dialect)
+        self.list_select = self.list_fields + APPLICATIONS_FROM
+        # Checked on first use: migration 5 applied, and (SQL Server) a full-text index on it
+        self._search_table = None
+        self._full_text = None
+
+    # --- dialect helpers ---
+
+    def _year(self, column):
+        if self.dialect == 'sqlite':
+            return f"CAST(strftime('%Y', {column}) AS INTEGER)"
+        return f"YEAR({column})"
+
+    def _page(self, offset, limit):
+        """(clause, params) selecting `limit` rows after `offset` of an ordered query"""
+        if self.dialect == 'sqlite':
+            return " LIMIT ? OFFSET ?", [limit, offset]
+        return " OFFSET ? ROWS FETCH NEXT ? ROWS ONLY", [offset, limit]
+
+    def _date(self, value):
+        """Date/datetime parameter; SQLite stores them as ISO text"""
+        if self.dialect == 'sqlite' and isinstance(value, datetime):
+            return value.isoformat(sep=' ', timespec='milliseconds')
+        if self.dialect == 'sqlite' and isinstance(value, date):
+            return value.isoformat()
+        return value
+
+    def highest_ids(self):
+        """Largest numeric suffix per ID kind (seeds FileIdAllocator for SQLite)"""
+        conn = self.get_connection()
+        if not conn:
+            raise RuntimeError("Database connection failed")
+        cursor = conn.cursor()
+        highest = {}
+        for kind, table, column, prefix in (('user', 'users', 'user_id', 'U'),
+                                            ('applicant', 'applicants', 'applicant_id', 'A'),
+                                            ('application', 'applications', 'application_id', 'APP'),
+                                            ('profile', 'academic_profile', 'profile_id', 'P')):
+            cursor.execute(f"SELECT MAX(CAST(SUBSTR({column}, {len(prefix) + 1}) AS INTEGER)) FROM {table}")
+            highest[kind] = cursor.fetchone()[0]
+        return highest
+
+    # --- users ---
+
+    def get_user(self, email, password):
+        """Authenticate user from database"""
+        try:
+            conn = self.get_connection()
+            if not conn:
+                return None
+
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT user_id, email, role_id
+                FROM users
+                WHERE email = ? AND password_hash = ?
+            """, (email, password))
+            rows = _dicts(cursor)
+            return rows[0] if rows else None
+        except Exception as e:
+            print(f"Error reading users: {e}")
+            return None
+
+    def register(self, email, password):
+        """Register a new user in the database"""
+        try:
+            conn = self.get_connection()
+            if not conn:
+                return False, "Database connection failed"
+
+            cursor = conn.cursor()
+
+            # Check if email already exists
+            cursor.execute("SELECT email FROM users WHERE email = ?", (email,))
+            if cursor.fetchone():
+                return False, "Email already exists"
+
+            new_id = self.id_allocator.next_id('user')
+            cursor.execute("""
+                INSERT INTO users (user_id, email, password_hash, role_id, created_at)
+                VALUES (?, ?, ?, 2, ?)
+            """, (new_id, email, password, self._date(datetime.now().date())))
+            conn.commit()
+
+            return True, new_id
+        except Exception as e:
+            print(f"Registration error: {e}")
+            return False, str(e)
+
+    # --- applications ---
+
+    def _list_filters(self, year=None, date_from=None, date_to=None, status=None, program_id=None):
+        """Build the WHERE clause shared by the master list page and count queries"""
+        clauses = []
+        params = []
+        # Year is turned into a date range so an index on submission_date can be used
+        if year:
+            clauses.append("app.submission_date >= ? AND app.submission_date < ?")
+            params.extend([self._date(date(year, 1, 1)), self._date(date(year + 1, 1, 1))])
+        if date_from:
+            clauses.append("app.submission_date >= ?")
+            params.append(self._date(date_from))
+        if date_to:
+            clauses.append("app.submission_date <= ?")
+            params.append(self._date(date_to))
+        if status:
+            clauses.append("app.status = ?")
+            params.append(status)
+        if program_id:
+            clauses.append("app.program_id = ?")
+            params.append(program_id)
+        return clauses, params
+
+    def list_applications(self, page=1, page_size=DEFAULT_PAGE_SIZE, year=None, date_from=None, date_to=None,
+                          status=None, program_id=None, sort='date_desc', after=None, before=None):
+        """Get one page of the application list with all related data, plus the total count"""
+        filters = {'page': page, 'page_size': page_size}
+        try:
+            conn = self.get_connection()
+            if not conn:
+                return page_result([], 0, filters)
+
+            cursor = conn.cursor()
+            clauses, params = self._list_filters(year, date_from, date_to, status, program_id)
+
+            # Total count ignores the keyset position
+            count_query = """
+                SELECT COUNT(*)
+                FROM applications app
+                INNER JOIN applicants a ON app.applicant_id = a.applicant_id
+            """
+            if clauses:
+                count_query += " WHERE " + " AND ".join(clauses)
+            cursor.execute(count_query, params)
+            total = cursor.fetchone()[0]
+
+            descending = SORT_OPTIONS[sort][1]
+            keyset = sort in KEYSET_SORTS
+            if keyset and before:
+                # Previous page: read backwards from the cursor, then flip the rows into list order
+                descending = not descending
+            direction = "DESC" if descending else "ASC"
+            if keyset:
+                order_by = f"app.submission_date {direction}, app.application_id {direction}"
+                position = after or before
+                if position:
+                    op = "<" if descending else ">"
+                    clauses.append(f"(app.submission_date {op} ? OR "
+                                   f"(app.submission_date = ? AND app.application_id {op} ?))")
+                    position_date = self._date(position[0])
+                    params.extend([position_date, position_date, position[1]])
+            else:
+                order_by = f"a.last_name {direction}, a.first_name {direction}, app.application_id {direction}"
+
+            query = self.list_select
+            if clauses:
+                query += " WHERE " + " AND ".join(clauses)
+            # Fetch one extra row to know whether another page exists in the reading direction
+            offset = 0 if keyset and (after or before) else (page - 1) * page_size
+            page_clause, page_params = self._page(offset, page_size + 1)
+            cursor.execute(query + f" ORDER BY {order_by}" + page_clause, params + page_params)
+            results = _dicts(cursor)
+
+            more = len(results) > page_size
+            results = results[:page_size]
+            if keyset and before:
+                results.reverse()
+            next_cursor = prev_cursor = None
+            if keyset and results:
+                first, last = results[0], results[-1]
+                if more or before:
+                    next_cursor = encode_cursor(last['submission_date'], last['application_id'])
+                # Rows precede this page when it was reached through a cursor or an offset
+                if (more if before else bool(after) or page > 1):
+                    prev_cursor = encode_cursor(first['submission_date'], first['application_id'])
+
+            return page_result(results, total, filters, next_cursor, prev_cursor)
+        except Exception as e:
+            print(f"Data Error: {e}")
+            return page_result([], 0, filters)
+
+    def _search_source(self, conn, terms):
+        """(index source, score expression, WHERE clause, params of each) of a full-text query"""
+        if self.dialect == 'sqlite':
+            return "application_search", FTS5_SCORE, "application_search MATCH ?", ([], [], [fts5_match(terms)])
+
+        if self._full_text is None:
+            cursor = conn.cursor()
+            cursor.execute("SELECT OBJECTPROPERTY(OBJECT_ID('application_search'), 'TableHasActiveFulltextIndex')")
+            self._full_text = cursor.fetchone()[0] == 1
+        if self._full_text:
+            source = ("CONTAINSTABLE(application_search, *, ?) ft "
+                      "INNER JOIN application_search ON application_search.application_id = ft.[KEY]")
+            return source, "ft.RANK", "1 = 1", ([], [contains_condition(terms)], [])
+
+        # No Full-Text Search on this instance: every term in some column, scored by column weight
+        score_parts, score_params, where, where_params = [], [], [], []
+        for term in terms:
+            pattern = f"%{term.replace('_', '[_]')}%"
+            where.append("(" + " OR ".join(f"application_search.{column} LIKE ?"
+                                           for column, _ in SEARCH_COLUMNS) + ")")
+            where_params.extend(pattern for _ in SEARCH_COLUMNS)
+            for column, weight in SEARCH_COLUMNS:
+                score_parts.append(f"CASE WHEN application_search.{column} LIKE ? THEN {weight} ELSE 0 END")
+                score_params.append(pattern)
+        return "application_search", " + ".join(score_parts), " AND ".join(where), (score_params, [], where_params)
+
+    def _id_search(self, cursor, prefix, clauses, params, filters):
+        """Applications whose ID starts with `prefix`, in ID order (a range, so the primary key is used)"""
+        # Digits are consecutive characters: "APP12" covers ["APP12", "APP13")
+        clauses = ["app.application_id >= ? AND app.application_id < ?"] + clauses
+        params = [prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)] + params
+        where = " WHERE " + " AND ".join(clauses)
+        cursor.execute(f"SELECT COUNT(*) FROM applications app{where}", params)
+        total = cursor.fetchone()[0]
+        page_clause, page_params = self._page((filters['page'] - 1) * filters['page_size'], filters['page_size'])
+        cursor.execute(f"{self.list_select}{where} ORDER BY app.application_id{page_clause}", params + page_params)
+        results = _dicts(cursor)
+        for row in results:
+            row['score'] = None
+            row['snippet'] = ''
+        return page_result(results, total, filters)
+
+    def search(self, query, page=1, page_size=DEFAULT_PAGE_SIZE, year=None, date_from=None, date_to=None,
+               status=None, program_id=None):
+        """One page of applications matching a full-text query, best match first, plus the total count"""
+        filters = {'page': page, 'page_size': page_size}
+        terms = query_terms(query)
+        if not terms:
+            return page_result([], 0, filters)
+        try:
+            conn = self.get_connection()
+            if not conn:
+                return page_result([], 0, filters)
+
+            cursor = conn.cursor()
+            clauses, params = self._list_filters(year, date_from, date_to, status, program_id)
+            prefix = application_id_prefix(query)
+            if prefix:
+                result = self._id_search(cursor, prefix, clauses, params, filters)
+                if result['total']:
+                    return result
+
+            source, score, match, (score_params, source_params, match_params) = self._search_source(conn, terms)
+            where = " WHERE " + " AND ".join([match] + clauses)
+            applications = " INNER JOIN applications app ON app.application_id = application_search.application_id"
+
+            # Every indexed row is an application, so without filters only the index is read
+            matches = source + applications if clauses else source
+            cursor.execute(f"SELECT COUNT(*) FROM {matches}{where}", source_params + match_params + params)
+            total = cursor.fetchone()[0]
+
+            # Rank and page inside the subquery; the master list joins then run for the page rows only
+            page_clause, page_params = self._page((page - 1) * page_size, page_size)
+            cursor.execute(f"""{self.list_fields},
+                    hits.score,
+                    hits.match_sop,
+                    hits.match_achievements
+                FROM (
+                    SELECT application_search.application_id, {score} AS score,
+                           application_search.sop_text AS match_sop,
+                           application_search.achievements AS match_achievements
+                    FROM {matches}{where}
+                    ORDER BY score DESC, application_search.application_id DESC{page_clause}
+                ) hits
+                INNER JOIN applications app ON app.application_id = hits.application_id{APPLICATIONS_JOINS}
+                ORDER BY hits.score DESC, hits.application_id DESC
+            """, score_params + source_params + match_params + params + page_params)
+            results = _dicts(cursor)
+            for row in results:
+                row['score'] = round(float(row['score']), 3)
+                row['snippet'] = snippet((row.pop('match_sop'), row.pop('match_achievements')), terms)
+            return page_result(results, total, filters)
+        except Exception as e:
+            print(f"Search error: {e}")
+            return page_result([], 0, filters)
+
+    def get_application(self, app_id):
+        """Get one application with its long text fields (SOP, admin comments)"""
+        try:
+            conn = self.get_connection()
+            if not conn:
+                return None
+
+            cursor = conn.cursor()
+            cursor.execute(DETAILS_SELECT + " WHERE app.application_id = ?", (app_id,))
+            rows = _dicts(cursor)
+            if not rows:
+                return None
+
+            details = rows[0]
+            for key in ('submission_date', 'dob'):
+                if details.get(key):
+                    details[key] = _date_str(details[key])
+            return details
+        except Exception as e:
+            print(f"Error loading application {app_id}: {e}")
+            return None
+
+    def get_sop(self, app_id):
+        """Get only the statement of purpose for one application"""
+        try:
+            conn = self.get_connection()
+            if not conn:
+                return None
+
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT application_id, submission_date, sop_text FROM applications WHERE application_id = ?",
+                (app_id,)
+            )
+            rows = _dicts(cursor)
+            if not rows:
+                return None
+            submitted = rows[0]['submission_date']
+            return {
+                'application_id': rows[0]['application_id'],
+                'submission_date': datetime.fromisoformat(_date_str(submitted)) if submitted else None,
+                'sop_text': rows[0]['sop_text'] or ''
+            }
+        except Exception as e:
+            print(f"Error loading SOP for {app_id}: {e}")
+            return None
+
+    def dashboard_counts(self):
+        """Application counts grouped by status, program and submission year"""
+        conn = self.get_connection()
+        if not conn:
+            raise RuntimeError("Database connection failed")
+
+        cursor = conn.cursor()
+        year = self._year('submission_date')
+        cursor.execute(f"""
+            SELECT status, program_id, {year} AS year, COUNT(*) AS n
+            FROM applications
+            GROUP BY status, program_id, {year}
+        """)
+        return [tuple(row) for row in cursor.fetchall()]
+
+    def update_status(self, app_id, new_status):
+        """Update application status in database"""
+        changed = self.update_statuses({app_id: new_status})
+        return (changed or {}).get(app_id)
+
+    def update_statuses(self, decisions):
+        """Apply {app_id: new_status} in one set-based UPDATE; returns the previous values per updated ID"""
+        conn = None
+        try:
+            conn = self.get_connection()
+            if not conn:
+                return None
+
+            cursor = conn.cursor()
+            if self.dialect == 'sqlite':
+                changed = self._update_statuses_sqlite(cursor, decisions)
+            elif len(decisions) == 1:
+                # OUTPUT hands back the previous values so the dashboard counters can be adjusted in place
+                (app_id, new_status), = decisions.items()
+                cursor.execute(f"""
+                    UPDATE applications SET status = ?, updated_at = ?
+                    {EVENTS_OUTPUT}
+                    OUTPUT inserted.application_id, deleted.status, deleted.program_id,
+                           YEAR(deleted.submission_date)
+                    WHERE application_id = ?
+                """, (new_status, datetime.now(), app_id))
+                changed = cursor.fetchall()
+            else:
+                cursor.execute("""
+                    CREATE TABLE #decisions (
+                        application_id NVARCHAR(20) PRIMARY KEY,
+                        new_status NVARCHAR(20) NOT NULL
+                    )
+                """)
+                # One round trip for the whole batch instead of one INSERT per row
+                cursor.fast_executemany = True
+                cursor.executemany("INSERT INTO #decisions (application_id, new_status) VALUES (?, ?)",
+                                   list(decisions.items()))
+                cursor.execute(f"""
+                    UPDATE app SET app.status = d.new_status, app.updated_at = ?
+                    {EVENTS_OUTPUT}
+                    OUTPUT inserted.application_id, deleted.status, deleted.program_id,
+                           YEAR(deleted.submission_date)
+                    FROM applications app
+                    INNER JOIN #decisions d ON app.application_id = d.application_id
+                """, (datetime.now(),))
+                changed = cursor.fetchall()
+                cursor.execute("DROP TABLE #decisions")
+            conn.commit()
+            return {app_id: (old_status, program_id, year) for app_id, old_status, program_id, year in changed}
+        except Exception as e:
+            print(f"Error updating: {e}")
+            if conn:
+                conn.rollback()
+            return None
+
+    def _update_statuses_sqlite(self, cursor, decisions):
+        """Read the previous values, then update, inside the same write transaction"""
+        ids = list(decisions)
+        changed = []
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            cursor.execute(f"""
+                SELECT application_id, status, program_id, {self._year('submission_date')}
+                FROM applications
+                WHERE application_id IN ({', '.join('?' for _ in batch)})
+            """, batch)
+            changed.extend(tuple(row) for row in cursor.fetchall())
+        now = self._date(datetime.now())
+        cursor.executemany("UPDATE applications SET status = ?, updated_at = ? WHERE application_id = ?",
+                           [(decisions[row[0]], now, row[0]) for row in changed])
+        cursor.executemany("""
+            INSERT INTO application_events (application_id, event_type, old_status, new_status, program_id,
+                                            occurred_at)
+            VALUES (?, 'status_changed', ?, ?, ?, ?)
+        """, [(app_id, old_status, decisions[app_id], program_id, now)
+              for app_id, old_status, program_id, _ in changed])
+        # row_version = version of the row's latest event, like SQL Server's rowversion column
+        for start in range(0, len(changed), 500):
+            batch = [row[0] for row in changed[start:start + 500]]
+            cursor.execute(f"""
+                UPDATE applications SET row_version = (
+                    SELECT MAX(e.version) FROM application_events e
+                    WHERE e.application_id = applications.application_id
+                )
+                WHERE application_id IN ({', '.join('?' for _ in batch)})
+            """, batch)
+        return changed
+
+    def submit_many(self, submissions):
+        """Insert applicants, applications, events, profiles and achievements as multi-row batches in one transaction"""
+        conn = self.get_connection()
+        if not conn:
+            raise RuntimeError("Could not connect to database")
+
+        try:
+            cursor = conn.cursor()
+            if self.dialect != 'sqlite':
+                # Send each batch of parameter rows in one round trip
+                cursor.fast_executemany = True
+            ids = [s['application_id'] for s in submissions]
+            cursor.execute(f"SELECT application_id FROM applications WHERE application_id IN "
+                           f"({', '.join('?' for _ in ids)})", ids)
+            existing = {row[0] for row in cursor.fetchall()}
+            submissions = [s for s in submissions if s['application_id'] not in existing]
+            if not submissions:
+                return []
+            now = self._date(datetime.now())
+
+            cursor.executemany("""
+                INSERT INTO applicants (applicant_id, user_id, first_name, last_name, dob,
+                                       age_range_id, gender, country, city, is_first_generation)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, [(s['applicant_id'], s['user_id'], s['form']['first_name'], s['form']['last_name'],
+                   s['form']['dob'], s['form'].get('age_range_id', 1), s['form']['gender'], s['form']['country'],
+                   s['form']['city'], 1 if s['form']['is_first_gen'] else 0) for s in submissions])
+
+            cursor.executemany("""
+                INSERT INTO applications (application_id, applicant_id, program_id, status, submission_date,
+                                         days_to_submit, fees_paid, sop_text, admin_comments, updated_at)
+                VALUES (?, ?, ?, 'Waitlisted', ?, 0, 0, ?, '', ?)
+            """, [(s['application_id'], s['applicant_id'], s['form']['program_id'], s['submitted_at'][:10],
+                   s['form']['sop_text'], now) for s in submissions])
+            cursor.executemany("""
+                INSERT INTO application_events (application_id, event_type, old_status, new_status, program_id,
+                                                occurred_at)
+                VALUES (?, 'submitted', NULL, 'Waitlisted', ?, ?)
+            """, [(s['application_id'], s['form']['program_id'], now) for s in submissions])
+            if self.dialect == 'sqlite':
+                written = [s['application_id'] for s in submissions]
+                cursor.execute(f"""
+                    UPDATE applications SET row_version = (
+                        SELECT MAX(e.version) FROM application_events e
+                        WHERE e.application_id = applications.application_id
+                    )
+                    WHERE application_id IN ({', '.join('?' for _ in written)})
+                """, written)
+
+            cursor.executemany("""
+                INSERT INTO academic_profile (profile_id, applicant_id, high_school_gpa,
+                                             sat_score, scholarship_requested)
+                VALUES (?, ?, ?, ?, ?)
+            """, [(s['profile_id'], s['applicant_id'], s['form']['gpa'], s['form']['sat'],
+                   1 if s['form']['scholarship'] else 0) for s in submissions])
+
+            achievements = [(str(uuid.uuid4()), s['applicant_id'], s['form']['achievement'], s['submitted_at'][:10])
+                            for s in submissions if s['form']['achievement']]
+            if achievements:
+                cursor.executemany("""
+                    INSERT INTO student_achievements (id, applicant_id, achievement_name, date_awarded)
+                    VALUES (?, ?, ?, ?)
+                """, achievements)
+
+            if self._search_table is None:
+                self._search_table = has_search_table(conn, self.dialect)
+            if self._search_table:
+                index_applications(cursor, self.dialect, [s['application_id'] for s in submissions])
+
+            conn.commit()
+            return [s['application_id'] for s in submissions]
+        except Exception:
+            conn.rollback()
+            raise
+
+    def sop_texts(self, application_ids=None, batch_size=5000):
+        """SOPs in fetchmany batches (the duplicate detector's input)"""
+        conn = self.get_connection()
+        if not conn:
+            raise RuntimeError("Database connection failed")
+
+        cursor = conn.cursor()
+        if application_ids is None:
+            cursor.execute("SELECT application_id, sop_text FROM applications")
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                yield [tuple(row) for row in batch]
+            return
+        ids = list(application_ids)
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            cursor.execute(f"SELECT application_id, sop_text FROM applications "
+                           f"WHERE application_id IN ({', '.join('?' for _ in batch)})", batch)
+            yield [tuple(row) for row in cursor.fetchall()]
+
+    def export_applications(self, since=None, batch_size=5000):
+        """Stream the master list join in batches straight from the cursor"""
+        conn = self.get_connection()
+        if not conn:
+            raise RuntimeError("Database connection failed")
+
+        cursor = conn.cursor()
+        query = EXPORT_SELECT
+        params = []
+        if since:
+            # Rows never changed after submission have no updated_at
+            query += " WHERE (app.updated_at >= ? OR (app.updated_at IS NULL AND app.submission_date >= ?))"
+            params = [self._date(since), self._date(since.date())]
+        cursor.execute(query, params)
+        # fetchmany keeps only one batch in memory; the rest stays on the server
+        yield from _dict_batches(cursor, batch_size)
+
+    def changes_since(self, version, limit=500):
+        """Change events after `version`; on SQL Server only those below every open transaction's version"""
+        conn = self.get_connection()
+        if not conn:
+            raise RuntimeError("Database connection failed")
+
+        cursor = conn.cursor()
+        if self.dialect == 'sqlite':
+            cursor.execute("""
+                SELECT version, application_id, event_type, old_status, new_status, program_id, occurred_at
+                FROM application_events
+                WHERE version > ?
+                ORDER BY version
+                LIMIT ?
+            """, (version, limit))
+        else:
+            cursor.execute("""
+                SELECT TOP (?) CAST(row_version AS BIGINT), application_id, event_type, old_status, new_status,
+                       program_id, occurred_at
+                FROM application_events
+                WHERE row_version > CAST(CAST(? AS BIGINT) AS BINARY(8))
+                  AND row_version < MIN_ACTIVE_ROWVERSION()
+                ORDER BY row_version
+            """, (limit, version))
+        return [change_event(*row) for row in cursor.fetchall()]
+
+    def data_version(self):
+        """Highest committed version (SQL Server: of any rowversion in the database)"""
+        conn = self.get_connection()
+        if not conn:
+            raise RuntimeError("Database connection failed")
+
+        cursor = conn.cursor()
+        if self.dialect == 'sqlite':
+            cursor.execute("SELECT COALESCE(MAX(version), 0) FROM application_events")
+        else:
+            cursor.execute("SELECT CAST(MIN_ACTIVE_ROWVERSION() AS BIGINT) - 1")
+        return int(cursor.fetchone()[0])
+
+    def analytics_frame(self):
+        """One narrow row per application (analytics.FRAME_COLUMNS), read in fetchmany batches"""
+        conn = self.get_connection()
+        if not conn:
+            raise RuntimeError("Database connection failed")
+
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT app.status, app.program_id, {self._year('app.submission_date')} AS year, app.days_to_submit,
+                   a.is_first_generation, a.country, CAST(ap.high_school_gpa AS FLOAT) AS gpa, ap.sat_score
+            FROM applications app
+            INNER JOIN applicants a ON app.applicant_id = a.applicant_id
+            LEFT JOIN academic_profile ap ON ap.applicant_id = app.applicant_id
+        """)
+        rows = []
+        while True:
+            batch = cursor.fetchmany(FETCH_BATCH_SIZE * 10)
+            if not batch:
+                break
+            rows.extend(tuple(row) for row in batch)
+        with phase('convert'):
+            frame = pd.DataFrame.from_records(rows, columns=FRAME_COLUMNS)
+            for column in ('year', 'days_to_submit', 'gpa', 'sat_score'):
+                frame[column] = pd.to_numeric(frame[column], errors='coerce')
+        return frame
+
+    def ranking_frame(self, application_ids=None):
+        """Scoring inputs per application (ranking.FRAME_COLUMNS); IN-lists of 500 for given IDs"""
+        conn = self.get_connection()
+        if not conn:
+            raise RuntimeError("Database connection failed")
+
+        select = f"""
+            SELECT app.application_id, a.first_name, a.last_name, u.email, app.program_id, app.status,
+                   app.submission_date, {self._year('app.submission_date')} AS year,
+                   CAST(ap.high_school_gpa AS FLOAT) AS gpa, ap.sat_score,
+                   CAST(ap.scholarship_requested AS INT) AS scholarship_requested,
+                   COALESCE(sa.achievements, 0) AS achievements
+            FROM applications app
+            INNER JOIN applicants a ON app.applicant_id = a.applicant_id
+            LEFT JOIN users u ON a.user_id = u.user_id
+            LEFT JOIN academic_profile ap ON ap.applicant_id = app.applicant_id
+            LEFT JOIN (
+                SELECT applicant_id, COUNT(*) AS achievements FROM student_achievements GROUP BY applicant_id
+            ) sa ON sa.applicant_id = app.applicant_id
+        """
+        cursor = conn.cursor()
+        rows = []
+        if application_ids is None:
+            cursor.execute(select)
+            while True:
+                batch = cursor.fetchmany(FETCH_BATCH_SIZE * 10)
+                if not batch:
+                    break
+                rows.extend(tuple(row) for row in batch)
+        else:
+            ids = list(application_ids)
+            for start in range(0, len(ids), 500):
+                batch = ids[start:start + 500]
+                cursor.execute(f"{select} WHERE app.application_id IN ({', '.join('?' for _ in batch)})", batch)
+                rows.extend(tuple(row) for row in cursor.fetchall())
+        with phase('convert'):
+            frame = pd.DataFrame.from_records(rows, columns=RANKING_COLUMNS)
+            for column in ('year', 'gpa', 'sat_score', 'scholarship_requested', 'achievements'):
+                frame[column] = pd.to_numeric(frame[column], errors='coerce')
+        return frame
+
+    def my_applications(self, user_id):
+        try:
+            conn = self.get_connection()
+            if not conn:
+                return []
+
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT
+                    app.application_id,
+                    app.status,
+                    app.submission_date,
+                    app.fees_paid,
+                    a.first_name,
+                    a.last_name,
+                    p.name AS program_name,
+                    p.dept
+                FROM applications app
+                INNER JOIN applicants a ON app.applicant_id = a.applicant_id
+                LEFT JOIN programs p ON app.program_id = p.program_id
+                WHERE a.user_id = ?
+                ORDER BY app.submission_date DESC
+            """, (user_id,))
+
+            applications = []
+            for row in _dicts(cursor):
+                row['submission_date'] = _date_str(row['submission_date']) if row['submission_date'] else 'N/A'
+                row['program_name'] = row['program_name'] or 'N/A'
+                applications.append(row)
+            return applications
+        except Exception as e:
+            print(f"Error loading applications: {e}")
+            return []
+
+    # --- reference data ---
+
+    def _lookup(self, query):
+        conn = self.get_connection()
+        if not conn:
+            raise RuntimeError("Database connection failed")
+        cursor = conn.cursor()
+        cursor.execute(query)
+        return _dicts(cursor)
+
+    def programs(self):
+        return self._lookup("SELECT program_id, name, dept, median_days FROM programs ORDER BY name")
+
+    def roles(self):
+        return self._lookup("SELECT role_id, name FROM roles ORDER BY role_id")
+
+    def age_ranges(self):
+        return self._lookup("SELECT range_id, label, min, max FROM age_ranges ORDER BY min")
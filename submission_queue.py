@@ -0,0 +1,289 @@
+"""
+Durable queue between /submit_application and the database.
+
+The route validates a submission, reserves its IDs, stores it here and
+answers with a ticket straight away; SubmissionWorkers drain the queue into
+the repository in batches (one multi-row transaction per batch), so a
+deadline spike turns into a few large writes instead of many small ones
+contending for the database.
+
+    python submission_queue.py work      # drain the queue in this process (SUBMIT_WORKERS=0 in the web app)
+    python submission_queue.py stats     # queue depth, throughput and latency as JSON
+
+The queue is a local SQLite file (SUBMIT_QUEUE_PATH) in WAL mode with full
+fsync, so an acknowledged submission survives a crash. Several processes can
+share it: claiming a batch is one write transaction. A batch left claimed by
+a crashed worker is claimed again after the lease runs out; submit_many
+skips applications that were already written, so nothing is stored twice.
+"""
+import argparse
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    ticket TEXT NOT NULL UNIQUE,
+    user_id TEXT,
+    application_id TEXT,
+    applicant_id TEXT,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    enqueued_at REAL NOT NULL,
+    claimed_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS ix_submissions_status ON submissions (status, seq);
+"""
+
+# Largest batch a worker writes in one transaction (SQL Server allows 2100 parameters per statement)
+MAX_BATCH_SIZE = 500
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+class SubmissionQueue:
+    """Submissions waiting to be written: queued -> processing -> done (or failed)"""
+
+    def __init__(self, path, lease=60, max_attempts=5):
+        self.path = path
+        # Seconds before a claimed batch is handed to another worker
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+
+    def _connect(self):
+        """This thread's connection, creating the queue file on first use (autocommit; transactions are explicit)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Every commit reaches the disk before the applicant is told it was received
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, submission):
+        """Store a reserved submission (Repository.reserve_submission); returns its ticket"""
+        ticket = uuid.uuid4().hex
+        self._connect().execute("""
+            INSERT INTO submissions (ticket, user_id, application_id, applicant_id, payload, enqueued_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (ticket, submission['user_id'], submission['application_id'], submission['applicant_id'],
+              json.dumps(submission), time.time()))
+        return ticket
+
+    def claim(self, limit):
+        """Oldest queued (or lease-expired) submissions as [(ticket, submission)], marked processing"""
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute("""
+                SELECT seq, ticket, payload FROM submissions
+                WHERE status = 'queued' OR (status = 'processing' AND claimed_at < ?)
+                ORDER BY seq LIMIT ?
+            """, (now - self.lease, min(limit, MAX_BATCH_SIZE))).fetchall()
+            conn.executemany("""
+                UPDATE submissions SET status = 'processing', claimed_at = ?, attempts = attempts + 1
+                WHERE seq = ?
+            """, [(now, seq) for seq, _, _ in rows])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [(ticket, json.loads(payload)) for _, ticket, payload in rows]
+
+    def complete(self, tickets):
+        self._connect().executemany(
+            "UPDATE submissions SET status = 'done', error = NULL, finished_at = ? WHERE ticket = ?",
+            [(time.time(), ticket) for ticket in tickets])
+
+    def fail(self, tickets, error):
+        """Put submissions back in the queue, or mark them failed after max_attempts"""
+        self._connect().executemany("""
+            UPDATE submissions
+            SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END,
+                error = ?, finished_at = CASE WHEN attempts >= ? THEN ? END
+            WHERE ticket = ?
+        """, [(self.max_attempts, error, self.max_attempts, time.time(), ticket) for ticket in tickets])
+
+    def status(self, ticket):
+        """Ticket state for polling, or None for an unknown ticket"""
+        conn = self._connect()
+        row = conn.execute("""
+            SELECT seq, user_id, application_id, applicant_id, status, attempts, error, enqueued_at, finished_at
+            FROM submissions WHERE ticket = ?
+        """, (ticket,)).fetchone()
+        if row is None:
+            return None
+        seq, user_id, application_id, applicant_id, status, attempts, error, enqueued_at, finished_at = row
+        result = {
+            'ticket': ticket, 'status': status, 'user_id': user_id, 'application_id': application_id,
+            'applicant_id': applicant_id, 'attempts': attempts, 'error': error,
+            'enqueued_at': enqueued_at, 'finished_at': finished_at,
+        }
+        if status == 'queued':
+            result['position'] = conn.execute(
+                "SELECT COUNT(*) FROM submissions WHERE status = 'queued' AND seq < ?", (seq,)).fetchone()[0] + 1
+        return result
+
+    def stats(self, window=60):
+        """Depth per status plus throughput and enqueue-to-written latency over the last `window` seconds"""
+        conn = self._connect()
+        now = time.time()
+        counts = dict(conn.execute("SELECT status, COUNT(*) FROM submissions GROUP BY status").fetchall())
+        oldest = conn.execute("SELECT MIN(enqueued_at) FROM submissions WHERE status = 'queued'").fetchone()[0]
+        latencies = [row[0] for row in conn.execute("""
+            SELECT finished_at - enqueued_at FROM submissions WHERE status = 'done' AND finished_at >= ?
+        """, (now - window,))]
+        enqueued = conn.execute("SELECT COUNT(*) FROM submissions WHERE enqueued_at >= ?",
+                                (now - window,)).fetchone()[0]
+        return {
+            'queued': counts.get('queued', 0),
+            'processing': counts.get('processing', 0),
+            'done': counts.get('done', 0),
+            'failed': counts.get('failed', 0),
+            'oldest_queued_seconds': round(now - oldest, 3) if oldest else 0,
+            'window_seconds': window,
+            'enqueued_per_second': round(enqueued / window, 2),
+            'written_per_second': round(len(latencies) / window, 2),
+            'latency_p50_ms': None if not latencies else round(_percentile(latencies, 50) * 1000, 1),
+            'latency_p95_ms': None if not latencies else round(_percentile(latencies, 95) * 1000, 1),
+            'latency_max_ms': None if not latencies else round(max(latencies) * 1000, 1),
+        }
+
+    def prune(self, older_than):
+        """Forget finished submissions older than `older_than` seconds (their tickets stop resolving)"""
+        self._connect().execute("DELETE FROM submissions WHERE status IN ('done', 'failed') AND finished_at < ?",
+                                (time.time() - older_than,))
+
+
+class SubmissionWorkers:
+    """Threads that drain a SubmissionQueue through write_batch(submissions) -> application IDs written"""
+
+    def __init__(self, queue, write_batch, workers=2, batch_size=100, poll_interval=0.5, retention=86400):
+        self.queue = queue
+        self.write_batch = write_batch
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        # Seconds a finished ticket can still be polled
+        self.retention = retention
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._pruned_at = 0
+        self._metrics = {'batches': 0, 'written': 0, 'largest_batch': 0, 'errors': 0, 'write_seconds': 0.0}
+
+    def start(self):
+        """Start the threads once; later calls do nothing"""
+        with self._lock:
+            if self._threads or self.workers <= 0:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"submission-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout=10):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def notify(self):
+        """Wake an idle worker (a submission was just enqueued)"""
+        self._wake.set()
+
+    def metrics(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+        metrics['workers'] = len(self._threads)
+        metrics['avg_batch_size'] = round(metrics['written'] / metrics['batches'], 1) if metrics['batches'] else 0
+        metrics['write_seconds'] = round(metrics['write_seconds'], 3)
+        return metrics
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if not self.drain_once():
+                    self._wake.wait(self.poll_interval)
+                    self._wake.clear()
+                if time.time() - self._pruned_at > 600:
+                    self._pruned_at = time.time()
+                    self.queue.prune(self.retention)
+            except Exception as e:
+                print(f"Submission worker error: {e}")
+                self._stop.wait(self.poll_interval)
+
+    def drain_once(self):
+        """Claim and write one batch; returns how many submissions were claimed"""
+        batch = self.queue.claim(self.batch_size)
+        if not batch:
+            return 0
+        start = time.perf_counter()
+        try:
+            self.write_batch([submission for _, submission in batch])
+            self.queue.complete([ticket for ticket, _ in batch])
+            written = len(batch)
+        except Exception as e:
+            print(f"Submission batch error: {e}")
+            # One bad submission must not hold back the rest: retry them one at a time
+            written = 0
+            for ticket, submission in batch:
+                try:
+                    self.write_batch([submission])
+                    self.queue.complete([ticket])
+                    written += 1
+                except Exception as e:
+                    print(f"Submission {ticket} error: {e}")
+                    self.queue.fail([ticket], str(e))
+        with self._lock:
+            self._metrics['batches'] += 1
+            self._metrics['written'] += written
+            self._metrics['errors'] += len(batch) - written
+            self._metrics['largest_batch'] = max(self._metrics['largest_batch'], len(batch))
+            self._metrics['write_seconds'] += time.perf_counter() - start
+        return len(batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drain or inspect the submission queue")
+    parser.add_argument('command', choices=['work', 'stats'])
+    parser.add_argument('--window', type=int, default=60, help="Seconds of history behind the stats rates")
+    args = parser.parse_args()
+
+    # Same queue and repository (DATA_BACKEND, ...) as the web app
+    from app import submission_queue, submission_workers
+
+    if args.command == 'stats':
+        print(json.dumps(submission_queue.stats(args.window), indent=2))
+        return
+
+    if submission_workers.workers <= 0:
+        submission_workers.workers = 1
+    submission_workers.start()
+    print(f"Draining {submission_queue.path} with {submission_workers.workers} worker(s); Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(args.window)
+            print(json.dumps({**submission_queue.stats(args.window), **submission_workers.metrics()}))
+    except KeyboardInterrupt:
+        submission_workers.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""Change feed: EventLog versions and replay, and data_version()/changes_since() of both repositories"""
+import json
+import os
+import sqlite3
+import threading
+
+import pytest
+
+from csv_repository import create_csv_repository
+from event_log import EventLog
+from sql_repository import SqlRepository
+
+SETUP_SQL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database_setup_sqlite.sql')
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    return str(tmp_path / 'application_events.jsonl')
+
+
+def record(log, application_ids):
+    """Append one event per application under the writer lock; returns their versions"""
+    with log.writing() as events:
+        first = events.next_version()
+        events.write([{'version': first + i, 'application_id': app_id, 'event': 'submitted'}
+                      for i, app_id in enumerate(application_ids)])
+    return list(range(first, first + len(application_ids)))
+
+
+def test_versions_start_at_one_and_increase(log_path):
+    log = EventLog(log_path)
+    assert log.last_version() == 0
+    assert log.since(0) == []
+
+    assert record(log, ['APP1', 'APP2']) == [1, 2]
+    assert record(log, ['APP3']) == [3]
+
+    assert log.last_version() == 3
+    assert [event['version'] for event in log.since(0)] == [1, 2, 3]
+    assert [event['application_id'] for event in log.since(1)] == ['APP2', 'APP3']
+    assert log.since(3) == []
+
+
+def test_since_pages_with_limit(log_path):
+    log = EventLog(log_path)
+    record(log, [f'APP{n}' for n in range(10)])
+
+    seen, version = [], 0
+    while True:
+        events = log.since(version, limit=3)
+        if not events:
+            break
+        seen.extend(event['version'] for event in events)
+        version = events[-1]['version']
+
+    assert seen == list(range(1, 11))
+
+
+def test_reopened_log_replays_the_file(log_path):
+    record(EventLog(log_path), ['APP1', 'APP2', 'APP3'])
+
+    reopened = EventLog(log_path)
+
+    assert reopened.last_version() == 3
+    assert [event['application_id'] for event in reopened.since(1)] == ['APP2', 'APP3']
+    assert record(reopened, ['APP4']) == [4]
+
+
+def test_reader_sees_another_writers_events(log_path):
+    reader, writer = EventLog(log_path), EventLog(log_path)
+    record(reader, ['APP1'])
+
+    record(writer, ['APP2'])
+
+    assert reader.last_version() == 2
+    assert record(reader, ['APP3']) == [3]
+    assert [event['version'] for event in writer.since(0)] == [1, 2, 3]
+
+
+def test_half_written_line_is_picked_up_once_complete(log_path):
+    log = EventLog(log_path)
+    record(log, ['APP1'])
+    line = json.dumps({'version': 2, 'application_id': 'APP2', 'event': 'submitted'}) + '\n'
+    with open(log_path, 'a') as f:
+        f.write(line[:12])
+
+    assert log.last_version() == 1
+
+    with open(log_path, 'a') as f:
+        f.write(line[12:])
+    assert log.last_version() == 2
+    assert log.since(1)[0]['application_id'] == 'APP2'
+
+
+def test_concurrent_writers_never_reuse_a_version(log_path):
+    logs = [EventLog(log_path) for _ in range(4)]
+    threads = [threading.Thread(target=lambda log=log: [record(log, ['APP']) for _ in range(25)]) for log in logs]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    versions = [event['version'] for event in EventLog(log_path).since(0, limit=1000)]
+    assert versions == list(range(1, 101))
+
+
+def applications(count):
+    return [{
+        'user_id': f'U{1001 + n}', 'applicant_id': f'A{5001 + n}', 'application_id': f'APP{9001 + n}',
+        'profile_id': f'P{1001 + n}', 'submitted_at': '2026-04-01 08:30:00.000',
+        'form': {'first_name': 'Sam', 'last_name': 'Feed', 'dob': '2008-02-02', 'gender': 'Male',
+                 'country': 'UK', 'city': 'Leeds', 'is_first_gen': False, 'program_id': 'P102',
+                 'sop_text': 'Statement.', 'gpa': 3.2, 'sat': 1300, 'scholarship': True, 'achievement': ''},
+    } for n in range(count)]
+
+
+@pytest.fixture(params=['sqlite', 'csv'])
+def repo(request, tmp_path):
+    if request.param == 'sqlite':
+        conn = sqlite3.connect(str(tmp_path / 'admissions.db'))
+        with open(SETUP_SQL) as f:
+            conn.executescript(f.read())
+        yield SqlRepository(lambda: conn, dialect='sqlite')
+        conn.close()
+    else:
+        (tmp_path / 'users.csv').write_text("user_id,email,password_hash,role_id,created_at\n")
+        repo = create_csv_repository(str(tmp_path))
+        yield repo
+        repo.store.applications.stop_compactor()
+
+
+def test_feed_records_submissions_and_status_changes(repo):
+    assert repo.data_version() == 0
+    repo.submit_many(applications(2))
+    submitted = repo.data_version()
+
+    assert repo.update_statuses({'APP9002': 'Accepted', 'APP9999': 'Rejected'}) == {
+        'APP9002': ('Waitlisted', 'P102', 2026)}
+
+    assert repo.data_version() > submitted
+    events = repo.changes_since(0)
+    assert [(e['application_id'], e['event'], e['old_status'], e['new_status']) for e in events] == [
+        ('APP9001', 'submitted', None, 'Waitlisted'),
+        ('APP9002', 'submitted', None, 'Waitlisted'),
+        ('APP9002', 'status_changed', 'Waitlisted', 'Accepted'),
+    ]
+    assert [e['version'] for e in events] == sorted(e['version'] for e in events)
+    assert all(e['program_id'] == 'P102' for e in events)
+    assert repo.changes_since(events[1]['version']) == events[2:]
+    assert repo.changes_since(0, limit=1) == events[:1]
+
+
+def test_unchanged_data_keeps_its_version(repo):
+    repo.submit_many(applications(1))
+    version = repo.data_version()
+
+    repo.submit_many(applications(1))
+    repo.update_statuses({'APP9999': 'Accepted'})
+
+    assert repo.data_version() == version
+    assert repo.changes_since(version) == []
@@ -0,0 +1,170 @@
+"""CsvTable change log: logged updates, replay on reopen, compaction and torn last lines"""
+import json
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from csv_store import CsvTable
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = str(tmp_path / 'applications.csv')
+    pd.DataFrame({
+        'application_id': ['APP1', 'APP2', 'APP3'],
+        'status': ['Submitted', 'Submitted', 'Waitlisted'],
+    }).to_csv(path, index=False)
+    return path
+
+
+def open_table(path):
+    return CsvTable(path, unique=['application_id'], dtype={'application_id': str, 'status': str},
+                    log_key='application_id')
+
+
+def statuses(table):
+    return dict(zip(table.frame()['application_id'], table.frame()['status']))
+
+
+def log_lines(table):
+    with open(table.log_path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_update_appends_to_log_not_csv(csv_path):
+    table = open_table(csv_path)
+    with open(csv_path) as f:
+        before = f.read()
+
+    previous = table.update('application_id', 'APP2', {'status': 'Accepted'})
+
+    assert previous['status'] == 'Submitted'
+    assert statuses(table)['APP2'] == 'Accepted'
+    with open(csv_path) as f:
+        assert f.read() == before
+    entries = log_lines(table)
+    assert [(e['application_id'], e['status']) for e in entries] == [('APP2', 'Accepted')]
+    assert 'ts' in entries[0]
+
+
+def test_update_of_unknown_key_writes_nothing(csv_path):
+    table = open_table(csv_path)
+
+    assert table.update('application_id', 'APP9', {'status': 'Accepted'}) is None
+    assert table.update_many('application_id', {'APP9': {'status': 'Accepted'}}) == {'APP9': None}
+    assert not os.path.exists(table.log_path)
+
+
+def test_update_many_appends_one_line_per_row(csv_path):
+    table = open_table(csv_path)
+
+    previous = table.update_many('application_id', {'APP1': {'status': 'Rejected'},
+                                                    'APP3': {'status': 'Accepted'},
+                                                    'APP9': {'status': 'Accepted'}})
+
+    assert previous['APP1']['status'] == 'Submitted'
+    assert previous['APP9'] is None
+    assert [e['application_id'] for e in log_lines(table)] == ['APP1', 'APP3']
+    assert statuses(table) == {'APP1': 'Rejected', 'APP2': 'Submitted', 'APP3': 'Accepted'}
+
+
+def test_reopen_replays_log(csv_path):
+    table = open_table(csv_path)
+    table.update('application_id', 'APP1', {'status': 'Accepted'})
+    table.update('application_id', 'APP1', {'status': 'Enrolled'})
+    table.update('application_id', 'APP3', {'status': 'Lost'})
+
+    reopened = open_table(csv_path)
+
+    assert statuses(reopened) == {'APP1': 'Enrolled', 'APP2': 'Submitted', 'APP3': 'Lost'}
+
+
+def test_reader_picks_up_another_writers_entries(csv_path):
+    reader = open_table(csv_path)
+    assert statuses(reader)['APP2'] == 'Submitted'
+
+    open_table(csv_path).update('application_id', 'APP2', {'status': 'Waitlisted'})
+
+    assert statuses(reader)['APP2'] == 'Waitlisted'
+
+
+def test_compact_folds_log_into_csv(csv_path):
+    table = open_table(csv_path)
+    table.update('application_id', 'APP2', {'status': 'Accepted'})
+
+    assert table.compact() is True
+
+    assert os.path.getsize(table.log_path) == 0
+    on_disk = pd.read_csv(csv_path, dtype=str)
+    assert dict(zip(on_disk['application_id'], on_disk['status']))['APP2'] == 'Accepted'
+    assert not os.path.exists(csv_path + '.tmp')
+    assert statuses(open_table(csv_path))['APP2'] == 'Accepted'
+    # Nothing left to fold
+    assert table.compact() is False
+
+
+def test_updates_after_compaction_are_logged_again(csv_path):
+    table = open_table(csv_path)
+    table.update('application_id', 'APP1', {'status': 'Accepted'})
+    table.compact()
+
+    table.update('application_id', 'APP3', {'status': 'Accepted'})
+
+    assert [e['application_id'] for e in log_lines(table)] == ['APP3']
+    assert statuses(open_table(csv_path)) == {'APP1': 'Accepted', 'APP2': 'Submitted', 'APP3': 'Accepted'}
+
+
+def test_reader_survives_compaction_by_another_writer(csv_path):
+    reader = open_table(csv_path)
+    writer = open_table(csv_path)
+    writer.update('application_id', 'APP1', {'status': 'Accepted'})
+    assert statuses(reader)['APP1'] == 'Accepted'
+
+    writer.compact()
+    writer.update('application_id', 'APP2', {'status': 'Rejected'})
+
+    assert statuses(reader) == {'APP1': 'Accepted', 'APP2': 'Rejected', 'APP3': 'Waitlisted'}
+
+
+def test_replay_ignores_truncated_last_line(csv_path):
+    table = open_table(csv_path)
+    table.update('application_id', 'APP1', {'status': 'Accepted'})
+    # A crash mid-write leaves a line without its newline
+    torn = json.dumps({'ts': '2026-01-01T00:00:00.000', 'application_id': 'APP2', 'status': 'Rejected'})
+    with open(table.log_path, 'a') as f:
+        f.write(torn[:len(torn) // 2])
+
+    reopened = open_table(csv_path)
+
+    assert statuses(reopened) == {'APP1': 'Accepted', 'APP2': 'Submitted', 'APP3': 'Waitlisted'}
+
+
+def test_truncated_line_is_applied_once_completed(csv_path):
+    table = open_table(csv_path)
+    line = json.dumps({'ts': '2026-01-01T00:00:00.000', 'application_id': 'APP2', 'status': 'Rejected'}) + '\n'
+    with open(table.log_path, 'a') as f:
+        f.write(line[:10])
+    assert statuses(table)['APP2'] == 'Submitted'
+
+    with open(table.log_path, 'a') as f:
+        f.write(line[10:])
+
+    assert statuses(table)['APP2'] == 'Rejected'
+
+
+def test_compactor_thread_compacts_past_max_bytes(csv_path):
+    table = open_table(csv_path)
+    table.update('application_id', 'APP3', {'status': 'Accepted'})
+    table.start_compactor(max_bytes=1, interval=0.01)
+    try:
+        deadline = time.monotonic() + 5
+        while os.path.getsize(table.log_path) and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        table.stop_compactor()
+
+    assert os.path.getsize(table.log_path) == 0
+    on_disk = pd.read_csv(csv_path, dtype=str)
+    assert dict(zip(on_disk['application_id'], on_disk['status']))['APP3'] == 'Accepted'
@@ -0,0 +1,129 @@
+"""Near-duplicate SOP detection: shingles, MinHash estimates, LSH clusters and following the change feed"""
+import random
+
+import numpy as np
+
+from duplicates import NUM_PERM, SopDuplicates, check, shingles, signatures
+
+VOCABULARY = [f'word{n}' for n in range(2000)]
+
+
+def essay(seed, length=200):
+    rng = random.Random(seed)
+    return ' '.join(rng.choice(VOCABULARY) for _ in range(length))
+
+
+def edited(text, positions):
+    """The text with the words at `positions` replaced"""
+    words = text.split()
+    for position in positions:
+        words[position] = 'changed'
+    return ' '.join(words)
+
+
+class Feed:
+    """Applications and change events held in lists, in the shape SopDuplicates reads them"""
+
+    def __init__(self, rows):
+        self.sops = dict(rows)
+        self.events = []
+
+    def submit(self, app_id, text):
+        self.sops[app_id] = text
+        self.events.append({'version': len(self.events) + 1, 'application_id': app_id, 'event': 'submitted'})
+
+    def load_sops(self, application_ids=None):
+        ids = list(self.sops) if application_ids is None else application_ids
+        return [[(app_id, self.sops[app_id]) for app_id in ids]]
+
+    def data_version(self):
+        return len(self.events)
+
+    def changes_since(self, version, limit):
+        return self.events[version:version + limit]
+
+    def index(self):
+        return SopDuplicates(self.load_sops, self.data_version, self.changes_since)
+
+
+def test_shingles_ignore_case_and_punctuation():
+    assert np.array_equal(shingles('I love Computer Science, truly!'), shingles('i love computer science truly'))
+    # Shorter than a shingle: the whole text is one shingle
+    assert len(shingles('Hello world')) == 1
+    assert len(shingles('')) == 0 and len(shingles(None)) == 0
+    assert len(shingles(essay(1))) == 196
+
+
+def test_signature_agreement_estimates_jaccard():
+    base = essay(1)
+    near = edited(base, [50, 150])
+    sig_base, sig_near, sig_other = signatures([shingles(base), shingles(near), shingles(essay(2))])
+
+    a, b = set(shingles(base).tolist()), set(shingles(near).tolist())
+    jaccard = len(a & b) / len(a | b)
+    assert sig_base.shape == (NUM_PERM,)
+    assert abs((sig_base == sig_near).mean() - jaccard) < 0.15
+    assert (sig_base == sig_other).mean() < 0.1
+
+
+def test_copies_and_light_edits_cluster_but_distinct_sops_do_not():
+    base = essay(1)
+    feed = Feed([('APP1', base), ('APP2', base), ('APP3', edited(base, [100])), ('APP4', essay(2)),
+                 ('APP5', essay(3)), ('APP6', '')])
+    index = feed.index()
+
+    assert index.clusters() == [{'size': 3, 'application_ids': ['APP1', 'APP2', 'APP3']}]
+    flags = index.flags('APP1')
+    assert flags['duplicates'] == 2
+    assert flags['similar'][0] == {'application_id': 'APP2', 'similarity': 1.0}
+    assert flags['similar'][1]['application_id'] == 'APP3' and flags['similar'][1]['similarity'] < 1.0
+    assert index.flags('APP4')['duplicates'] == 0
+    # No text: nothing to index
+    assert index.flags('APP6')['indexed'] is False
+    assert index.stats()['applications'] == 5
+    assert index.stats()['distinct_signatures'] == 4
+
+
+def test_new_submissions_are_added_from_the_change_feed():
+    base = essay(1)
+    feed = Feed([('APP1', base), ('APP2', essay(2))])
+    index = feed.index()
+    assert index.clusters() == []
+
+    feed.submit('APP3', edited(base, [10]))
+    feed.submit('APP4', essay(4))
+
+    assert index.clusters() == [{'size': 2, 'application_ids': ['APP1', 'APP3']}]
+    assert index.stats()['version'] == 2
+    assert index.flags('APP4')['indexed'] is True
+
+
+def test_invalidate_rebuilds_from_the_source():
+    feed = Feed([('APP1', essay(1))])
+    index = feed.index()
+    assert index.stats()['applications'] == 1
+
+    # Changed outside the feed: only a rebuild sees it
+    feed.sops['APP2'] = essay(1)
+    assert index.clusters() == []
+    index.invalidate()
+
+    assert index.clusters() == [{'size': 2, 'application_ids': ['APP1', 'APP2']}]
+
+
+def test_several_edits_of_one_sop_form_one_cluster():
+    base = essay(1)
+    rows = [(f'APP{n}', edited(base, range(0, 200, 200 // (n + 1))[:n])) for n in range(1, 4)] + [('APP0', base)]
+    index = Feed(rows).index()
+
+    assert index.clusters()[0]['application_ids'] == ['APP0', 'APP1', 'APP2', 'APP3']
+
+
+def test_check_matches_exact_pairwise_comparison():
+    base, other = essay(1), essay(2)
+    rows = [('APP1', base), ('APP2', edited(base, [5])), ('APP3', other), ('APP4', edited(other, [7])),
+            ('APP5', essay(3))]
+
+    recall, precision, true_pairs = check(rows)
+
+    assert (recall, precision, true_pairs) == (1.0, 1.0, 2)
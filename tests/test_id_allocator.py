@@ -0,0 +1,139 @@
+"""FileIdAllocator and SequenceIdAllocator: hi/lo blocks, concurrent allocation and restarts"""
+import multiprocessing
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from id_allocator import FileIdAllocator, SequenceIdAllocator
+
+
+@pytest.fixture
+def counter_path(tmp_path):
+    return str(tmp_path / 'id_counters.json')
+
+
+def number(id_value):
+    return int(id_value.lstrip('APPU'))
+
+
+def allocate_in_process(path, count, results):
+    allocator = FileIdAllocator(path)
+    results.put([allocator.next_id('application') for _ in range(count)])
+
+
+class SequenceConnection:
+    """SQL Server stand-in for sp_sequence_get_range: one counter per sequence, reserved in ranges"""
+
+    def __init__(self, start=9001):
+        self.next = start
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params):
+        with self._lock:
+            self.calls += 1
+            self._first = self.next
+            self.next += params[0]
+
+    def fetchone(self):
+        return (self._first,)
+
+
+def test_file_allocator_starts_at_first_ids(counter_path):
+    allocator = FileIdAllocator(counter_path)
+
+    assert allocator.next_id('application') == 'APP9001'
+    assert allocator.next_id('application') == 'APP9002'
+    assert allocator.next_ids(['applicant', 'application', 'profile']) == {
+        'applicant': 'A5001', 'application': 'APP9003', 'profile': 'P1001'}
+
+
+def test_file_allocator_seeds_from_existing_rows_once(counter_path):
+    seeded = []
+
+    def seed():
+        seeded.append(True)
+        return {'application': 12000, 'user': None}
+
+    allocator = FileIdAllocator(counter_path, seed=seed)
+
+    assert allocator.next_id('application') == 'APP12001'
+    assert allocator.next_id('user') == 'U1001'
+    # The counter file exists from now on: the table is not scanned again
+    assert allocator.next_id('application') == 'APP12002'
+    assert len(seeded) == 1
+
+
+def test_file_allocator_continues_after_restart(counter_path):
+    FileIdAllocator(counter_path).next_ids(['user', 'application'])
+    FileIdAllocator(counter_path).next_id('application')
+
+    restarted = FileIdAllocator(counter_path, seed=lambda: {'application': 1})
+
+    assert restarted.next_id('application') == 'APP9003'
+
+
+def test_file_allocator_threads_get_distinct_ids(counter_path):
+    allocators = [FileIdAllocator(counter_path) for _ in range(4)]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        ids = list(pool.map(lambda i: allocators[i % 4].next_id('application'), range(200)))
+
+    assert len(set(ids)) == 200
+    assert sorted(map(number, ids)) == list(range(9001, 9201))
+
+
+def test_file_allocator_processes_get_disjoint_ids(counter_path):
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    processes = [context.Process(target=allocate_in_process, args=(counter_path, 50, results)) for _ in range(3)]
+    for process in processes:
+        process.start()
+    batches = [results.get(timeout=60) for _ in processes]
+    for process in processes:
+        process.join(timeout=60)
+
+    numbers = [number(id_value) for batch in batches for id_value in batch]
+    assert len(set(numbers)) == 150
+    assert sorted(numbers) == list(range(9001, 9151))
+    # Each process saw its own IDs in increasing order
+    assert all([number(i) for i in batch] == sorted(number(i) for i in batch) for batch in batches)
+
+
+def test_sequence_allocator_hands_out_blocks_locally():
+    conn = SequenceConnection()
+    allocator = SequenceIdAllocator(lambda: conn, block_size=5)
+
+    ids = [allocator.next_id('application') for _ in range(12)]
+
+    assert ids == [f'APP{n}' for n in range(9001, 9013)]
+    # 12 IDs from blocks of 5: three round trips
+    assert conn.calls == 3
+
+
+def test_sequence_allocators_never_overlap():
+    conn = SequenceConnection()
+    workers = [SequenceIdAllocator(lambda: conn, block_size=10) for _ in range(3)]
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        ids = list(pool.map(lambda i: workers[i % 3].next_id('application'), range(300)))
+
+    assert len(set(ids)) == 300
+
+
+def test_sequence_allocator_skips_the_rest_of_a_block_after_restart():
+    conn = SequenceConnection()
+    SequenceIdAllocator(lambda: conn, block_size=20).next_id('application')
+
+    restarted = SequenceIdAllocator(lambda: conn, block_size=20)
+
+    assert restarted.next_id('application') == 'APP9021'
+
+
+def test_sequence_allocator_without_connection_raises():
+    with pytest.raises(RuntimeError):
+        SequenceIdAllocator(lambda: None).next_id('application')
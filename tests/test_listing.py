@@ -0,0 +1,126 @@
+"""Keyset pagination of the master list: cursors, after=/before= round trips and ties on submission_date"""
+import os
+import sqlite3
+from datetime import date
+
+import pytest
+
+from csv_repository import create_csv_repository
+from listing import decode_cursor, encode_cursor, parse_list_args
+from sql_repository import SqlRepository
+
+SETUP_SQL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database_setup_sqlite.sql')
+# 13 applications over 4 days, so most pages start or end inside a run of equal dates
+DATES = [f'2026-03-0{1 + n % 4}' for n in range(13)]
+APP_IDS = [f'APP{9001 + n}' for n in range(13)]
+
+
+def new_applications():
+    return [{
+        'user_id': f'U{1001 + n}', 'applicant_id': f'A{5001 + n}', 'application_id': APP_IDS[n],
+        'profile_id': f'P{1001 + n}', 'submitted_at': f'{DATES[n]} 10:00:00.000',
+        'form': {'first_name': 'Lee', 'last_name': f'Tester{n}', 'dob': '2008-05-05', 'gender': 'Other',
+                 'country': 'India', 'city': 'Pune', 'is_first_gen': False, 'program_id': 'P101',
+                 'sop_text': 'Statement.', 'gpa': 3.0, 'sat': 1200, 'scholarship': False, 'achievement': ''},
+    } for n in range(13)]
+
+
+@pytest.fixture(params=['sqlite', 'csv'])
+def repo(request, tmp_path):
+    if request.param == 'sqlite':
+        conn = sqlite3.connect(str(tmp_path / 'admissions.db'))
+        with open(SETUP_SQL) as f:
+            conn.executescript(f.read())
+        conn.execute("INSERT INTO programs VALUES ('P101', 'Bachelor in Communication', 'Arts', 35)")
+        repo = SqlRepository(lambda: conn, dialect='sqlite')
+        repo.submit_many(new_applications())
+        yield repo
+        conn.close()
+    else:
+        (tmp_path / 'programs.csv').write_text("program_id,name,dept,median_days\n"
+                                               "P101,Bachelor in Communication,Arts,35\n")
+        (tmp_path / 'users.csv').write_text("user_id,email,password_hash,role_id,created_at\n" + ''.join(
+            f"U{1001 + n},lee{n}@example.com,x,2,2026-01-01\n" for n in range(13)))
+        repo = create_csv_repository(str(tmp_path))
+        repo.submit_many(new_applications())
+        yield repo
+        repo.store.applications.stop_compactor()
+
+
+def expected(sort):
+    rows = sorted(zip(DATES, APP_IDS), reverse=sort == 'date_desc')
+    return [app_id for _, app_id in rows]
+
+
+def ids(result):
+    return [item['application_id'] for item in result['items']]
+
+
+def walk_forward(repo, sort, page_size):
+    pages = [repo.list_applications(page_size=page_size, sort=sort)]
+    while pages[-1]['next_cursor']:
+        pages.append(repo.list_applications(page_size=page_size, sort=sort,
+                                            after=decode_cursor(pages[-1]['next_cursor'])))
+    return pages
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor('2026-03-02', 'APP9005')
+
+    assert decode_cursor(cursor) == (date(2026, 3, 2), 'APP9005')
+    for malformed in (None, '', 'APP9005', 'not-a-date|APP9005', '2026-03-02|'):
+        assert decode_cursor(malformed) is None
+
+
+def test_parse_list_args_keeps_cursors_for_date_sorts_only():
+    after = parse_list_args({'after': '2026-03-02|APP9005', 'before': '2026-03-01|APP9001'})
+    assert after['after'] == decode_cursor('2026-03-02|APP9005')
+    # after= wins when both are given
+    assert after['before'] is None
+
+    by_name = parse_list_args({'sort': 'name_asc', 'after': '2026-03-02|APP9005'})
+    assert by_name['after'] is None and by_name['before'] is None
+
+
+@pytest.mark.parametrize('sort', ['date_desc', 'date_asc'])
+def test_after_cursor_visits_every_row_once_in_order(repo, sort):
+    pages = walk_forward(repo, sort, page_size=4)
+
+    assert [len(page['items']) for page in pages] == [4, 4, 4, 1]
+    assert [app_id for page in pages for app_id in ids(page)] == expected(sort)
+    assert all(page['total'] == 13 for page in pages)
+
+
+@pytest.mark.parametrize('sort', ['date_desc', 'date_asc'])
+def test_before_cursor_returns_the_same_pages_backwards(repo, sort):
+    forward = walk_forward(repo, sort, page_size=4)
+
+    backward = [forward[-1]]
+    while backward[-1]['prev_cursor']:
+        backward.append(repo.list_applications(page_size=4, sort=sort,
+                                               before=decode_cursor(backward[-1]['prev_cursor'])))
+
+    assert [ids(page) for page in backward] == [ids(page) for page in reversed(forward)]
+    # Back on the first page: nothing precedes it, and Next works again
+    assert backward[-1]['prev_cursor'] is None
+    assert backward[-1]['next_cursor'] == forward[0]['next_cursor']
+
+
+def test_prev_cursor_only_when_rows_precede(repo):
+    first = repo.list_applications(page_size=5)
+    second = repo.list_applications(page_size=5, after=decode_cursor(first['next_cursor']))
+
+    assert first['prev_cursor'] is None
+    # Reached by cursor without a page number (a JSON client): Previous is still available
+    assert second['page'] == 1
+    assert second['prev_cursor'] == encode_cursor('2026-03-03', ids(second)[0])
+
+
+def test_cursor_inside_a_run_of_equal_dates(repo):
+    # Cursor at the middle application of 2026-03-02 (APP9002, APP9006, APP9010)
+    after = repo.list_applications(page_size=50, sort='date_asc', after=decode_cursor('2026-03-02|APP9006'))
+    before = repo.list_applications(page_size=50, sort='date_asc', before=decode_cursor('2026-03-02|APP9006'))
+
+    assert ids(after)[:2] == ['APP9010', 'APP9003']
+    assert ids(before)[-2:] == ['APP9013', 'APP9002']
+    assert ids(before) + ['APP9006'] + ids(after) == expected('date_asc')
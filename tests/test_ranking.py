@@ -0,0 +1,163 @@
+"""Waitlist ranking: scores, per-program ranks, yield, proposed offers and cutoffs, and RankingCache updates"""
+import pandas as pd
+import pytest
+
+from ranking import (DEFAULT_WEIGHTS, FRAME_COLUMNS, RankingCache, cycle_counts, parse_seats, parse_weights,
+                     plan, prepare, rank, scores)
+
+
+def application(app_id, program_id, status, year, gpa=3.0, sat_score=1000, achievements=0, scholarship=False):
+    return {'application_id': app_id, 'first_name': 'Kim', 'last_name': app_id, 'email': f'{app_id}@example.com',
+            'program_id': program_id, 'status': status, 'submission_date': f'{year}-03-01', 'year': year,
+            'gpa': gpa, 'sat_score': sat_score, 'scholarship_requested': scholarship, 'achievements': achievements}
+
+
+def admissions():
+    """P1: 10 enrolled and 10 lost last cycle (yield 0.5); this cycle 2 enrolled, 2 accepted, 6 waitlisted"""
+    rows = [application(f'OLD{n}', 'P1', 'Enrolled' if n < 10 else 'Lost', 2025) for n in range(20)]
+    rows += [application('NOW1', 'P1', 'Enrolled', 2026), application('NOW2', 'P1', 'Enrolled', 2026),
+             application('NOW3', 'P1', 'Accepted', 2026), application('NOW4', 'P1', 'Accepted', 2026)]
+    # Waitlist best first: W1 > W2 > W3 > W4 > W5 > W6
+    rows += [application(f'W{n}', 'P1', 'Waitlisted', 2026, gpa=4.0 - n * 0.3, sat_score=1500 - n * 50)
+             for n in range(1, 7)]
+    rows += [application('X1', 'P2', 'Waitlisted', 2026, gpa=3.9, sat_score=1550, achievements=5),
+             application('X2', 'P2', 'Waitlisted', 2026, gpa=2.0, sat_score=900)]
+    return pd.DataFrame(rows, columns=FRAME_COLUMNS)
+
+
+def test_parse_weights_and_seats():
+    weights = parse_weights('gpa=0.5, sat_score=0.5')
+    assert weights == {**DEFAULT_WEIGHTS, 'gpa': 0.5, 'sat_score': 0.5}
+    with pytest.raises(ValueError):
+        parse_weights('height=1')
+    with pytest.raises(ValueError):
+        parse_weights('gpa=0,sat_score=0,achievements=0')
+    assert parse_seats('P1=40, P2=-3') == {'P1': 40, 'P2': 0}
+
+
+def test_scores_scale_clip_and_weight_features():
+    frame = pd.DataFrame([
+        {'gpa': 4.0, 'sat_score': 1600, 'achievements': 3, 'scholarship_requested': True},
+        {'gpa': 0.0, 'sat_score': 400, 'achievements': 0, 'scholarship_requested': False},
+        {'gpa': 2.0, 'sat_score': None, 'achievements': 9, 'scholarship_requested': False},
+    ])
+
+    result = scores(frame, DEFAULT_WEIGHTS)
+
+    assert result[0] == pytest.approx(100.0)
+    assert result[1] == pytest.approx(0.0)
+    # Half the GPA weight, no SAT (missing counts 0), achievements capped at 3
+    assert result[2] == pytest.approx(100 * (0.45 * 0.5 + 0.2))
+
+
+def test_rank_orders_each_programs_waitlist_by_score():
+    waitlist = rank(prepare(admissions(), DEFAULT_WEIGHTS), 2026)
+
+    p1 = waitlist[waitlist['program_id'] == 'P1']
+    assert p1['application_id'].tolist() == ['W1', 'W2', 'W3', 'W4', 'W5', 'W6']
+    assert p1['rank'].tolist() == [1, 2, 3, 4, 5, 6]
+    assert waitlist[waitlist['program_id'] == 'P2']['application_id'].tolist() == ['X1', 'X2']
+    assert rank(prepare(admissions(), DEFAULT_WEIGHTS), 2020).empty
+
+
+def test_cycle_counts_and_yield():
+    counts = cycle_counts(prepare(admissions(), DEFAULT_WEIGHTS), 2026)
+
+    assert counts['P1'] == {'waitlisted': 6, 'accepted': 2, 'enrolled': 2, 'last_cycle_enrolled': 10,
+                            'yield_rate': 0.5}
+    # No history of its own: the yield of every program
+    assert counts['P2']['yield_rate'] == 0.5
+    assert counts['P2']['last_cycle_enrolled'] == 0
+
+
+def test_plan_offers_open_seats_over_yield():
+    counts = cycle_counts(prepare(admissions(), DEFAULT_WEIGHTS), 2026)
+
+    plans = {row['program_id']: row for row in plan(counts, {'P1': 5}, {'P1': 'Physics'})}
+
+    # 5 seats - 2 enrolled - 2 accepted x 0.5 = 2 open; 2 / 0.5 = 4 offers
+    assert plans['P1']['open_seats'] == 2
+    assert plans['P1']['offers'] == 4
+    assert plans['P1']['seats_configured'] is True
+    assert plans['P1']['program_name'] == 'Physics'
+    # Last cycle's Enrolled (0) is the default: no open seats
+    assert plans['P2']['seats'] == 0 and plans['P2']['offers'] == 0
+
+
+def test_offers_never_exceed_the_waitlist():
+    counts = cycle_counts(prepare(admissions(), DEFAULT_WEIGHTS), 2026)
+
+    plans = {row['program_id']: row for row in plan(counts, {'P1': 100}, {})}
+
+    assert plans['P1']['offers'] == 6
+
+
+class Source:
+    """A DataFrame standing in for the repository, with a change feed"""
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.events = []
+        self.loads = []
+
+    def load_frame(self, application_ids=None):
+        self.loads.append(application_ids)
+        if application_ids is None:
+            return self.frame.copy()
+        return self.frame[self.frame['application_id'].isin(application_ids)].copy()
+
+    def change(self, app_id, event, new_status):
+        self.events.append({'version': len(self.events) + 1, 'application_id': app_id, 'event': event,
+                            'new_status': new_status})
+
+    def cache(self, **kwargs):
+        return RankingCache(self.load_frame, lambda: len(self.events), lambda version, limit: self.events[version:],
+                            lambda: [{'program_id': 'P1', 'name': 'Physics'}, {'program_id': 'P2', 'name': 'Law'}],
+                            **kwargs)
+
+
+def test_ranking_cutoff_is_the_score_of_the_last_offer():
+    cache = Source(admissions()).cache(seats={'P1': 5})
+
+    version, plans, total, items = cache.ranking(year=2026, program_id='P1')
+
+    assert version == 0 and total == 6
+    assert plans[0]['offers'] == 4
+    w4 = next(item for item in items if item['application_id'] == 'W4')
+    assert plans[0]['cutoff_score'] == w4['score']
+    assert [item['above_cutoff'] for item in items] == [True] * 4 + [False] * 2
+    # ?seats= overrides the configured seats
+    assert cache.ranking(year=2026, program_id='P1', seats={'P1': 4})[1][0]['offers'] == 2
+
+
+def test_ranking_across_programs_pages_by_score():
+    cache = Source(admissions()).cache()
+
+    _, plans, total, items = cache.ranking(year=2026, offset=0, limit=3)
+
+    assert total == 8 and len(plans) == 2
+    assert [item['application_id'] for item in items] == ['X1', 'W1', 'W2']
+    assert [item['rank'] for item in items] == [1, 1, 2]
+
+
+def test_cache_follows_submissions_and_status_changes():
+    source = Source(admissions())
+    cache = source.cache(seats={'P1': 5})
+    cache.ranking(year=2026)
+
+    new = pd.DataFrame([application('W0', 'P1', 'Waitlisted', 2026, gpa=4.0, sat_score=1600)], columns=FRAME_COLUMNS)
+    source.frame = pd.concat([source.frame, new], ignore_index=True)
+    source.change('W0', 'submitted', 'Waitlisted')
+    source.change('W1', 'status_changed', 'Accepted')
+
+    version, plans, total, items = cache.ranking(year=2026, program_id='P1')
+
+    assert version == 2
+    assert [item['application_id'] for item in items] == ['W0', 'W2', 'W3', 'W4', 'W5', 'W6']
+    assert plans[0]['accepted'] == 3
+    # Only the new submission was loaded again
+    assert source.loads == [None, ['W0']]
+
+    cache.invalidate()
+    cache.ranking(year=2026)
+    assert source.loads[-1] is None
@@ -0,0 +1,150 @@
+"""Full-text search: query parsing, snippet escaping, MemorySearchIndex and the repositories' search()"""
+import os
+import sqlite3
+
+import pytest
+
+import migrations
+from csv_repository import create_csv_repository
+from search import MemorySearchIndex, application_id_prefix, fts5_match, query_terms, snippet
+from sql_repository import SqlRepository
+
+SETUP_SQL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database_setup_sqlite.sql')
+
+ROWS = [
+    ('APP9001', 'Priya Raman', 'priya@example.com', 'Chennai India', 'I love robotics and computer science.', None),
+    ('APP9002', 'Tom Science', 'tom@example.com', 'Leeds UK', 'History is my passion.', 'Debate Champion'),
+    ('APP9003', 'José Núñez', 'jose@example.com', 'Madrid Spain', 'Computers & <b>circuits</b> since age 8.', None),
+]
+
+
+def test_query_terms_lowercases_and_caps_words():
+    assert query_terms('Comp  SCI!') == ['comp', 'sci']
+    assert query_terms(None) == []
+    assert len(query_terms(' '.join(['word'] * 20))) == 8
+    assert fts5_match(['comp', 'sci']) == '"comp"* "sci"*'
+
+
+def test_application_id_prefix():
+    assert application_id_prefix(' app90 ') == 'APP90'
+    assert application_id_prefix('APP9001') == 'APP9001'
+    assert application_id_prefix('APP') is None
+    assert application_id_prefix('APP9001 robotics') is None
+    assert application_id_prefix('priya') is None
+
+
+def test_snippet_marks_prefix_hits_and_escapes_the_rest():
+    text = 'Computers & <b>circuits</b> since age 8.'
+
+    result = snippet([None, text], ['circ'])
+
+    assert result == 'Computers &amp; &lt;b&gt;<mark>circuits</mark>&lt;/b&gt; since age 8'
+    assert '<b>' not in result
+
+
+def test_snippet_trims_long_texts_around_the_first_hit():
+    words = [f'w{n}' for n in range(40)]
+    words[20] = 'robotics'
+
+    result = snippet([' '.join(words)], ['robot'], words=8)
+
+    assert result.startswith('...w18 w19 <mark>robotics</mark>')
+    assert result.endswith('...')
+    assert snippet(['nothing here', None], ['robot']) == ''
+
+
+def test_memory_index_requires_every_term_as_a_prefix():
+    index = MemorySearchIndex(lambda: ROWS)
+
+    assert [row[0] for row in index.search(['comp', 'sci'])] == ['APP9001']
+    assert {row[0] for row in index.search(['comp'])} == {'APP9001', 'APP9003'}
+    # Diacritics are folded: "nunez" finds "Núñez"
+    assert [row[0] for row in index.search(['nunez'])] == ['APP9003']
+    assert index.search(['zebra']) == []
+
+
+def test_memory_index_ranks_name_hits_above_sop_hits():
+    index = MemorySearchIndex(lambda: ROWS)
+
+    hits = index.search(['science'])
+
+    # "Science" is Tom's surname; Priya only mentions it in her SOP
+    assert [row[0] for row in hits] == ['APP9002', 'APP9001']
+    assert hits[0][1] > hits[1][1]
+
+
+def test_memory_index_add_and_invalidate():
+    rows = list(ROWS[:1])
+    index = MemorySearchIndex(lambda: rows)
+    # Before the first search there is no index to add to; the build picks the row up
+    index.add([ROWS[1]])
+    rows.append(ROWS[1])
+    assert [row[0] for row in index.search(['history'])] == ['APP9002']
+
+    index.add([ROWS[2], ROWS[2]])
+    assert [row[0] for row in index.search(['madrid'])] == ['APP9003']
+
+    index.invalidate()
+    assert index.search(['madrid']) == []
+
+
+def applicant(n, first_name, sop_text, achievement=''):
+    return {
+        'user_id': f'U{1001 + n}', 'applicant_id': f'A{5001 + n}', 'application_id': f'APP{9001 + n}',
+        'profile_id': f'P{1001 + n}', 'submitted_at': f'2026-02-{10 + n} 12:00:00.000',
+        'form': {'first_name': first_name, 'last_name': 'Search', 'dob': '2008-03-03', 'gender': 'Female',
+                 'country': 'India', 'city': 'Delhi', 'is_first_gen': True, 'program_id': 'P103',
+                 'sop_text': sop_text, 'gpa': 3.9, 'sat': 1500, 'scholarship': False, 'achievement': achievement},
+    }
+
+
+@pytest.fixture(params=['sqlite', 'csv'])
+def repo(request, tmp_path):
+    submissions = [applicant(n, name, sop) for n, (name, sop) in enumerate([
+        ('Asha', 'Robots <script>alert(1)</script> and rockets.'),
+        ('Bina', 'Painting and music.'),
+        ('Chen', 'Rocket engines.'),
+    ] + [(f'Extra{n}', 'Nothing to see.') for n in range(8)])]
+    if request.param == 'sqlite':
+        conn = sqlite3.connect(str(tmp_path / 'admissions.db'))
+        with open(SETUP_SQL) as f:
+            conn.executescript(f.read())
+        migrations.upgrade(conn, 'sqlite', verbose=False)
+        repo = SqlRepository(lambda: conn, dialect='sqlite')
+        repo.submit_many(submissions)
+        yield repo
+        conn.close()
+    else:
+        (tmp_path / 'users.csv').write_text("user_id,email,password_hash,role_id,created_at\n")
+        (tmp_path / 'programs.csv').write_text("program_id,name,dept,median_days\nP103,Bachelor in Design,Arts,30\n")
+        (tmp_path / 'student_achievements.csv').write_text("id,applicant_id,achievement_name,date_awarded\n")
+        repo = create_csv_repository(str(tmp_path))
+        repo.submit_many(submissions)
+        yield repo
+        repo.store.applications.stop_compactor()
+
+
+def test_search_ranks_matches_with_escaped_snippets(repo):
+    result = repo.search('rocket')
+
+    assert result['total'] == 2
+    assert {item['application_id'] for item in result['items']} == {'APP9001', 'APP9003'}
+    asha = next(item for item in result['items'] if item['application_id'] == 'APP9001')
+    assert '<mark>rockets</mark>' in asha['snippet']
+    assert '</script>' not in asha['snippet'] and '&lt;/script&gt;' in asha['snippet']
+
+
+def test_search_by_application_id_and_prefix(repo):
+    assert [item['application_id'] for item in repo.search('app9002')['items']] == ['APP9002']
+
+    result = repo.search('APP900', page_size=5)
+    assert result['total'] == 9
+    assert [item['application_id'] for item in result['items']] == [f'APP{9001 + n}' for n in range(5)]
+    assert result['items'][0]['snippet'] == ''
+    assert repo.search('APP900', page=2, page_size=5)['items'][0]['application_id'] == 'APP9006'
+
+
+def test_search_applies_list_filters_and_misses(repo):
+    assert repo.search('rocket', program_id='P999')['total'] == 0
+    assert repo.search('APP77')['total'] == 0
+    assert repo.search('   ')['total'] == 0
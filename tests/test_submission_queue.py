@@ -0,0 +1,177 @@
+"""SubmissionQueue claim/ack/retry, recovery of batches left claimed by a dead worker, and idempotent submit_many"""
+import os
+import sqlite3
+import time
+
+import pytest
+
+from sql_repository import SqlRepository
+from submission_queue import SubmissionQueue, SubmissionWorkers
+
+SETUP_SQL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database_setup_sqlite.sql')
+
+
+@pytest.fixture
+def queue_path(tmp_path):
+    return str(tmp_path / 'submissions.db')
+
+
+@pytest.fixture
+def repo(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'admissions.db'), check_same_thread=False)
+    with open(SETUP_SQL) as f:
+        conn.executescript(f.read())
+    yield SqlRepository(lambda: conn, dialect='sqlite')
+    conn.close()
+
+
+def submission(n):
+    return {
+        'user_id': f'USR{n}',
+        'applicant_id': f'APL{n}',
+        'application_id': f'APP{n}',
+        'profile_id': f'PRF{n}',
+        'submitted_at': '2026-10-18 09:00:00.000',
+        'form': {
+            'first_name': 'Ada', 'last_name': f'Number{n}', 'dob': '2008-01-01', 'gender': 'F',
+            'country': 'Kenya', 'city': 'Nairobi', 'is_first_gen': True, 'program_id': 'P101',
+            'sop_text': 'I want to study.', 'gpa': 3.5, 'sat': 1400, 'scholarship': False, 'achievement': '',
+        },
+    }
+
+
+def stored_ids(repo):
+    return [row[0] for row in repo.get_connection().execute(
+        "SELECT application_id FROM applications ORDER BY application_id")]
+
+
+def test_enqueue_then_claim_marks_processing(queue_path):
+    queue = SubmissionQueue(queue_path)
+    first = queue.enqueue(submission(1))
+    second = queue.enqueue(submission(2))
+
+    assert queue.status(first)['status'] == 'queued'
+    assert queue.status(second)['position'] == 2
+
+    claimed = queue.claim(10)
+
+    assert [ticket for ticket, _ in claimed] == [first, second]
+    assert claimed[0][1] == submission(1)
+    assert queue.status(first)['status'] == 'processing'
+    assert queue.status(first)['attempts'] == 1
+    # Still leased: nobody else gets the batch
+    assert queue.claim(10) == []
+
+
+def test_complete_marks_done(queue_path):
+    queue = SubmissionQueue(queue_path)
+    ticket = queue.enqueue(submission(1))
+    queue.claim(10)
+
+    queue.complete([ticket])
+
+    status = queue.status(ticket)
+    assert status['status'] == 'done'
+    assert status['finished_at'] is not None
+    assert queue.claim(10) == []
+
+
+def test_failed_ticket_is_retried_then_given_up(queue_path):
+    queue = SubmissionQueue(queue_path, max_attempts=2)
+    ticket = queue.enqueue(submission(1))
+
+    queue.claim(10)
+    queue.fail([ticket], 'database down')
+    assert queue.status(ticket)['status'] == 'queued'
+    assert queue.status(ticket)['error'] == 'database down'
+
+    assert [t for t, _ in queue.claim(10)] == [ticket]
+    queue.fail([ticket], 'database down')
+    assert queue.status(ticket)['status'] == 'failed'
+    assert queue.status(ticket)['attempts'] == 2
+    assert queue.claim(10) == []
+
+
+def test_unacked_batch_is_written_once_after_restart(queue_path, repo):
+    tickets = [SubmissionQueue(queue_path).enqueue(submission(n)) for n in (1, 2, 3)]
+
+    # A worker writes its batch, then dies before acknowledging it
+    dead = SubmissionQueue(queue_path, lease=0.05)
+    batch = dead.claim(10)
+    repo.submit_many([s for _, s in batch])
+    del dead
+
+    # Restarted worker: nothing to take until the lease runs out
+    restarted = SubmissionQueue(queue_path, lease=0.05)
+    workers = SubmissionWorkers(restarted, repo.submit_many, workers=0)
+    assert workers.drain_once() == 0
+    time.sleep(0.1)
+    assert workers.drain_once() == 3
+
+    assert [restarted.status(ticket)['status'] for ticket in tickets] == ['done'] * 3
+    assert [restarted.status(ticket)['attempts'] for ticket in tickets] == [2] * 3
+    assert stored_ids(repo) == ['APP1', 'APP2', 'APP3']
+    assert workers.drain_once() == 0
+
+
+def test_batch_claimed_but_not_written_is_written_after_restart(queue_path, repo):
+    ticket = SubmissionQueue(queue_path).enqueue(submission(1))
+    SubmissionQueue(queue_path, lease=0.05).claim(10)
+    time.sleep(0.1)
+
+    workers = SubmissionWorkers(SubmissionQueue(queue_path, lease=0.05), repo.submit_many, workers=0)
+
+    assert workers.drain_once() == 1
+    assert workers.queue.status(ticket)['status'] == 'done'
+    assert stored_ids(repo) == ['APP1']
+
+
+def test_failing_batch_is_retried_one_by_one(queue_path):
+    queue = SubmissionQueue(queue_path)
+    tickets = [queue.enqueue(submission(n)) for n in (1, 2, 3)]
+    written = []
+
+    def write_batch(submissions):
+        if any(s['application_id'] == 'APP2' for s in submissions):
+            raise ValueError('bad program')
+        written.extend(s['application_id'] for s in submissions)
+        return [s['application_id'] for s in submissions]
+
+    workers = SubmissionWorkers(queue, write_batch, workers=0)
+
+    assert workers.drain_once() == 3
+    assert written == ['APP1', 'APP3']
+    assert [queue.status(ticket)['status'] for ticket in tickets] == ['done', 'queued', 'done']
+    assert queue.status(tickets[1])['error'] == 'bad program'
+    metrics = workers.metrics()
+    assert (metrics['batches'], metrics['written'], metrics['errors']) == (1, 2, 1)
+
+
+def test_worker_threads_drain_the_queue(queue_path, repo):
+    queue = SubmissionQueue(queue_path)
+    tickets = [queue.enqueue(submission(n)) for n in range(1, 6)]
+    workers = SubmissionWorkers(queue, repo.submit_many, workers=1, batch_size=2, poll_interval=0.01)
+    workers.start()
+    try:
+        deadline = time.monotonic() + 10
+        while queue.stats()['done'] < 5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        workers.stop()
+
+    assert [queue.status(ticket)['status'] for ticket in tickets] == ['done'] * 5
+    assert stored_ids(repo) == ['APP1', 'APP2', 'APP3', 'APP4', 'APP5']
+    assert workers.metrics()['largest_batch'] == 2
+
+
+def test_submit_many_skips_existing_applications(repo):
+    assert repo.submit_many([submission(1), submission(2)]) == ['APP1', 'APP2']
+
+    assert repo.submit_many([submission(1)]) == []
+    assert repo.submit_many([submission(2), submission(3)]) == ['APP3']
+
+    conn = repo.get_connection()
+    assert stored_ids(repo) == ['APP1', 'APP2', 'APP3']
+    assert conn.execute("SELECT COUNT(*) FROM applicants").fetchone()[0] == 3
+    assert conn.execute("SELECT COUNT(*) FROM academic_profile").fetchone()[0] == 3
+    assert conn.execute("SELECT COUNT(*) FROM application_events WHERE event_type = 'submitted'").fetchone()[0] == 3